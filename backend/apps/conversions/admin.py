@@ -1,8 +1,10 @@
 """
 Interface d'administration pour les conversions
 """
-from django.contrib import admin
-from .models import ConversionCategory, ConversionType, Conversion, FileConversion
+from django.contrib import admin, messages
+from django.template.defaultfilters import filesizeformat
+from .models import ConversionCategory, ConversionType, Conversion, FileConversion, ConversionResult, UploadSession, Unit, ExchangeRate
+from .storage import cache_stats
 
 
 @admin.register(ConversionCategory)
@@ -46,10 +48,10 @@ class ConversionAdmin(admin.ModelAdmin):
 @admin.register(FileConversion)
 class FileConversionAdmin(admin.ModelAdmin):
     """Administration des conversions de fichiers"""
-    list_display = ['id', 'user', 'input_format', 'output_format', 'status', 'created_at']
-    list_filter = ['status', 'input_format', 'output_format', 'created_at']
-    search_fields = ['user__username', 'input_format', 'output_format']
-    readonly_fields = ['created_at', 'completed_at', 'file_size_input', 'file_size_output']
+    list_display = ['id', 'user', 'input_format', 'output_format', 'status', 'cache_hit', 'created_at']
+    list_filter = ['status', 'cache_hit', 'input_format', 'output_format', 'created_at']
+    search_fields = ['user__username', 'input_format', 'output_format', 'input_sha256']
+    readonly_fields = ['created_at', 'completed_at', 'file_size_input', 'file_size_output', 'input_sha256', 'cache_hit']
     date_hierarchy = 'created_at'
     
     fieldsets = (
@@ -57,10 +59,10 @@ class FileConversionAdmin(admin.ModelAdmin):
             'fields': ('user', 'input_file', 'output_file', 'status')
         }),
         ('Formats', {
-            'fields': ('input_format', 'output_format')
+            'fields': ('input_format', 'output_format', 'options')
         }),
         ('Métadonnées', {
-            'fields': ('file_size_input', 'file_size_output', 'conversion_time')
+            'fields': ('input_sha256', 'file_size_input', 'file_size_output', 'conversion_time', 'cache_hit')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'completed_at'),
@@ -71,3 +73,51 @@ class FileConversionAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(ConversionResult)
+class ConversionResultAdmin(admin.ModelAdmin):
+    """Administration du cache des résultats de conversion"""
+    list_display = ['input_sha256', 'output_format', 'size', 'hits', 'last_used_at', 'created_at']
+    list_filter = ['output_format']
+    search_fields = ['input_sha256']
+    readonly_fields = ['input_sha256', 'output_format', 'options_key', 'output_file', 'size', 'hits', 'created_at', 'last_used_at']
+    
+    def has_add_permission(self, request):
+        """Les résultats sont mis en cache automatiquement par les workers"""
+        return False
+    
+    def changelist_view(self, request, extra_context=None):
+        stats = cache_stats()
+        self.message_user(
+            request,
+            f"Succès : {stats['hits']} — Échecs : {stats['misses']} "
+            f"— Taux de succès : {stats['hit_ratio']:.1%} "
+            f"— {stats['entries']} entrée(s), {filesizeformat(stats['size'])}",
+            level=messages.INFO
+        )
+        return super().changelist_view(request, extra_context)
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    """Administration des envois par morceaux"""
+    list_display = ['filename', 'user', 'received', 'size', 'status', 'updated_at']
+    list_filter = ['status']
+    search_fields = ['filename', 'user__username']
+    readonly_fields = ['id', 'received', 'file_conversion', 'created_at', 'updated_at']
+
+
+@admin.register(Unit)
+class UnitAdmin(admin.ModelAdmin):
+    """Registre des unités de l'historique"""
+    list_display = ['id', 'symbol']
+    search_fields = ['symbol']
+
+
+@admin.register(ExchangeRate)
+class ExchangeRateAdmin(admin.ModelAdmin):
+    """Historique des taux de change"""
+    list_display = ['currency', 'base', 'rate', 'as_of', 'fetched_at']
+    list_filter = ['base', 'currency']
+    date_hierarchy = 'fetched_at'
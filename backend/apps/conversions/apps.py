@@ -5,3 +5,6 @@ class ConversionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.conversions'
     verbose_name = 'Conversions'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
@@ -0,0 +1,21 @@
+"""
+URLs des vues asynchrones de l'API des conversions (/api/async/)
+"""
+from django.urls import path
+from . import async_views
+
+app_name = 'conversions-async'
+
+urlpatterns = [
+    path('categories/', async_views.category_list, name='category-list'),
+    path('categories/<slug:slug>/', async_views.category_detail, name='category-detail'),
+    path('categories/<slug:slug>/conversion_types/', async_views.category_conversion_types,
+         name='category-conversion-types'),
+    path('types/', async_views.type_list, name='conversiontype-list'),
+    path('types/<slug:slug>/', async_views.type_detail, name='conversiontype-detail'),
+    path('conversions/convert/', async_views.convert, name='conversion-convert'),
+    path('file-conversions/<int:pk>/status/', async_views.file_conversion_status,
+         name='fileconversion-status'),
+    path('file-conversions/<int:pk>/events/', async_views.file_conversion_events,
+         name='fileconversion-events'),
+]
@@ -0,0 +1,390 @@
+"""
+Vues asynchrones (ASGI) des points d'accès les plus sollicités
+
+Variantes natives de `convert`, des lectures du catalogue et du suivi d'une
+conversion de fichier (statut et flux SSE de progression), servies sous
+/api/async/. Sous uvicorn, une requête en attente (client lent, attente du
+statut d'un fichier) n'occupe pas de thread : l'ORM et le cache sont
+utilisés par leur API asynchrone. Les réponses sont identiques à celles des
+vues DRF correspondantes.
+
+L'authentification reproduit celle de DRF (Basic, puis session avec
+vérification CSRF). Sous WSGI, ces vues fonctionnent aussi, mais sans gain
+(et le flux SSE n'est envoyé qu'une fois terminé).
+"""
+import asyncio
+import base64
+import binascii
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import aauthenticate
+from django.db.models import Count, Q
+from django.http import HttpResponse, StreamingHttpResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.urls import reverse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .catalog import acatalog_response
+from .engine import CURRENCY_CATEGORY, ConversionError, aget_engine
+from .history import arecord_conversions
+from .models import ConversionCategory, ConversionType, Conversion, FileConversion
+from .progress import TERMINAL_STATUSES, alast_event, make_event, subscribe
+from .registry import aunit_id, auser_agent_id
+from .serializers import (
+    ConversionCategorySerializer, ConversionTypeSerializer, ConversionRequestSerializer
+)
+
+# Attente maximale d'un changement de statut (secondes)
+STATUS_MAX_WAIT = 30
+# Relecture de la base en l'absence d'événement publié (secondes)
+STATUS_RECHECK_INTERVAL = 2
+# Flux SSE : durée d'une connexion, message de maintien, délai de reconnexion
+EVENTS_MAX_DURATION = 300
+EVENTS_HEARTBEAT = 15
+EVENTS_RETRY_MS = 2000
+
+
+class NotFound(Exception):
+    """Objet ou page introuvable"""
+
+
+def json_response(data, status=200):
+    """Réponse JSON rendue comme par DRF (mêmes nombres, dates et décimaux)"""
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+
+def client_ip(request):
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if x_forwarded_for:
+        return x_forwarded_for.split(',')[0]
+    return request.META.get('REMOTE_ADDR')
+
+
+class CSRFCheck(CsrfViewMiddleware):
+    def _reject(self, request, reason):
+        return reason
+
+
+async def authenticate(request):
+    """
+    Authentifier comme les classes DRF configurées : retourne
+    (utilisateur, None) ou (None, réponse d'erreur 403).
+    """
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if header[:6].lower() == 'basic ':
+        try:
+            username, _, password = base64.b64decode(header[6:]).decode('utf-8').partition(':')
+        except (binascii.Error, UnicodeDecodeError):
+            username = password = None
+        user = username and await aauthenticate(request, username=username, password=password)
+        if not user or not user.is_active:
+            return None, json_response(
+                {'detail': "Nom d'utilisateur et/ou mot de passe non valide(s)."}, status=403
+            )
+        return user, None
+
+    user = await request.auser()
+    if user.is_authenticated:
+        reason = CSRFCheck(lambda request: None).process_view(request, None, (), {})
+        if reason:
+            return None, json_response({'detail': f'CSRF Failed: {reason}'}, status=403)
+    return user, None
+
+
+async def paginate(request, queryset, serialize):
+    """Page de résultats au format de PageNumberPagination"""
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    try:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        raise NotFound('Page non valide.')
+    count = await queryset.acount()
+    last_page = max(1, -(-count // page_size))
+    if not 1 <= page <= last_page:
+        raise NotFound('Page non valide.')
+    offset = (page - 1) * page_size
+    objects = [obj async for obj in queryset[offset:offset + page_size]]
+
+    url = request.build_absolute_uri()
+    previous = None
+    if page > 1:
+        previous = remove_query_param(url, 'page') if page == 2 else replace_query_param(url, 'page', page - 1)
+    return {
+        'count': count,
+        'next': replace_query_param(url, 'page', page + 1) if page < last_page else None,
+        'previous': previous,
+        'results': await serialize(objects),
+    }
+
+
+async def acategory_counts():
+    """Variante asynchrone de serializers.category_counts"""
+    rows = (
+        ConversionType.objects.filter(is_active=True)
+        .order_by()
+        .values_list('category')
+        .annotate(count=Count('id'))
+    )
+    return {category: count async for category, count in rows}
+
+
+def categories_queryset():
+    return ConversionCategory.objects.filter(is_active=True).annotate(
+        active_types_count=Count('conversion_types', filter=Q(conversion_types__is_active=True))
+    ).order_by('name')
+
+
+def types_queryset():
+    return ConversionType.objects.filter(is_active=True).select_related('category')
+
+
+async def catalog_view(request, build):
+    try:
+        return await acatalog_response(request, build)
+    except NotFound as e:
+        return json_response({'detail': str(e)}, status=404)
+
+
+@require_GET
+async def category_list(request):
+    """Liste des catégories (voir ConversionCategoryViewSet.list)"""
+    async def build():
+        async def serialize(objects):
+            return ConversionCategorySerializer(objects, many=True, context={'request': request}).data
+        return await paginate(request, categories_queryset(), serialize)
+    return await catalog_view(request, build)
+
+
+async def get_category(slug):
+    category = await categories_queryset().filter(slug=slug).afirst()
+    if category is None:
+        raise NotFound('Pas trouvé.')
+    return category
+
+
+@require_GET
+async def category_detail(request, slug):
+    """Détail d'une catégorie"""
+    async def build():
+        category = await get_category(slug)
+        return ConversionCategorySerializer(category, context={'request': request}).data
+    return await catalog_view(request, build)
+
+
+@require_GET
+async def category_conversion_types(request, slug):
+    """Types de conversion actifs d'une catégorie"""
+    async def build():
+        category = await get_category(slug)
+        conversion_types = [
+            conversion_type async for conversion_type in types_queryset().filter(category=category)
+        ]
+        return ConversionTypeSerializer(
+            conversion_types, many=True,
+            context={'request': request, 'category_counts': {category.pk: category.active_types_count}}
+        ).data
+    return await catalog_view(request, build)
+
+
+@require_GET
+async def type_list(request):
+    """Liste des types de conversion (filtre ?category=<slug>)"""
+    async def build():
+        queryset = types_queryset()
+        category_slug = request.GET.get('category')
+        if category_slug:
+            queryset = queryset.filter(category__slug=category_slug)
+
+        async def serialize(objects):
+            context = {'request': request, 'category_counts': await acategory_counts()}
+            return ConversionTypeSerializer(objects, many=True, context=context).data
+        return await paginate(request, queryset, serialize)
+    return await catalog_view(request, build)
+
+
+@require_GET
+async def type_detail(request, slug):
+    """Détail d'un type de conversion"""
+    async def build():
+        conversion_type = await types_queryset().filter(slug=slug).afirst()
+        if conversion_type is None:
+            raise NotFound('Pas trouvé.')
+        context = {'request': request, 'category_counts': await acategory_counts()}
+        return ConversionTypeSerializer(conversion_type, context=context).data
+    return await catalog_view(request, build)
+
+
+@csrf_exempt
+@require_POST
+async def convert(request):
+    """Effectuer une conversion et l'enregistrer (voir ConversionViewSet.convert)"""
+    user, error = await authenticate(request)
+    if error:
+        return error
+    if not user.is_authenticated:
+        return json_response({'detail': "Informations d'authentification non fournies."}, status=403)
+
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return json_response({'detail': 'JSON invalide'}, status=400)
+    serializer = ConversionRequestSerializer(data=data)
+    if not serializer.is_valid():
+        return json_response(serializer.errors, status=400)
+    data = serializer.validated_data
+
+    engine = await aget_engine()
+    conversion_type = engine.get_type(data['conversion_type_id'])
+    if conversion_type is None:
+        return json_response({'error': 'Type de conversion non trouvé'}, status=404)
+    try:
+        if conversion_type.category_slug == CURRENCY_CATEGORY:
+            # Les taux peuvent être relus en base
+            convert_value = sync_to_async(engine.convert_with_type)
+            output_value = await convert_value(
+                conversion_type, data['input_value'], data['input_unit'], data['output_unit']
+            )
+        else:
+            output_value = engine.convert_with_type(
+                conversion_type, data['input_value'], data['input_unit'], data['output_unit']
+            )
+    except ConversionError as e:
+        return json_response({'error': str(e)}, status=400)
+
+    conversion = Conversion(
+        user=user,
+        conversion_type_id=conversion_type.id,
+        input_value=data['input_value'],
+        output_value=output_value,
+        input_unit_id=await aunit_id(data['input_unit']),
+        output_unit_id=await aunit_id(data['output_unit']),
+        ip_address=client_ip(request),
+        user_agent_id=await auser_agent_id(request.META.get('HTTP_USER_AGENT', ''))
+    )
+    saved = await arecord_conversions([conversion])
+
+    return json_response({
+        'success': True,
+        'input_value': data['input_value'],
+        'output_value': output_value,
+        'input_unit': data['input_unit'],
+        'output_unit': data['output_unit'],
+        'conversion_id': conversion.id if saved else None
+    })
+
+
+def file_conversions_for(user):
+    """Conversions de fichiers visibles (voir FileConversionViewSet.get_queryset)"""
+    if user.is_authenticated:
+        return FileConversion.objects.filter(user=user)
+    return FileConversion.objects.filter(user__isnull=True)
+
+
+async def file_conversion_state(request, queryset, pk):
+    """Statut courant (base, et pourcentage publié par le worker), ou None"""
+    state = await queryset.filter(pk=pk).values(
+        'id', 'status', 'error_message', 'output_format', 'file_size_output',
+        'conversion_time', 'cache_hit', 'rows_processed', 'rows_failed', 'completed_at'
+    ).afirst()
+    if state is None:
+        return None
+    event = await alast_event(pk)
+    if event is not None and event['status'] == state['status']:
+        state['percent'] = event['percent']
+    else:
+        state['percent'] = make_event(pk, state['status'])['percent']
+    state['output_file_url'] = None
+    if state['status'] == 'completed':
+        state['output_file_url'] = request.build_absolute_uri(
+            reverse('conversions:fileconversion-download', args=[pk])
+        )
+    return state
+
+
+@require_GET
+async def file_conversion_status(request, pk):
+    """
+    Statut d'une conversion de fichier. Avec ?status=<statut connu>&wait=<s>,
+    la réponse attend (au plus STATUS_MAX_WAIT secondes) que le statut change.
+    """
+    user, error = await authenticate(request)
+    if error:
+        return error
+    queryset = file_conversions_for(user)
+
+    known_status = request.GET.get('status')
+    try:
+        wait = min(max(float(request.GET.get('wait', 0)), 0), STATUS_MAX_WAIT)
+    except ValueError:
+        wait = 0
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    async with subscribe(pk) as subscription:
+        while True:
+            state = await file_conversion_state(request, queryset, pk)
+            if state is None:
+                return json_response({'detail': 'Pas trouvé.'}, status=404)
+            remaining = deadline - loop.time()
+            if state['status'] != known_status or remaining <= 0:
+                return json_response(state)
+            # Réveil dès la publication du worker, relecture de la base sinon
+            await subscription.get(min(remaining, STATUS_RECHECK_INTERVAL))
+
+
+def sse_message(data, event='status'):
+    return b'event: %s\ndata: %s\n\n' % (event.encode(), JSONRenderer().render(data))
+
+
+@require_GET
+async def file_conversion_events(request, pk):
+    """
+    Flux Server-Sent Events de la progression d'une conversion de fichier :
+    un événement « status » à l'ouverture puis à chaque publication du
+    worker (pourcentage, changement de statut). Le flux se termine avec le
+    statut final, ou après EVENTS_MAX_DURATION secondes (le client se
+    reconnecte alors automatiquement).
+    """
+    user, error = await authenticate(request)
+    if error:
+        return error
+    queryset = file_conversions_for(user)
+    if not await queryset.filter(pk=pk).aexists():
+        return json_response({'detail': 'Pas trouvé.'}, status=404)
+
+    async def events():
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + EVENTS_MAX_DURATION
+        async with subscribe(pk) as subscription:
+            state = await file_conversion_state(request, queryset, pk)
+            if state is None:
+                return
+            yield b'retry: %d\n\n' % EVENTS_RETRY_MS
+            yield sse_message(state)
+            last_sent = loop.time()
+            while state['status'] not in TERMINAL_STATUSES and loop.time() < deadline:
+                event = await subscription.get(STATUS_RECHECK_INTERVAL)
+                if event is None or event['status'] in TERMINAL_STATUSES:
+                    # Statut final ou relecture périodique : état complet depuis la base
+                    fresh = await file_conversion_state(request, queryset, pk)
+                    if fresh is None:
+                        return
+                    if event is None and fresh['status'] == state['status']:
+                        if loop.time() - last_sent >= EVENTS_HEARTBEAT:
+                            yield b': keepalive\n\n'
+                            last_sent = loop.time()
+                        continue
+                    event = fresh
+                state = event
+                yield sse_message(state)
+                last_sent = loop.time()
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx : ne pas mettre le flux en tampon
+    response['X-Accel-Buffering'] = 'no'
+    return response
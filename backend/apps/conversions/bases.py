@@ -0,0 +1,205 @@
+"""
+Conversion entre bases numériques (2 à 36 et base64), en précision arbitraire
+
+Les valeurs sont des chaînes de longueur quelconque :
+- bases puissances de deux (2, 4, 8, 16, 32, 64) : découpage des bits, en
+  temps linéaire (la base64 passe par l'octal, deux chiffres octaux par
+  caractère) ;
+- autres bases : diviser pour régner sur des puissances de la base
+  précalculées. La lecture repose sur la multiplication des grands entiers
+  (Karatsuba) ; l'écriture passe par le module decimal (libmpdec :
+  multiplication par transformée, division de Newton).
+
+La base64 est une numération de position sur l'alphabet de la RFC 4648
+(A = 0 … / = 63), sans remplissage.
+"""
+import decimal
+import math
+import string
+
+from .engine import ConversionError
+
+DIGITS = string.digits + string.ascii_lowercase
+BASE64_ALPHABET = string.ascii_uppercase + string.ascii_lowercase + string.digits + '+/'
+
+ALIASES = {'bin': 2, 'oct': 8, 'dec': 10, 'hex': 16, 'base64': 64, 'b64': 64}
+POWER_OF_TWO_BITS = {2: 1, 4: 2, 8: 3, 16: 4, 32: 5, 64: 6}
+
+# Nombre de chiffres traités directement (sous la limite int_max_str_digits)
+LEAF_DIGITS = 1024
+# Chiffres par mot machine (63 bits) pour chaque base
+WORD_DIGITS = {base: int(63 / math.log2(base)) for base in range(2, 37)}
+# Taille des morceaux produits par iter_format
+CHUNK_SIZE = 64 * 1024
+
+# base64 <-> octal : un caractère pour deux chiffres octaux
+_BASE64_TO_OCTAL = {ord(char): f'{value:02o}' for value, char in enumerate(BASE64_ALPHABET)}
+_OCTAL_PAIRS_TO_BASE64 = {f'{value:02o}': char for value, char in enumerate(BASE64_ALPHABET)}
+
+
+def parse_base(value):
+    """Base à partir d'un entier, d'un alias (bin, hex, base64…) ou de « baseN »"""
+    text = str(value).strip().lower()
+    if text in ALIASES:
+        return ALIASES[text]
+    if text.startswith('base'):
+        text = text[4:]
+    if text.isdigit() and (2 <= int(text) <= 36 or int(text) == 64):
+        return int(text)
+    raise ConversionError(f"Base inconnue : « {value} » (2 à 36 ou base64)")
+
+
+def alphabet(base):
+    return BASE64_ALPHABET if base == 64 else DIGITS[:base]
+
+
+def normalize(value, base):
+    """Retirer les espaces, séparer le signe et valider les chiffres"""
+    digits = ''.join(value.split())
+    negative = digits.startswith('-')
+    if negative or digits.startswith('+'):
+        digits = digits[1:]
+    if base != 64:
+        digits = digits.lower()
+    if not digits or digits.strip(alphabet(base)):
+        raise ConversionError(f"Valeur invalide en base {base}")
+    return negative, digits
+
+
+def _power(base, exponent, powers):
+    value = powers.get(exponent)
+    if value is None:
+        value = powers[exponent] = base ** exponent
+    return value
+
+
+def _parse_dc(digits, base, powers):
+    if len(digits) <= LEAF_DIGITS:
+        return int(digits, base)
+    low_length = len(digits) // 2
+    high = _parse_dc(digits[:-low_length], base, powers)
+    low = _parse_dc(digits[-low_length:], base, powers)
+    return high * _power(base, low_length, powers) + low
+
+
+def to_int(value, base):
+    """Lire une chaîne de chiffres en base `base`"""
+    negative, digits = normalize(value, base)
+    if base == 64:
+        number = int(digits.translate(_BASE64_TO_OCTAL), 8)
+    elif base in POWER_OF_TWO_BITS:
+        number = int(digits, base)
+    else:
+        number = _parse_dc(digits, base, {})
+    return -number if negative else number
+
+
+def _format_power_of_two(number, base):
+    if base in (2, 8, 16):
+        return format(number, {2: 'b', 8: 'o', 16: 'x'}[base])
+    if base == 64:
+        octal = format(number, 'o')
+        octal = octal.zfill(len(octal) + len(octal) % 2)
+        return ''.join(_OCTAL_PAIRS_TO_BASE64[octal[i:i + 2]] for i in range(0, len(octal), 2))
+    bits = POWER_OF_TWO_BITS[base]
+    binary = format(number, 'b')
+    binary = binary.zfill(-(-len(binary) // bits) * bits)
+    return ''.join(DIGITS[int(binary[i:i + bits], 2)] for i in range(0, len(binary), bits))
+
+
+# Contexte sans arrondi : les calculs sur Decimal restent exacts
+_EXACT = decimal.Context(prec=decimal.MAX_PREC, Emax=decimal.MAX_EMAX, Emin=decimal.MIN_EMIN)
+
+
+def _int_to_decimal(number):
+    """Entier positif -> Decimal exact, diviser pour régner sur les bits"""
+    powers = {}
+
+    def convert(value, bits):
+        if bits <= 4096:
+            return decimal.Decimal(value)
+        low_bits = bits // 2
+        if low_bits not in powers:
+            powers[low_bits] = _EXACT.power(decimal.Decimal(2), low_bits)
+        high = convert(value >> low_bits, bits - low_bits)
+        low = convert(value & ((1 << low_bits) - 1), low_bits)
+        return _EXACT.add(_EXACT.multiply(high, powers[low_bits]), low)
+
+    return convert(number, number.bit_length())
+
+
+def _format_leaf(number, base):
+    """Chiffres d'un petit entier (moins de LEAF_DIGITS chiffres)"""
+    # Divisions par base ** width tenant dans un mot machine
+    width = WORD_DIGITS[base]
+    word = base ** width
+    words = []
+    while number:
+        number, low = divmod(number, word)
+        words.append(low)
+    digits = []
+    for index, low in enumerate(reversed(words)):
+        chunk = []
+        while low:
+            low, digit = divmod(low, base)
+            chunk.append(DIGITS[digit])
+        chunk = ''.join(reversed(chunk))
+        digits.append(chunk.zfill(width) if index else chunk)
+    return ''.join(digits) or '0'
+
+
+def _iter_format_dc(number, base):
+    """
+    Chiffres d'un entier positif, des poids forts aux poids faibles.
+    Les divisions par les puissances base ** (LEAF_DIGITS × 2^k) sont faites
+    en Decimal (division de Newton de libmpdec), sous-quadratiques.
+    """
+    value = _int_to_decimal(number)
+    powers = [_EXACT.power(decimal.Decimal(base), LEAF_DIGITS)]
+    while _EXACT.multiply(powers[-1], powers[-1]) <= value:
+        powers.append(_EXACT.multiply(powers[-1], powers[-1]))
+
+    def walk(value, level, pad):
+        if level < 0:
+            digits = _format_leaf(int(value), base)
+            yield digits.zfill(LEAF_DIGITS) if pad else digits
+            return
+        if not pad and value < powers[level]:
+            yield from walk(value, level - 1, False)
+            return
+        high, low = _EXACT.divmod(value, powers[level])
+        yield from walk(high, level - 1, pad)
+        yield from walk(low, level - 1, True)
+
+    yield from walk(value, len(powers) - 1, False)
+
+
+def iter_format(number, base, chunk_size=CHUNK_SIZE):
+    """Écrire un entier en base `base`, par morceaux d'environ chunk_size caractères"""
+    if number < 0:
+        yield '-'
+        number = -number
+    if base in POWER_OF_TWO_BITS or base == 10:
+        digits = _format_power_of_two(number, base) if base != 10 else str(_int_to_decimal(number))
+        for start in range(0, len(digits), chunk_size):
+            yield digits[start:start + chunk_size]
+        return
+    buffer = []
+    size = 0
+    for digits in _iter_format_dc(number, base):
+        buffer.append(digits)
+        size += len(digits)
+        if size >= chunk_size:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def format_int(number, base):
+    return ''.join(iter_format(number, base))
+
+
+def convert_base(value, input_base, output_base):
+    """Convertir une chaîne de chiffres d'une base vers une autre (bases ou alias)"""
+    return format_int(to_int(value, parse_base(input_base)), parse_base(output_base))
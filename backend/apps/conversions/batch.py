@@ -0,0 +1,96 @@
+"""
+Évaluation vectorisée des conversions par lot
+
+Les valeurs sont regroupées par (type, unité d'entrée, unité de sortie) et
+chaque groupe est évalué en une seule opération sur tableau. NumPy est
+utilisé lorsqu'il est installé (importé au premier lot seulement) ; le
+calcul exact en Decimal reste disponible (et sert aussi pour les formules
+non affines).
+"""
+from decimal import Decimal
+
+from .engine import OUTPUT_MAX, ConversionError, quantize_output
+from .formula import FormulaError
+
+# Arrondi appliqué aux résultats flottants (même précision que l'historique)
+FLOAT_DECIMALS = 10
+
+_numpy = None
+
+
+def get_numpy():
+    """Module numpy, importé à la première utilisation (False s'il n'est pas installé)"""
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover - dépendance optionnelle
+            numpy = False
+        _numpy = numpy
+    return _numpy
+
+
+def group_items(items):
+    """
+    Regrouper les valeurs des éléments d'un lot par clé de conversion.
+    Retourne {clé: [(index de l'élément, valeurs), ...]} dans l'ordre d'arrivée.
+    """
+    groups = {}
+    for index, item in enumerate(items):
+        key = (item['conversion_type_id'], item['input_unit'], item['output_unit'])
+        groups.setdefault(key, []).append((index, item['values']))
+    return groups
+
+
+def evaluate(plan, values, exact=False, strict=True):
+    """
+    Évaluer une transformation sur une liste de valeurs Decimal.
+
+    En mode exact (ou pour une formule non affine), chaque valeur est
+    calculée en Decimal. Sinon le calcul est fait en virgule flottante sur
+    tout le tableau et les résultats sont des float.
+
+    Avec strict=False, une valeur hors limites donne None au lieu de faire
+    échouer tout le lot.
+    """
+    affine = plan.affine
+    if exact or affine is None:
+        if not strict:
+            return [_apply_or_none(plan, value) for value in values]
+        try:
+            return [quantize_output(plan.apply(value)) for value in values]
+        except FormulaError as e:
+            raise ConversionError(str(e))
+
+    factor, offset = float(affine[0]), float(affine[1])
+    limit = float(OUTPUT_MAX)
+    numpy = get_numpy()
+    if numpy:
+        array = numpy.fromiter(values, dtype=numpy.float64, count=len(values))
+        results = numpy.round(array * factor + offset, FLOAT_DECIMALS)
+        if strict:
+            if len(results) and numpy.abs(results).max() >= limit:
+                raise ConversionError("Résultat hors limites")
+            return results.tolist()
+        return [result if abs(result) < limit else None for result in results.tolist()]
+
+    results = [round(float(value) * factor + offset, FLOAT_DECIMALS) for value in values]
+    if not strict:
+        return [result if abs(result) < limit else None for result in results]
+    if any(abs(result) >= limit for result in results):
+        raise ConversionError("Résultat hors limites")
+    return results
+
+
+def _apply_or_none(plan, value):
+    try:
+        return quantize_output(plan.apply(value))
+    except (ConversionError, FormulaError):
+        return None
+
+
+def to_decimal(value):
+    """Ramener un résultat (float ou Decimal) au format de l'historique"""
+    if isinstance(value, Decimal):
+        return value
+    return quantize_output(Decimal(repr(value)))
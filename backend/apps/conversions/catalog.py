@@ -0,0 +1,147 @@
+"""
+Cache du catalogue (catégories et types de conversion)
+
+Les réponses JSON du catalogue sont mises en cache déjà sérialisées, avec
+leur ETag, à deux niveaux :
+- un dictionnaire en mémoire dans chaque processus ;
+- le cache Django (Redis lorsque USE_REDIS_CACHE est activé), partagé
+  entre les processus.
+
+Les entrées sont indexées par une version stockée dans le cache Django et
+incrémentée après validation des modifications des catégories et des
+types (signaux post_save/post_delete) : une modification du catalogue
+invalide tous les processus.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from rest_framework.renderers import JSONRenderer
+
+CATALOG_VERSION_KEY = 'conversions:catalog:version'
+CATALOG_TIMEOUT = 24 * 3600
+MAX_LOCAL_ENTRIES = 512
+# Paramètres lus par les vues du catalogue (filtre, pagination, format)
+CATALOG_PARAMS = ('category', 'page', 'format')
+
+_local = OrderedDict()
+_local_version = None
+_local_lock = threading.Lock()
+
+
+def catalog_version():
+    return cache.get(CATALOG_VERSION_KEY, 0)
+
+
+def invalidate_catalog():
+    """Invalider le catalogue en cache dans tous les processus"""
+    global _local_version
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_KEY, 1, timeout=None)
+    with _local_lock:
+        _local.clear()
+        _local_version = None
+
+
+def request_key(request):
+    """
+    Clé d'une requête : hôte (les liens de pagination en dépendent), chemin
+    et paramètres lus par les vues. La chaîne de requête est ramenée à ces
+    paramètres, pour que les liens d'une réponse partagée n'en citent pas
+    d'autres.
+    """
+    query = urlencode([(name, value) for name in CATALOG_PARAMS for value in request.GET.getlist(name)])
+    request.META['QUERY_STRING'] = query
+    return f'{request.get_host()}{request.path}?{query}'
+
+
+def _local_entry(version, key):
+    global _local_version
+    with _local_lock:
+        if _local_version != version:
+            _local.clear()
+            _local_version = version
+        entry = _local.get(key)
+        if entry is not None:
+            _local.move_to_end(key)
+        return entry
+
+
+def _remember(version, key, entry):
+    with _local_lock:
+        if _local_version == version:
+            _local[key] = entry
+            while len(_local) > MAX_LOCAL_ENTRIES:
+                _local.popitem(last=False)
+
+
+def _shared_key(version, key):
+    return 'conversions:catalog:%s:%s' % (version, hashlib.sha1(key.encode()).hexdigest())
+
+
+def _render(data):
+    body = JSONRenderer().render(data)
+    return body, '"%s"' % hashlib.sha1(body).hexdigest()[:20]
+
+
+def get_entry(key, build):
+    """
+    Récupérer (corps JSON, ETag) pour une clé, en ne calculant les données
+    avec build() qu'en cas d'absence dans les deux niveaux de cache.
+    """
+    version = catalog_version()
+    entry = _local_entry(version, key)
+    if entry is not None:
+        return entry
+
+    shared_key = _shared_key(version, key)
+    entry = cache.get(shared_key)
+    if entry is None:
+        entry = _render(build())
+        cache.set(shared_key, entry, timeout=CATALOG_TIMEOUT)
+    _remember(version, key, entry)
+    return entry
+
+
+async def aget_entry(key, abuild):
+    """Variante asynchrone de get_entry (cache asynchrone, abuild() attendu)"""
+    version = await cache.aget(CATALOG_VERSION_KEY, 0)
+    entry = _local_entry(version, key)
+    if entry is not None:
+        return entry
+
+    shared_key = _shared_key(version, key)
+    entry = await cache.aget(shared_key)
+    if entry is None:
+        entry = _render(await abuild())
+        await cache.aset(shared_key, entry, timeout=CATALOG_TIMEOUT)
+    _remember(version, key, entry)
+    return entry
+
+
+def _entry_response(request, entry):
+    body, etag = entry
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match and etag in parse_etags(if_none_match):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    response['Vary'] = 'Accept'
+    return response
+
+
+def catalog_response(request, build):
+    """Réponse JSON du catalogue, ou 304 si le client possède déjà cette version"""
+    return _entry_response(request, get_entry(request_key(request), build))
+
+
+async def acatalog_response(request, abuild):
+    """Variante asynchrone de catalog_response"""
+    return _entry_response(request, await aget_entry(request_key(request), abuild))
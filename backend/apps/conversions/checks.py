@@ -0,0 +1,27 @@
+"""
+Vérifications de configuration de l'application conversions (manage.py check)
+"""
+from django.conf import settings
+from django.core.checks import Error, register
+from django.utils.module_loading import import_string
+
+
+@register()
+def check_progress_channel(app_configs, **kwargs):
+    """Un canal en mémoire n'atteint pas les workers d'un autre processus"""
+    from .progress import MemoryChannel
+
+    try:
+        broker_class = import_string(settings.FILE_CONVERSION_BROKER)
+        channel_class = import_string(settings.FILE_PROGRESS_CHANNEL)
+    except ImportError as e:
+        return [Error(str(e), id='conversions.E001')]
+    if issubclass(channel_class, MemoryChannel) and not getattr(broker_class, 'in_process', False):
+        return [Error(
+            f"FILE_PROGRESS_CHANNEL ({settings.FILE_PROGRESS_CHANNEL}) ne reçoit pas la progression "
+            f"des workers de {settings.FILE_CONVERSION_BROKER}, qui tournent dans d'autres processus.",
+            hint="Utiliser apps.conversions.progress.RedisChannel (REDIS_URL), "
+                 "ou apps.conversions.jobs.MemoryBroker en développement.",
+            id='conversions.E002',
+        )]
+    return []
@@ -0,0 +1,92 @@
+"""
+Registre des convertisseurs de fichiers
+
+Un convertisseur est un appelable convert(source_path, destination_path,
+output_format, options) qui écrit le résultat dans destination_path. Il est
+enregistré pour un ensemble de formats d'entrée et de sortie. Il peut
+retourner un dictionnaire de statistiques (rows_processed, rows_failed) et,
+s'il a l'attribut reports_progress, recevoir progress(fraction).
+
+Les convertisseurs intégrés sont déclarés par leur chemin (BUILTIN_CONVERTERS)
+et leur module n'est importé qu'à la première conversion : un processus qui
+ne convertit pas de fichiers ne charge ni Pillow ni NumPy.
+"""
+from importlib import import_module
+
+
+class UnsupportedConversion(Exception):
+    """Aucun convertisseur pour ce couple de formats"""
+
+
+FORMAT_ALIASES = {
+    'jpg': 'jpeg',
+    'tif': 'tiff',
+    'jsonl': 'ndjson',
+}
+
+IMAGE_FORMATS = ['png', 'jpeg', 'webp', 'gif', 'bmp', 'tiff']
+TABLE_FORMATS = ['csv', 'ndjson']
+
+# (chemin du convertisseur, formats d'entrée, formats de sortie)
+BUILTIN_CONVERTERS = [
+    ('apps.conversions.converters.images.convert_image', IMAGE_FORMATS, IMAGE_FORMATS),
+    ('apps.conversions.converters.tabular.convert_table', TABLE_FORMATS, TABLE_FORMATS),
+]
+
+# (format d'entrée, format de sortie) -> convertisseur, ou son chemin tant qu'il n'est pas chargé
+_registry = {}
+
+
+def normalize_format(file_format):
+    file_format = (file_format or '').strip().lower().lstrip('.')
+    return FORMAT_ALIASES.get(file_format, file_format)
+
+
+def _add(converter, input_formats, output_formats):
+    for input_format in input_formats:
+        for output_format in output_formats:
+            _registry[(normalize_format(input_format), normalize_format(output_format))] = converter
+
+
+def register(input_formats, output_formats):
+    """Décorateur : enregistrer un convertisseur pour des couples de formats"""
+    def decorator(converter):
+        _add(converter, input_formats, output_formats)
+        return converter
+    return decorator
+
+
+def register_lazy(path, input_formats, output_formats):
+    """Enregistrer un convertisseur par son chemin « module.fonction », importé à la première utilisation"""
+    _add(path, input_formats, output_formats)
+
+
+def _load(path):
+    module_path, name = path.rsplit('.', 1)
+    return getattr(import_module(module_path), name)
+
+
+def get_converter(input_format, output_format):
+    key = (normalize_format(input_format), normalize_format(output_format))
+    try:
+        converter = _registry[key]
+    except KeyError:
+        raise UnsupportedConversion(
+            f"Conversion non supportée: {input_format} → {output_format}"
+        )
+    if isinstance(converter, str):
+        converter = _load(converter)
+        # Remplacer le chemin par l'appelable pour tous les couples qui le partagent
+        path = _registry[key]
+        for other_key, value in list(_registry.items()):
+            if value == path:
+                _registry[other_key] = converter
+    return converter
+
+
+def supported_conversions():
+    return sorted(_registry)
+
+
+for _path, _input_formats, _output_formats in BUILTIN_CONVERTERS:
+    register_lazy(_path, _input_formats, _output_formats)
@@ -0,0 +1,123 @@
+"""
+Convertisseur d'images (Pillow)
+
+Le décodage et l'encodage sont exécutés dans un ProcessPoolExecutor
+dimensionné sur le nombre de cœurs : le worker ne fait qu'attendre le
+résultat et ne garde pas le GIL. Les réductions JPEG utilisent
+Image.draft (décodage directement à l'échelle 1/2, 1/4 ou 1/8) puis
+Image.reduce avant le redimensionnement final, et l'image est enregistrée
+directement à son emplacement définitif.
+
+Ce module n'importe ni Django ni Pillow au chargement : il est importé
+dans les processus du pool.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+PIL_FORMATS = {
+    'png': 'PNG',
+    'jpeg': 'JPEG',
+    'webp': 'WEBP',
+    'gif': 'GIF',
+    'bmp': 'BMP',
+    'tiff': 'TIFF',
+}
+
+# Formats sans canal alpha
+OPAQUE_FORMATS = {'jpeg', 'bmp'}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def pool_size():
+    from django.conf import settings
+    return getattr(settings, 'IMAGE_CONVERSION_PROCESSES', 0) or os.cpu_count() or 1
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                # 'spawn' : le worker est multi-thread, fork n'est pas sûr
+                _executor = ProcessPoolExecutor(
+                    max_workers=pool_size(),
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+    return _executor
+
+
+def reset_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def target_size(options, width, height):
+    """Taille cible (proportions conservées), ou None si aucune réduction n'est demandée"""
+    max_width = options.get('max_width')
+    max_height = options.get('max_height')
+    scales = []
+    if max_width:
+        scales.append(int(max_width) / width)
+    if max_height:
+        scales.append(int(max_height) / height)
+    if not scales or min(scales) >= 1:
+        return None
+    scale = min(scales)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def save_options(output_format, options):
+    quality = options.get('quality')
+    if output_format == 'jpeg':
+        return {'quality': quality or 85, 'optimize': False}
+    if output_format == 'webp':
+        return {'quality': quality or 80, 'method': 4}
+    if output_format == 'png':
+        return {'compress_level': options.get('compress_level', 6)}
+    if output_format == 'tiff':
+        return {'compression': options.get('compression', 'tiff_deflate')}
+    return {}
+
+
+def convert_image_file(source_path, destination_path, output_format, options):
+    """Conversion exécutée dans un processus du pool"""
+    from PIL import Image
+
+    with Image.open(source_path) as image:
+        size = target_size(options, image.width, image.height)
+        if size:
+            # JPEG : décodage à l'échelle la plus proche sans passer en dessous de la cible
+            image.draft(None, size)
+            factor = min(image.width // size[0], image.height // size[1])
+            if factor >= 2:
+                image = image.reduce(factor)
+            image.thumbnail(size, Image.Resampling.LANCZOS)
+        else:
+            image.load()
+
+        if output_format in OPAQUE_FORMATS and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        elif image.mode == 'CMYK':
+            image = image.convert('RGB')
+
+        image.save(destination_path, format=PIL_FORMATS[output_format], **save_options(output_format, options))
+    return os.path.getsize(destination_path)
+
+
+def convert_image(source_path, destination_path, output_format, options):
+    try:
+        return get_executor().submit(
+            convert_image_file, source_path, destination_path, output_format, options or {}
+        ).result()
+    except BrokenProcessPool:
+        # Un processus du pool est mort (mémoire, signal) : recréer le pool
+        reset_executor()
+        raise
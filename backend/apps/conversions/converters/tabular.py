@@ -0,0 +1,212 @@
+"""
+Convertisseur de tableaux de mesures (CSV, NDJSON)
+
+Le fichier est lu ligne à ligne et traité par blocs de `chunk_size` lignes
+(chaîne de générateurs) : chaque colonne à convertir est évaluée sur tout
+le bloc en une seule opération vectorisée (batch.evaluate), puis le bloc est
+écrit dans le fichier de sortie. La mémoire utilisée dépend de la taille
+d'un bloc, pas de celle du fichier.
+
+Options :
+- columns : liste de {"column", "conversion_type_id", "input_unit",
+  "output_unit", "output_column"} (output_column par défaut :
+  « <column>_<output_unit> ») ; pour une seule colonne, ces clés peuvent
+  être données directement dans les options ;
+- exact : calcul en Decimal plutôt qu'en virgule flottante ;
+- chunk_size : nombre de lignes par bloc (10000 par défaut) ;
+- delimiter : séparateur CSV (« , » par défaut) ;
+- input_format : format déclaré de l'entrée (« csv » ou « ndjson »),
+  transmis par le worker ; à défaut, déduit de l'extension du fichier.
+
+Une valeur vide ou non numérique donne une cellule vide et la ligne est
+comptée dans rows_failed.
+
+Comme images.py, ce module n'importe pas Django au chargement.
+"""
+import csv
+import io
+import json
+import math
+import os
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+DEFAULT_CHUNK_SIZE = 10000
+MAX_CHUNK_SIZE = 100000
+
+ColumnSpec = namedtuple('ColumnSpec', ['column', 'output_column', 'plan'])
+
+
+def column_specs(options):
+    """Colonnes à convertir et leur transformation (moteur d'unités)"""
+    from ..engine import get_engine
+
+    columns = options.get('columns') or ([options] if 'column' in options else [])
+    if not columns:
+        raise ValueError("Option « columns » manquante : colonnes à convertir")
+    engine = get_engine()
+    specs = []
+    for column in columns:
+        try:
+            name = str(column['column'])
+            type_id = int(column['conversion_type_id'])
+            input_unit, output_unit = column['input_unit'], column['output_unit']
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(
+                "Colonne invalide : column, conversion_type_id, input_unit et output_unit sont requis"
+            )
+        conversion_type = engine.get_type(type_id)
+        if conversion_type is None:
+            raise ValueError(f"Type de conversion non trouvé : {type_id}")
+        specs.append(ColumnSpec(
+            name,
+            column.get('output_column') or f'{name}_{output_unit}',
+            engine.resolve(conversion_type, input_unit, output_unit)
+        ))
+    return specs
+
+
+def parse_number(value, exact):
+    """Valeur numérique d'une cellule (virgule décimale acceptée), ou None"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        value = repr(value)
+    value = str(value).strip().replace(',', '.')
+    if not value:
+        return None
+    try:
+        number = Decimal(value) if exact else float(value)
+    except (InvalidOperation, ValueError):
+        return None
+    finite = number.is_finite() if exact else math.isfinite(number)
+    return number if finite else None
+
+
+def read_csv(handle, delimiter):
+    reader = csv.DictReader(handle, delimiter=delimiter)
+    return list(reader.fieldnames or []), reader
+
+
+def read_ndjson(handle):
+    def rows():
+        for number, line in enumerate(handle, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                raise ValueError(f"Ligne {number} : JSON invalide")
+            if not isinstance(row, dict):
+                raise ValueError(f"Ligne {number} : objet JSON attendu")
+            yield row
+
+    rows = rows()
+    first = next(rows, None)
+    if first is None:
+        return [], iter(())
+    return list(first), _prepend(first, rows)
+
+
+def _prepend(first, rows):
+    yield first
+    yield from rows
+
+
+def chunks(rows, size):
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def convert_chunk(chunk, specs, exact):
+    """Convertir un bloc en place ; retourne le nombre de lignes en erreur"""
+    from ..batch import evaluate
+
+    failed = set()
+    for spec in specs:
+        indexes, values = [], []
+        for index, row in enumerate(chunk):
+            number = parse_number(row.get(spec.column), exact)
+            if number is None:
+                row[spec.output_column] = None
+                failed.add(index)
+            else:
+                indexes.append(index)
+                values.append(number)
+        results = evaluate(spec.plan, values, exact=exact, strict=False) if values else ()
+        for index, result in zip(indexes, results):
+            # Valeur hors limites : cellule vide, ligne comptée en erreur
+            chunk[index][spec.output_column] = result
+            if result is None:
+                failed.add(index)
+    return len(failed)
+
+
+def format_cell(value):
+    if value is None:
+        return ''
+    return str(value)
+
+
+def json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Valeur non sérialisable : {value!r}")
+
+
+def convert_table(source_path, destination_path, output_format, options, progress=None):
+    """
+    Convertir les colonnes d'un fichier CSV ou NDJSON bloc par bloc.
+    Retourne {'rows_processed': …, 'rows_failed': …}.
+    """
+    options = options or {}
+    specs = column_specs(options)
+    exact = bool(options.get('exact'))
+    chunk_size = min(max(int(options.get('chunk_size') or DEFAULT_CHUNK_SIZE), 1), MAX_CHUNK_SIZE)
+    delimiter = options.get('delimiter') or ','
+    input_format = options.get('input_format') or (
+        'ndjson' if os.path.splitext(source_path)[1].lower() in ('.ndjson', '.jsonl') else 'csv'
+    )
+    if input_format not in ('csv', 'ndjson'):
+        raise ValueError(f"Format d'entrée non supporté : {input_format}")
+    total_size = os.path.getsize(source_path) or 1
+
+    rows_processed = rows_failed = 0
+    with open(source_path, 'rb') as raw, \
+            io.TextIOWrapper(raw, encoding='utf-8-sig', newline='') as source, \
+            open(destination_path, 'w', encoding='utf-8', newline='') as destination:
+        if input_format == 'csv':
+            fieldnames, rows = read_csv(source, delimiter)
+        else:
+            fieldnames, rows = read_ndjson(source)
+        fieldnames += [spec.output_column for spec in specs if spec.output_column not in fieldnames]
+
+        writer = None
+        if output_format == 'csv':
+            writer = csv.DictWriter(destination, fieldnames=fieldnames, delimiter=delimiter,
+                                    extrasaction='ignore')
+            writer.writeheader()
+
+        for chunk in chunks(rows, chunk_size):
+            rows_failed += convert_chunk(chunk, specs, exact)
+            rows_processed += len(chunk)
+            if writer is not None:
+                writer.writerows(
+                    {key: format_cell(value) for key, value in row.items()} for row in chunk
+                )
+            else:
+                destination.write(''.join(
+                    json.dumps(row, ensure_ascii=False, default=json_default) + '\n' for row in chunk
+                ))
+            if progress is not None:
+                progress(min(raw.tell() / total_size, 1))
+
+    return {'rows_processed': rows_processed, 'rows_failed': rows_failed}
+
+
+# Le worker transmet une fonction progress(fraction) à ce convertisseur
+convert_table.reports_progress = True
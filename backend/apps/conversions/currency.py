@@ -0,0 +1,262 @@
+"""
+Taux de change
+
+Les taux sont récupérés auprès d'un fournisseur configurable
+(settings.CURRENCY_RATE_PROVIDER) sous la forme d'un seul vecteur :
+nombre d'unités de chaque devise pour une unité de la devise de base. Tout
+taux croisé s'en déduit (taux(A → B) = vecteur[B] / vecteur[A]) sans autre
+appel au fournisseur.
+
+Chaque récupération est conservée dans la table ExchangeRate (historique).
+Les conversions lisent le vecteur dans un cache en mémoire du processus :
+- frais (âge < CURRENCY_RATES_TTL) : utilisé tel quel ;
+- périmé mais utilisable (âge < CURRENCY_RATES_MAX_STALE) : utilisé, et un
+  rafraîchissement est lancé en arrière-plan (stale-while-revalidate) ;
+- absent ou trop ancien : erreur, et rafraîchissement en arrière-plan.
+Une requête n'attend donc jamais le fournisseur. Le rafraîchissement peut
+aussi être planifié avec la commande refresh_rates.
+"""
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .engine import Affine, ConversionError
+from .models import ExchangeRate
+
+logger = logging.getLogger(__name__)
+
+RATES_VERSION_KEY = 'conversions:rates:version'
+REFRESH_LOCK_KEY = 'conversions:rates:refreshing'
+# Délai minimal entre deux tentatives de rafraîchissement d'un processus
+RETRY_INTERVAL = 60
+# Précision des taux enregistrés (ExchangeRate.rate)
+RATE_QUANTUM = Decimal('1e-12')
+
+
+class RateProviderError(Exception):
+    """Le fournisseur de taux n'a pas pu répondre"""
+
+
+class RateProvider:
+    """Interface des fournisseurs de taux"""
+
+    def fetch(self, base):
+        """
+        Retourner (date des taux, {devise: taux}) pour une unité de base.
+        La devise de base peut être omise du dictionnaire.
+        """
+        raise NotImplementedError
+
+
+def parse_as_of(value):
+    """Date des taux (« 2024-03-01 » ou horodatage ISO, UTC si naïf) ; maintenant si absente"""
+    if not value:
+        return timezone.now()
+    try:
+        as_of = datetime.fromisoformat(str(value))
+    except ValueError:
+        raise RateProviderError(f"Date des taux invalide : {value}")
+    if timezone.is_naive(as_of):
+        as_of = as_of.replace(tzinfo=dt_timezone.utc)
+    return as_of
+
+
+class FixtureProvider(RateProvider):
+    """Taux lus dans un fichier JSON local (développement, tests, hors ligne)"""
+
+    DEFAULT_PATH = Path(__file__).resolve().parent / 'data' / 'currency_rates.json'
+
+    def __init__(self, path=None):
+        self.path = Path(path or settings.CURRENCY_RATES_FIXTURE or self.DEFAULT_PATH)
+
+    def fetch(self, base):
+        try:
+            with open(self.path, encoding='utf-8') as fixture:
+                data = json.load(fixture)
+        except (OSError, ValueError) as e:
+            raise RateProviderError(f"Fichier de taux illisible : {e}")
+        rates = {code: Decimal(str(rate)) for code, rate in data['rates'].items()}
+        rates[data['base']] = Decimal(1)
+        if base not in rates:
+            raise RateProviderError(f"Devise de base inconnue : {base}")
+        # Changement de base sans nouvelle lecture
+        pivot = rates[base]
+        return parse_as_of(data.get('date')), {code: rate / pivot for code, rate in rates.items()}
+
+
+class HTTPProvider(RateProvider):
+    """
+    Fournisseur HTTP renvoyant {"rates": {...}} (et éventuellement "date").
+    L'URL (CURRENCY_RATES_URL) peut contenir {base} et {api_key}.
+    """
+
+    def __init__(self, url=None, api_key=None, timeout=10):
+        self.url = url or settings.CURRENCY_RATES_URL
+        self.api_key = api_key if api_key is not None else settings.CURRENCY_API_KEY
+        self.timeout = timeout
+
+    def fetch(self, base):
+        import requests
+
+        try:
+            response = requests.get(
+                self.url.format(base=base, api_key=self.api_key), timeout=self.timeout
+            )
+            response.raise_for_status()
+            data = response.json()
+            rates = {code: Decimal(str(rate)) for code, rate in data['rates'].items()}
+        except (requests.RequestException, ValueError, KeyError) as e:
+            raise RateProviderError(f"Fournisseur de taux indisponible : {e}")
+        rates.setdefault(base, Decimal(1))
+        return parse_as_of(data.get('date')), rates
+
+
+def get_provider():
+    return import_string(settings.CURRENCY_RATE_PROVIDER)()
+
+
+def base_currency():
+    return settings.CURRENCY_BASE
+
+
+def store_rates(base, as_of, rates):
+    """Enregistrer un vecteur de taux (une ligne par devise, même fetched_at)"""
+    fetched_at = timezone.now()
+    # Précision de la table, pour que le cache et la base donnent les mêmes taux
+    rates = {code: rate.quantize(RATE_QUANTUM) for code, rate in rates.items()}
+    with transaction.atomic():
+        ExchangeRate.objects.bulk_create([
+            ExchangeRate(base=base, currency=code, rate=rate, as_of=as_of, fetched_at=fetched_at)
+            for code, rate in sorted(rates.items())
+        ])
+    try:
+        cache.incr(RATES_VERSION_KEY)
+    except ValueError:
+        cache.set(RATES_VERSION_KEY, 1, timeout=None)
+    return fetched_at, rates
+
+
+def load_latest(base):
+    """Dernier vecteur enregistré : (fetched_at, as_of, {devise: taux}) ou None"""
+    latest = (
+        ExchangeRate.objects.filter(base=base)
+        .order_by('-fetched_at')
+        .values_list('fetched_at', flat=True)
+        .first()
+    )
+    if latest is None:
+        return None
+    rows = ExchangeRate.objects.filter(base=base, fetched_at=latest).values_list('currency', 'rate', 'as_of')
+    rates = {}
+    as_of = None
+    for code, rate, as_of in rows:
+        rates[code] = rate
+    return latest, as_of, rates
+
+
+class RateCache:
+    """Vecteur de taux en mémoire, rafraîchi en arrière-plan"""
+
+    def __init__(self, base, ttl, max_stale):
+        self.base = base
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._snapshot = None
+        self._version = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._last_attempt = 0
+
+    def snapshot(self):
+        """(fetched_at, as_of, taux) courant, sans jamais appeler le fournisseur"""
+        version = cache.get(RATES_VERSION_KEY, 0)
+        if self._snapshot is None or self._version != version:
+            # Nouveau vecteur enregistré par un autre processus : relire la table
+            snapshot = load_latest(self.base)
+            with self._lock:
+                self._snapshot, self._version = snapshot, version
+
+        snapshot = self._snapshot
+        age = (timezone.now() - snapshot[0]).total_seconds() if snapshot else None
+        if age is None or age > self.ttl:
+            self.refresh_in_background()
+        if age is None or age > self.max_stale:
+            raise ConversionError("Taux de change indisponibles pour le moment")
+        return snapshot
+
+    def rates(self):
+        return self.snapshot()[2]
+
+    def refresh(self):
+        """Récupérer un nouveau vecteur auprès du fournisseur (appel bloquant)"""
+        as_of, rates = get_provider().fetch(self.base)
+        fetched_at, rates = store_rates(self.base, as_of, rates)
+        with self._lock:
+            self._snapshot = (fetched_at, as_of, rates)
+            self._version = cache.get(RATES_VERSION_KEY, 0)
+        return self._snapshot
+
+    def refresh_in_background(self):
+        with self._lock:
+            if self._refreshing or time.monotonic() - self._last_attempt < RETRY_INTERVAL:
+                return
+            self._refreshing = True
+            self._last_attempt = time.monotonic()
+        thread = threading.Thread(target=self._background_refresh, name='currency-rates-refresh', daemon=True)
+        thread.start()
+
+    def _background_refresh(self):
+        try:
+            # Un seul rafraîchissement à la fois pour tous les processus
+            if not cache.add(REFRESH_LOCK_KEY, True, timeout=RETRY_INTERVAL):
+                return
+            try:
+                self.refresh()
+            finally:
+                cache.delete(REFRESH_LOCK_KEY)
+        except Exception:
+            logger.exception("Échec du rafraîchissement des taux de change")
+        finally:
+            close_old_connections()
+            with self._lock:
+                self._refreshing = False
+
+
+_rate_cache = None
+_rate_cache_lock = threading.Lock()
+
+
+def get_rate_cache():
+    global _rate_cache
+    if _rate_cache is None:
+        with _rate_cache_lock:
+            if _rate_cache is None:
+                _rate_cache = RateCache(
+                    base_currency(),
+                    ttl=settings.CURRENCY_RATES_TTL,
+                    max_stale=settings.CURRENCY_RATES_MAX_STALE,
+                )
+    return _rate_cache
+
+
+def cross_rate(rates, source, target):
+    try:
+        return rates[target] / rates[source]
+    except KeyError as e:
+        raise ConversionError(f"Devise inconnue : {e.args[0]}")
+
+
+def currency_transform(input_unit, output_unit):
+    """Transformation linéaire entre deux devises (taux croisé)"""
+    rates = get_rate_cache().rates()
+    return Affine(cross_rate(rates, input_unit.upper(), output_unit.upper()), Decimal(0))
@@ -0,0 +1,157 @@
+"""
+Téléchargement des fichiers convertis
+
+Les fichiers sont servis sans être chargés en mémoire : FileResponse
+transmet le descripteur au serveur WSGI (wsgi.file_wrapper, sendfile avec
+gunicorn), ou la réponse est déléguée au serveur web via X-Accel-Redirect
+(nginx) ou X-Sendfile (Apache, lighttpd) selon settings.FILE_DOWNLOAD_BACKEND.
+
+Les requêtes Range (une seule plage), If-Range, ETag et If-None-Match sont
+prises en charge pour permettre la reprise des téléchargements.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, HttpResponseRedirect
+from django.utils.http import http_date, parse_etags
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange:
+    """
+    Fichier limité à une plage d'octets.
+
+    Le descripteur est positionné au début de la plage : gunicorn peut
+    alors utiliser sendfile avec la longueur annoncée par Content-Length.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def file_etag(stat):
+    """ETag fort dérivé de la date de modification et de la taille"""
+    return '"%x-%x"' % (stat.st_mtime_ns, stat.st_size)
+
+
+def parse_range(header, size):
+    """
+    Analyser un en-tête Range.
+
+    Retourne (début, fin incluse), None si l'en-tête est absent, invalide ou
+    demande plusieurs plages (le fichier entier est alors envoyé), ou lève
+    ValueError si la plage ne peut pas être satisfaite.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffixe : les N derniers octets
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, end
+
+
+def content_disposition(filename):
+    try:
+        filename.encode('ascii')
+        return f'attachment; filename="{filename}"'
+    except UnicodeEncodeError:
+        return f"attachment; filename*=utf-8''{quote(filename)}"
+
+
+def serve_file(request, field_file, filename=None):
+    """Réponse HTTP pour un FieldFile (plage, validation conditionnelle, délégation)"""
+    storage = field_file.storage
+    try:
+        path = storage.path(field_file.name)
+    except NotImplementedError:
+        # Stockage distant : le fournisseur sert lui-même les plages
+        return HttpResponseRedirect(field_file.url)
+
+    stat = os.stat(path)
+    etag = file_etag(stat)
+    filename = filename or os.path.basename(field_file.name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': 'private, max-age=3600',
+    }
+
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match and (if_none_match.strip() == '*' or etag in parse_etags(if_none_match)):
+        response = HttpResponseNotModified()
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    backend = getattr(settings, 'FILE_DOWNLOAD_BACKEND', 'django')
+    if backend == 'x-accel-redirect':
+        # nginx sert le fichier (et les plages) depuis un emplacement internal
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = quote(settings.FILE_DOWNLOAD_ACCEL_PREFIX + field_file.name)
+    elif backend == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+    else:
+        response = _file_response(request, path, stat.st_size, etag, content_type)
+    for header, value in headers.items():
+        response[header] = value
+    response['Content-Disposition'] = content_disposition(filename)
+    return response
+
+
+def _file_response(request, path, size, etag, content_type):
+    byte_range = None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    # If-Range : la plage n'est valable que si le fichier n'a pas changé
+    if not if_range or if_range.strip() == etag:
+        try:
+            byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    file = open(path, 'rb')
+    if byte_range is None:
+        return FileResponse(file, content_type=content_type)
+
+    start, end = byte_range
+    length = end - start + 1
+    response = FileResponse(FileRange(file, start, length), status=206, content_type=content_type)
+    response['Content-Length'] = str(length)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
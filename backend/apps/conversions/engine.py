@@ -0,0 +1,256 @@
+"""
+Moteur de conversion d'unités
+
+Toutes les unités connues sont chargées une seule fois dans un graphe en
+mémoire. La fermeture transitive (facteur, décalage) est précalculée pour
+chaque composante connexe : une conversion d'une unité vers une autre se
+résume donc à une seule recherche dans un dictionnaire.
+"""
+import threading
+from collections import deque, namedtuple
+from decimal import Decimal, InvalidOperation
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+from .formula import FormulaError, get_formula
+
+
+class ConversionError(Exception):
+    """Conversion impossible (unités inconnues ou incompatibles)"""
+
+
+# Précision stockée dans l'historique (DecimalField(max_digits=20, decimal_places=10))
+OUTPUT_QUANTUM = Decimal('1e-10')
+OUTPUT_MAX = Decimal('1e10')
+
+# Clé de cache partagée entre les processus pour propager les invalidations
+ENGINE_VERSION_KEY = 'conversions:engine:version'
+
+# Catégorie dont les taux sont fournis par le service de taux de change
+CURRENCY_CATEGORY = 'devises'
+
+
+class Affine(namedtuple('Affine', ['factor', 'offset'])):
+    """Transformation affine y = x × factor + offset"""
+
+    def apply(self, value):
+        return value * self.factor + self.offset
+
+    def then(self, other):
+        """Composer : appliquer self puis other"""
+        return Affine(self.factor * other.factor, self.offset * other.factor + other.offset)
+
+    def inverse(self):
+        return Affine(1 / self.factor, -self.offset / self.factor)
+
+    @property
+    def affine(self):
+        return self
+
+
+IDENTITY = Affine(Decimal(1), Decimal(0))
+
+
+# Unités intégrées : symbole -> (dimension, transformation vers l'unité de base)
+UNIT_DEFINITIONS = {
+    # Longueur (base : mètre)
+    'm': ('longueur', Affine(Decimal('1'), Decimal('0'))),
+    'km': ('longueur', Affine(Decimal('1000'), Decimal('0'))),
+    'cm': ('longueur', Affine(Decimal('0.01'), Decimal('0'))),
+    'mm': ('longueur', Affine(Decimal('0.001'), Decimal('0'))),
+    'in': ('longueur', Affine(Decimal('0.0254'), Decimal('0'))),
+    'ft': ('longueur', Affine(Decimal('0.3048'), Decimal('0'))),
+    'yd': ('longueur', Affine(Decimal('0.9144'), Decimal('0'))),
+    'mi': ('longueur', Affine(Decimal('1609.344'), Decimal('0'))),
+    # Masse (base : kilogramme)
+    'kg': ('masse', Affine(Decimal('1'), Decimal('0'))),
+    'g': ('masse', Affine(Decimal('0.001'), Decimal('0'))),
+    'mg': ('masse', Affine(Decimal('0.000001'), Decimal('0'))),
+    't': ('masse', Affine(Decimal('1000'), Decimal('0'))),
+    'lb': ('masse', Affine(Decimal('0.45359237'), Decimal('0'))),
+    'oz': ('masse', Affine(Decimal('0.028349523125'), Decimal('0'))),
+    # Température (base : kelvin)
+    'K': ('temperature', Affine(Decimal('1'), Decimal('0'))),
+    '°C': ('temperature', Affine(Decimal('1'), Decimal('273.15'))),
+    '°F': ('temperature', Affine(Decimal(5) / Decimal(9), Decimal('459.67') * Decimal(5) / Decimal(9))),
+    # Volume (base : litre)
+    'l': ('volume', Affine(Decimal('1'), Decimal('0'))),
+    'ml': ('volume', Affine(Decimal('0.001'), Decimal('0'))),
+    'm³': ('volume', Affine(Decimal('1000'), Decimal('0'))),
+    'gal': ('volume', Affine(Decimal('3.785411784'), Decimal('0'))),
+}
+
+
+TypeInfo = namedtuple('TypeInfo', [
+    'id', 'slug', 'category_id', 'category_slug', 'input_unit', 'output_unit',
+    'formula', 'updated_at',
+])
+
+
+class UnitGraph:
+    """Graphe des unités avec fermeture transitive précalculée"""
+
+    def __init__(self, closure, types, units=frozenset()):
+        self.closure = closure
+        self.types = types
+        # Symboles connus : unités du graphe et unités déclarées par les types
+        self.units = units
+
+    @classmethod
+    def build(cls, conversion_types, definitions=UNIT_DEFINITIONS):
+        """
+        Construire le graphe à partir des unités intégrées et des types de
+        conversion (chaque type disposant d'un facteur ajoute une arête).
+        """
+        edges = {}
+
+        def add_edge(source, target, transform):
+            edges.setdefault(source, []).append((target, transform))
+            edges.setdefault(target, []).append((source, transform.inverse()))
+
+        for symbol, (dimension, to_base) in definitions.items():
+            add_edge(symbol, ('dimension', dimension), to_base)
+
+        types = {}
+        symbols = set(definitions)
+        for conversion_type in conversion_types:
+            symbols.update((conversion_type.input_unit, conversion_type.output_unit))
+            types[conversion_type.id] = TypeInfo(
+                id=conversion_type.id,
+                slug=conversion_type.slug,
+                category_id=conversion_type.category_id,
+                category_slug=conversion_type.category.slug,
+                input_unit=conversion_type.input_unit,
+                output_unit=conversion_type.output_unit,
+                formula=conversion_type.formula,
+                updated_at=conversion_type.updated_at,
+            )
+            if conversion_type.factor:
+                add_edge(
+                    conversion_type.input_unit,
+                    conversion_type.output_unit,
+                    Affine(conversion_type.factor, conversion_type.offset or Decimal(0)),
+                )
+
+        # Parcours en largeur depuis une racine par composante connexe :
+        # chaque unité reçoit sa transformation vers la racine.
+        closure = {}
+        visited = set()
+        for root in edges:
+            if root in visited:
+                continue
+            to_root = {root: IDENTITY}
+            queue = deque([root])
+            visited.add(root)
+            while queue:
+                node = queue.popleft()
+                for neighbour, transform in edges[node]:
+                    if neighbour in visited:
+                        continue
+                    visited.add(neighbour)
+                    # neighbour -> node -> racine
+                    to_root[neighbour] = transform.inverse().then(to_root[node])
+                    queue.append(neighbour)
+
+            units = [node for node in to_root if isinstance(node, str)]
+            for source in units:
+                for target in units:
+                    closure[(source, target)] = to_root[source].then(to_root[target].inverse())
+
+        return cls(closure, types, frozenset(symbols))
+
+    def get_type(self, type_id):
+        return self.types.get(type_id)
+
+    def transform(self, input_unit, output_unit):
+        """Récupérer la transformation entre deux unités (une seule recherche)"""
+        try:
+            return self.closure[(input_unit, output_unit)]
+        except KeyError:
+            raise ConversionError(
+                f"Conversion impossible de « {input_unit} » vers « {output_unit} »"
+            )
+
+    def convert(self, value, input_unit, output_unit):
+        return quantize_output(self.transform(input_unit, output_unit).apply(value))
+
+    def resolve(self, conversion_type, input_unit, output_unit):
+        """
+        Choisir la transformation pour un type donné : la formule du type est
+        utilisée dans le sens qu'elle décrit, le graphe dans tous les autres cas.
+        Le résultat expose apply(valeur) et affine ((facteur, décalage) ou None).
+        Les devises utilisent les taux de change courants (module currency).
+        """
+        if conversion_type.category_slug == CURRENCY_CATEGORY:
+            from .currency import currency_transform
+            return currency_transform(input_unit, output_unit)
+        if (input_unit, output_unit) == (conversion_type.input_unit, conversion_type.output_unit):
+            formula = get_formula(conversion_type)
+            if formula is not None:
+                return formula
+        return self.transform(input_unit, output_unit)
+
+    def convert_with_type(self, conversion_type, value, input_unit, output_unit):
+        try:
+            return quantize_output(self.resolve(conversion_type, input_unit, output_unit).apply(value))
+        except FormulaError as e:
+            raise ConversionError(str(e))
+
+
+def quantize_output(value):
+    """Arrondir une valeur à la précision de l'historique"""
+    try:
+        value = Decimal(value).quantize(OUTPUT_QUANTUM)
+    except InvalidOperation:
+        raise ConversionError("Résultat hors limites")
+    if abs(value) >= OUTPUT_MAX:
+        raise ConversionError("Résultat hors limites")
+    return value
+
+
+_engine = None
+_engine_version = None
+_engine_lock = threading.Lock()
+
+
+def load_conversion_types():
+    from .models import ConversionType
+    return ConversionType.objects.filter(is_active=True).select_related('category')
+
+
+def get_engine():
+    """
+    Récupérer le moteur courant, reconstruit uniquement lorsque la version
+    partagée a changé (modification d'un type de conversion).
+    """
+    global _engine, _engine_version
+    version = cache.get(ENGINE_VERSION_KEY, 0)
+    engine = _engine
+    if engine is not None and _engine_version == version:
+        return engine
+
+    with _engine_lock:
+        if _engine is None or _engine_version != version:
+            _engine = UnitGraph.build(load_conversion_types())
+            _engine_version = version
+        return _engine
+
+
+async def aget_engine():
+    """Variante asynchrone : reconstruction éventuelle dans un thread"""
+    version = await cache.aget(ENGINE_VERSION_KEY, 0)
+    engine = _engine
+    if engine is not None and _engine_version == version:
+        return engine
+    return await sync_to_async(get_engine)()
+
+
+def invalidate_engine():
+    """Forcer la reconstruction du moteur dans tous les processus"""
+    global _engine
+    try:
+        cache.incr(ENGINE_VERSION_KEY)
+    except ValueError:
+        cache.set(ENGINE_VERSION_KEY, 1, timeout=None)
+    _engine = None
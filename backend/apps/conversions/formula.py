@@ -0,0 +1,212 @@
+"""
+Compilateur de formules de conversion
+
+Les formules des types de conversion (ex: « F = C × 9/5 + 32 ») sont
+analysées une seule fois avec le module ast puis compilées en fermetures
+Python qui calculent en Decimal. Seuls les nombres, la variable d'entrée et
+les opérateurs arithmétiques sont acceptés (exposants constants et bornés) :
+eval n'est jamais appelé. Un texte libre (« Manuel », « Taux de change en
+temps réel ») n'est pas une formule.
+"""
+import ast
+import operator
+import re
+from decimal import Decimal, DecimalException
+from functools import lru_cache
+
+
+class FormulaError(Exception):
+    """Formule invalide ou non autorisée"""
+
+
+MAX_FORMULA_LENGTH = 256
+FORMULA_CACHE_SIZE = 256
+# Valeur absolue maximale d'un exposant (a ** b)
+MAX_EXPONENT = 100
+
+# Nom de variable toujours accepté pour l'entrée, en plus de celui de l'unité
+DEFAULT_VARIABLE = 'x'
+
+BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+
+UNARY_OPERATORS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+# Notation usuelle -> syntaxe Python
+SUBSTITUTIONS = [
+    ('×', '*'),
+    ('·', '*'),
+    ('÷', '/'),
+    ('−', '-'),
+    ('^', '**'),
+]
+DECIMAL_COMMA = re.compile(r'(?<=\d),(?=\d)')
+
+
+def split(formula):
+    """(membre gauche ou '', membre droit ramené à la syntaxe Python)"""
+    expression = formula.strip()
+    target = ''
+    if '=' in expression:
+        target, _, expression = expression.partition('=')
+        target = target.strip()
+        if not target or '=' in expression:
+            raise FormulaError("Formule mal formée")
+    for source, replacement in SUBSTITUTIONS:
+        expression = expression.replace(source, replacement)
+    return target, DECIMAL_COMMA.sub('.', expression).strip()
+
+
+def normalize(formula):
+    """Extraire le membre droit d'une formule et le ramener à la syntaxe Python"""
+    return split(formula)[1]
+
+
+def input_variables(input_unit):
+    """Noms acceptés pour la variable d'entrée : « x » et le symbole de l'unité (« °C » → « C »)"""
+    names = {DEFAULT_VARIABLE}
+    name = re.sub(r'\W', '', input_unit or '')
+    if name.isidentifier():
+        names.add(name)
+    return frozenset(names)
+
+
+class CompiledFormula:
+    """
+    Formule compilée : appelable avec une valeur Decimal. L'attribut affine
+    contient (facteur, décalage) lorsque la formule est de la forme a·x + b,
+    ce qui permet son évaluation vectorisée.
+    """
+
+    def __init__(self, source, variable, function, affine=None):
+        self.source = source
+        self.variable = variable
+        self.affine = affine
+        self._function = function
+
+    def __call__(self, value):
+        try:
+            return self._function(Decimal(value))
+        except (DecimalException, ArithmeticError) as e:
+            raise FormulaError(f"Erreur d'évaluation de la formule: {e}")
+
+    apply = __call__
+
+    def __repr__(self):
+        return f"<CompiledFormula {self.source!r}>"
+
+
+def compile_formula(formula, variables=None):
+    """
+    Analyser et compiler une formule dont le membre droit utilise exactement
+    une variable, la variable d'entrée (un nom de `variables` s'il est donné)
+    """
+    if not formula or len(formula) > MAX_FORMULA_LENGTH:
+        raise FormulaError("Formule vide ou trop longue")
+
+    target, expression = split(formula)
+    try:
+        tree = ast.parse(expression, mode='eval')
+    except SyntaxError:
+        raise FormulaError("Formule mal formée")
+    if isinstance(tree.body, ast.Name):
+        # Texte libre d'un seul mot (« Manuel ») : pas une formule
+        raise FormulaError("La formule doit être un calcul sur la variable d'entrée")
+
+    used = set()
+
+    def build(node):
+        """Retourner (fonction, forme affine (a, b) ou None)"""
+        if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+            if isinstance(node.op, ast.Pow):
+                check_exponent(node.right)
+            op = BINARY_OPERATORS[type(node.op)]
+            (left, left_affine), (right, right_affine) = build(node.left), build(node.right)
+            return (lambda x: op(left(x), right(x))), combine(node.op, left_affine, right_affine)
+        if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPERATORS:
+            op = UNARY_OPERATORS[type(node.op)]
+            operand, operand_affine = build(node.operand)
+            affine = None
+            if operand_affine is not None:
+                affine = (op(operand_affine[0]), op(operand_affine[1]))
+            return (lambda x: op(operand(x))), affine
+        if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+            constant = Decimal(repr(node.value))
+            return (lambda x: constant), (Decimal(0), constant)
+        if isinstance(node, ast.Name):
+            used.add(node.id)
+            return (lambda x: x), (Decimal(1), Decimal(0))
+        raise FormulaError(f"Élément non autorisé dans la formule: {type(node).__name__}")
+
+    function, affine = build(tree.body)
+    if len(used) != 1:
+        raise FormulaError("La formule doit utiliser une seule variable, la variable d'entrée")
+    variable = next(iter(used))
+    if variable == target:
+        raise FormulaError("La variable d'entrée ne peut pas être la variable calculée")
+    if variables is not None and variable not in variables:
+        raise FormulaError(
+            f"Variable inconnue « {variable} » (attendu : {', '.join(sorted(variables))})"
+        )
+
+    return CompiledFormula(formula, variable, function, affine)
+
+
+def check_exponent(node):
+    """Exposant constant (éventuellement négatif) et borné par MAX_EXPONENT"""
+    operand = node.operand if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPERATORS else node
+    if not (isinstance(operand, ast.Constant) and type(operand.value) in (int, float)):
+        raise FormulaError("L'exposant doit être un nombre")
+    if abs(operand.value) > MAX_EXPONENT:
+        raise FormulaError(f"Exposant trop grand (au plus {MAX_EXPONENT})")
+
+
+def combine(op, left, right):
+    """Forme affine d'une opération binaire, ou None si elle n'est pas affine"""
+    if left is None or right is None:
+        return None
+    (a1, b1), (a2, b2) = left, right
+    try:
+        if isinstance(op, ast.Add):
+            return (a1 + a2, b1 + b2)
+        if isinstance(op, ast.Sub):
+            return (a1 - a2, b1 - b2)
+        if isinstance(op, ast.Mult) and (not a1 or not a2):
+            return (a1 * b2 + a2 * b1, b1 * b2)
+        if isinstance(op, ast.Div) and not a2 and b2:
+            return (a1 / b2, b1 / b2)
+        if isinstance(op, (ast.Pow, ast.Mod)) and not a1 and not a2:
+            return (Decimal(0), BINARY_OPERATORS[type(op)](b1, b2))
+    except (DecimalException, ArithmeticError):
+        pass
+    return None
+
+
+@lru_cache(maxsize=FORMULA_CACHE_SIZE)
+def _compile_cached(type_id, updated_at, formula, input_unit):
+    try:
+        return compile_formula(formula, input_variables(input_unit))
+    except FormulaError:
+        # Mettre aussi en cache les formules non évaluables (texte libre)
+        return None
+
+
+def get_formula(conversion_type):
+    """
+    Récupérer la formule compilée d'un type de conversion, ou None si elle
+    n'est pas évaluable. Le cache est indexé par (id, updated_at).
+    """
+    if not conversion_type.formula:
+        return None
+    return _compile_cached(
+        conversion_type.id, conversion_type.updated_at, conversion_type.formula, conversion_type.input_unit
+    )
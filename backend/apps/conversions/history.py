@@ -0,0 +1,225 @@
+"""
+Écriture de l'historique des conversions
+
+Par défaut chaque conversion est enregistrée immédiatement. En mode
+« write-behind » (settings.CONVERSION_HISTORY['WRITE_BEHIND']), les
+enregistrements sont placés dans une file bornée en mémoire puis écrits par
+un thread d'arrière-plan avec bulk_create, par lots ou à intervalle régulier.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from apps.core.counters import count_conversions
+
+from .models import Conversion
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'WRITE_BEHIND': False,
+    'MAX_QUEUE_SIZE': 10000,
+    'BATCH_SIZE': 500,
+    'FLUSH_INTERVAL': 1.0,
+    # 'drop' : ignorer les nouveaux enregistrements si la file est pleine
+    # 'block' : attendre jusqu'à OVERFLOW_TIMEOUT secondes puis ignorer
+    # 'sync' : écrire directement dans la requête en cours
+    'OVERFLOW_POLICY': 'drop',
+    'OVERFLOW_TIMEOUT': 0.05,
+}
+
+
+def get_history_settings():
+    return {**DEFAULTS, **getattr(settings, 'CONVERSION_HISTORY', {})}
+
+
+class HistoryWriter:
+    """File bornée d'enregistrements Conversion vidée par un thread d'arrière-plan"""
+
+    def __init__(self, max_queue_size, batch_size, flush_interval,
+                 overflow_policy='drop', overflow_timeout=0.05):
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.overflow_timeout = overflow_timeout
+        self._counters = {'enqueued': 0, 'flushed': 0, 'dropped': 0, 'failed': 0, 'sync': 0}
+        self._counters_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self._stopping = threading.Event()
+        self._atexit_registered = False
+
+    def _increment(self, name, count=1):
+        with self._counters_lock:
+            self._counters[name] += count
+
+    def stats(self):
+        with self._counters_lock:
+            counters = dict(self._counters)
+        counters['queued'] = self._queue.qsize() if self._queue is not None else 0
+        return counters
+
+    def _ensure_started(self):
+        # Après un fork (gunicorn --preload), le thread du parent n'existe plus
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._start_lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._queue = queue.Queue(maxsize=self.max_queue_size)
+            self._stopping.clear()
+            self._thread = threading.Thread(
+                target=self._run, name='conversion-history-writer', daemon=True
+            )
+            self._thread.start()
+            # Une seule inscription, même si le thread est redémarré (fork, stop)
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
+
+    def record(self, conversions):
+        """Placer des conversions dans la file sans attendre la base de données"""
+        self._ensure_started()
+        for index, conversion in enumerate(conversions):
+            try:
+                if self.overflow_policy == 'block':
+                    self._queue.put(conversion, timeout=self.overflow_timeout)
+                else:
+                    self._queue.put_nowait(conversion)
+            except queue.Full:
+                remaining = conversions[index:]
+                if self.overflow_policy == 'sync':
+                    # Les échecs sont comptés dans 'failed' par _write
+                    if self._write(remaining):
+                        self._increment('sync', len(remaining))
+                else:
+                    self._increment('dropped', len(remaining))
+                    logger.warning("File d'historique pleine : %d conversion(s) ignorée(s)", len(remaining))
+                return
+            self._increment('enqueued')
+
+    def _drain(self, timeout):
+        """Récupérer un lot (au plus batch_size éléments ou jusqu'au délai)"""
+        batch = []
+        deadline = time.monotonic() + timeout
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        try:
+            Conversion.objects.bulk_create(batch, batch_size=self.batch_size)
+        except Exception:
+            self._increment('failed', len(batch))
+            logger.exception("Échec de l'écriture de %d conversion(s) dans l'historique", len(batch))
+            return False
+        # bulk_create n'envoie pas post_save : compteurs mis à jour pour le lot
+        count_conversions(batch)
+        return True
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._drain(self.flush_interval)
+            if not batch:
+                continue
+            # Le thread garde sa propre connexion : la renouveler si elle est périmée
+            close_old_connections()
+            if self._write(batch):
+                self._increment('flushed', len(batch))
+
+    def flush(self):
+        """Écrire immédiatement tout ce qui est en attente (thread appelant)"""
+        if self._queue is None:
+            return
+        while True:
+            batch = self._drain(0)
+            if not batch:
+                break
+            if self._write(batch):
+                self._increment('flushed', len(batch))
+
+    def stop(self, timeout=5):
+        """Arrêter le thread et vider la file (arrêt du worker)"""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self.flush()
+        self._thread = None
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                options = get_history_settings()
+                _writer = HistoryWriter(
+                    max_queue_size=options['MAX_QUEUE_SIZE'],
+                    batch_size=options['BATCH_SIZE'],
+                    flush_interval=options['FLUSH_INTERVAL'],
+                    overflow_policy=options['OVERFLOW_POLICY'],
+                    overflow_timeout=options['OVERFLOW_TIMEOUT'],
+                )
+    return _writer
+
+
+def record_conversions(conversions):
+    """
+    Enregistrer des conversions dans l'historique.
+
+    Retourne True si elles ont été écrites immédiatement (les instances ont
+    alors un identifiant), False si elles ont été confiées au write-behind.
+    """
+    if not conversions:
+        return True
+    if get_history_settings()['WRITE_BEHIND']:
+        get_writer().record(conversions)
+        return False
+    if len(conversions) == 1:
+        conversions[0].save(force_insert=True)
+    else:
+        Conversion.objects.bulk_create(conversions, batch_size=1000)
+        count_conversions(conversions)
+    return True
+
+
+async def arecord_conversions(conversions):
+    """Variante asynchrone de record_conversions"""
+    if not conversions:
+        return True
+    history_settings = get_history_settings()
+    if history_settings['WRITE_BEHIND']:
+        if history_settings['OVERFLOW_POLICY'] == 'drop':
+            # Simple dépôt dans la file, sans attente
+            get_writer().record(conversions)
+            return False
+        return await sync_to_async(record_conversions)(conversions)
+    if len(conversions) == 1:
+        await conversions[0].asave(force_insert=True)
+    else:
+        await Conversion.objects.abulk_create(conversions, batch_size=1000)
+        await sync_to_async(count_conversions)(conversions)
+    return True
@@ -0,0 +1,396 @@
+"""
+File d'attente des conversions de fichiers
+
+La vue process se contente de placer un travail dans un broker ; les
+workers (commande run_conversion_worker) le récupèrent et font passer la
+FileConversion par les états pending → processing → completed/failed.
+
+Le broker est configurable (settings.FILE_CONVERSION_BROKER) :
+- MemoryBroker : file en mémoire et threads dans le processus courant,
+  pour le développement local ;
+- SQLiteBroker : file persistante dans un fichier SQLite partagé par les
+  processus de la machine.
+Dans les deux cas, le nombre de travaux simultanés peut être limité par
+format de sortie (settings.FILE_CONVERSION_FORMAT_LIMITS, ex: {'pdf': 1}).
+"""
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter, deque, namedtuple
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.db import close_old_connections
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .converters import get_converter, normalize_format
+from .models import FileConversion
+from .progress import publish
+from .storage import lookup_result, remember_result
+
+logger = logging.getLogger(__name__)
+
+
+Job = namedtuple('Job', ['id', 'file_conversion_id', 'format', 'attempts'])
+
+
+class BaseBroker:
+    """Interface commune des brokers"""
+
+    # Travaux traités dans le processus web (sinon par des workers séparés,
+    # qui exigent un canal de progression partagé)
+    in_process = False
+
+    def __init__(self, format_limits=None):
+        self.format_limits = {
+            normalize_format(file_format): limit
+            for file_format, limit in (format_limits or {}).items()
+        }
+
+    def limit_for(self, file_format):
+        return self.format_limits.get(file_format)
+
+    def enqueue(self, file_conversion_id, file_format):
+        """Ajouter un travail ; retourne son identifiant"""
+        raise NotImplementedError
+
+    def claim(self, timeout):
+        """Réserver le prochain travail autorisé, ou None après timeout secondes"""
+        raise NotImplementedError
+
+    def complete(self, job):
+        """Retirer un travail terminé (succès ou échec)"""
+        raise NotImplementedError
+
+    def depth(self):
+        """Nombre de travaux en attente"""
+        raise NotImplementedError
+
+
+class MemoryBroker(BaseBroker):
+    """File en mémoire traitée par des threads du processus courant"""
+
+    in_process = True
+
+    def __init__(self, format_limits=None, workers=2):
+        super().__init__(format_limits)
+        self._jobs = deque()
+        self._running = Counter()
+        self._condition = threading.Condition()
+        self._next_id = 0
+        self._workers = workers
+        self._worker = None
+
+    def enqueue(self, file_conversion_id, file_format):
+        with self._condition:
+            self._next_id += 1
+            self._jobs.append(Job(self._next_id, file_conversion_id, normalize_format(file_format), 1))
+            self._condition.notify()
+            job_id = self._next_id
+        if self._worker is None and self._workers:
+            self._worker = Worker(self, concurrency=self._workers)
+            self._worker.start()
+        return job_id
+
+    def _pick(self):
+        for job in self._jobs:
+            limit = self.limit_for(job.format)
+            if limit is None or self._running[job.format] < limit:
+                self._jobs.remove(job)
+                self._running[job.format] += 1
+                return job
+        return None
+
+    def claim(self, timeout):
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                job = self._pick()
+                remaining = deadline - time.monotonic()
+                if job is not None or remaining <= 0:
+                    return job
+                self._condition.wait(remaining)
+
+    def complete(self, job):
+        with self._condition:
+            self._running[job.format] -= 1
+            self._condition.notify_all()
+
+    def depth(self):
+        with self._condition:
+            return len(self._jobs)
+
+
+class SQLiteBroker(BaseBroker):
+    """File persistante dans un fichier SQLite, partagée entre processus"""
+
+    POLL_INTERVAL = 0.2
+
+    def __init__(self, path=None, format_limits=None, visibility_timeout=3600):
+        super().__init__(format_limits)
+        self.path = str(path or Path(settings.BASE_DIR) / 'jobs.sqlite3')
+        # Un travail réservé depuis plus longtemps est considéré comme abandonné
+        self.visibility_timeout = visibility_timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or getattr(self._local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    file_conversion_id INTEGER NOT NULL,
+                    format TEXT NOT NULL,
+                    state TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    enqueued_at REAL NOT NULL,
+                    claimed_at REAL
+                )
+            """)
+            connection.execute('CREATE INDEX IF NOT EXISTS jobs_state_id ON jobs (state, id)')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def enqueue(self, file_conversion_id, file_format):
+        cursor = self._connection().execute(
+            'INSERT INTO jobs (file_conversion_id, format, enqueued_at) VALUES (?, ?, ?)',
+            (file_conversion_id, normalize_format(file_format), time.time())
+        )
+        return cursor.lastrowid
+
+    def _try_claim(self):
+        connection = self._connection()
+        now = time.time()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute(
+                "UPDATE jobs SET state = 'queued', claimed_at = NULL "
+                "WHERE state = 'running' AND claimed_at < ?",
+                (now - self.visibility_timeout,)
+            )
+            running = dict(connection.execute(
+                "SELECT format, COUNT(*) FROM jobs WHERE state = 'running' GROUP BY format"
+            ).fetchall())
+            blocked = [
+                file_format for file_format, count in running.items()
+                if self.limit_for(file_format) is not None and count >= self.limit_for(file_format)
+            ]
+            query = "SELECT id, file_conversion_id, format, attempts FROM jobs WHERE state = 'queued'"
+            if blocked:
+                query += ' AND format NOT IN (%s)' % ', '.join('?' * len(blocked))
+            row = connection.execute(query + ' ORDER BY id LIMIT 1', blocked).fetchone()
+            if row is None:
+                connection.execute('COMMIT')
+                return None
+            connection.execute(
+                "UPDATE jobs SET state = 'running', claimed_at = ?, attempts = attempts + 1 WHERE id = ?",
+                (now, row[0])
+            )
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        return Job(row[0], row[1], row[2], row[3] + 1)
+
+    def claim(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self._try_claim()
+            if job is not None or time.monotonic() >= deadline:
+                return job
+            time.sleep(self.POLL_INTERVAL)
+
+    def complete(self, job):
+        self._connection().execute('DELETE FROM jobs WHERE id = ?', (job.id,))
+
+    def depth(self):
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM jobs WHERE state = 'queued'"
+        ).fetchone()[0]
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Broker configuré par settings.FILE_CONVERSION_BROKER"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                broker_class = import_string(getattr(
+                    settings, 'FILE_CONVERSION_BROKER', 'apps.conversions.jobs.SQLiteBroker'
+                ))
+                _broker = broker_class(
+                    format_limits=getattr(settings, 'FILE_CONVERSION_FORMAT_LIMITS', None)
+                )
+    return _broker
+
+
+def reserve_output(file_conversion):
+    """
+    Réserver le nom du fichier de sortie dans le stockage.
+    Retourne (nom, chemin, local) : lorsque le stockage est local, le chemin
+    est directement celui du stockage, ce qui évite toute copie intermédiaire.
+    """
+    stem = Path(file_conversion.input_file.name).stem
+    extension = normalize_format(file_conversion.output_format)
+    field = file_conversion.output_file.field
+    name = field.generate_filename(file_conversion, f'{stem}.{extension}')
+    storage = file_conversion.output_file.storage
+    try:
+        name = storage.get_available_name(name)
+        path = storage.path(name)
+    except NotImplementedError:
+        handle, path = tempfile.mkstemp(suffix=f'.{extension}')
+        os.close(handle)
+        return name, path, False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Création exclusive pour que deux travaux ne se disputent pas le même nom
+    with open(path, 'xb'):
+        pass
+    return name, path, True
+
+
+def process_file_conversion(file_conversion_id, retry=False):
+    """Exécuter une conversion de fichier et mettre à jour son statut"""
+    statuses = ['pending', 'processing'] if retry else ['pending']
+    claimed = FileConversion.objects.filter(
+        pk=file_conversion_id, status__in=statuses
+    ).update(status='processing')
+    if not claimed:
+        return None
+    publish(file_conversion_id, 'processing', 0)
+
+    file_conversion = FileConversion.objects.get(pk=file_conversion_id)
+    started = time.monotonic()
+    path = None
+    cached = lookup_result(
+        file_conversion.input_sha256, file_conversion.output_format, file_conversion.options
+    )
+    if cached is not None:
+        # Le même contenu a été converti entre-temps : réutiliser le résultat
+        file_conversion.output_file.name = cached.output_file.name
+        file_conversion.file_size_output = cached.size
+        file_conversion.rows_processed = cached.rows_processed
+        file_conversion.rows_failed = cached.rows_failed
+        file_conversion.cache_hit = True
+        file_conversion.status = 'completed'
+        file_conversion.conversion_time = time.monotonic() - started
+        file_conversion.completed_at = timezone.now()
+        file_conversion.save(update_fields=[
+            'output_file', 'file_size_output', 'rows_processed', 'rows_failed',
+            'cache_hit', 'status', 'conversion_time', 'completed_at'
+        ])
+        publish(file_conversion_id, 'completed', cache_hit=True)
+        return file_conversion
+
+    try:
+        converter = get_converter(file_conversion.input_format, file_conversion.output_format)
+        name, path, local = reserve_output(file_conversion)
+        publish(file_conversion_id, 'processing', 10)
+        kwargs = {}
+        if getattr(converter, 'reports_progress', False):
+            kwargs['progress'] = lambda fraction: publish(
+                file_conversion_id, 'processing', 10 + round(fraction * 80)
+            )
+        # Le format déclaré à l'envoi prime sur l'extension du fichier stocké
+        options = dict(
+            file_conversion.options or {},
+            input_format=normalize_format(file_conversion.input_format)
+        )
+        stats = converter(
+            file_conversion.input_file.path,
+            path,
+            normalize_format(file_conversion.output_format),
+            options,
+            **kwargs
+        )
+        if isinstance(stats, dict):
+            file_conversion.rows_processed = stats.get('rows_processed', 0)
+            file_conversion.rows_failed = stats.get('rows_failed', 0)
+        publish(file_conversion_id, 'processing', 90)
+        storage = file_conversion.output_file.storage
+        if not local:
+            with open(path, 'rb') as output:
+                name = storage.save(name, File(output))
+            os.remove(path)
+        file_conversion.output_file.name = name
+        file_conversion.file_size_output = storage.size(name)
+        file_conversion.status = 'completed'
+        file_conversion.error_message = ''
+    except Exception as e:
+        logger.exception("Échec de la conversion de fichier %s", file_conversion_id)
+        if path and os.path.exists(path):
+            os.remove(path)
+        file_conversion.status = 'failed'
+        file_conversion.error_message = str(e)
+
+    file_conversion.conversion_time = time.monotonic() - started
+    file_conversion.completed_at = timezone.now()
+    file_conversion.save(update_fields=[
+        'output_file', 'file_size_output', 'status', 'error_message',
+        'conversion_time', 'completed_at', 'rows_processed', 'rows_failed'
+    ])
+    if file_conversion.status == 'completed':
+        remember_result(file_conversion)
+    publish(file_conversion_id, file_conversion.status, error_message=file_conversion.error_message)
+    return file_conversion
+
+
+class Worker:
+    """Boucle de traitement : réserver, convertir, acquitter"""
+
+    def __init__(self, broker, concurrency=1, poll_timeout=1.0):
+        self.broker = broker
+        self.concurrency = concurrency
+        self.poll_timeout = poll_timeout
+        self._stopping = threading.Event()
+        self._threads = []
+
+    def run_once(self):
+        job = self.broker.claim(self.poll_timeout)
+        if job is None:
+            return False
+        close_old_connections()
+        try:
+            process_file_conversion(job.file_conversion_id, retry=job.attempts > 1)
+        except Exception:
+            logger.exception("Erreur du worker pour le travail %s", job.id)
+        finally:
+            self.broker.complete(job)
+            close_old_connections()
+        return True
+
+    def _loop(self):
+        while not self._stopping.is_set():
+            self.run_once()
+
+    def start(self):
+        for index in range(self.concurrency):
+            thread = threading.Thread(
+                target=self._loop, name=f'file-conversion-worker-{index}', daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def join(self):
+        """Attendre la fin des threads (reste interruptible par les signaux)"""
+        for thread in list(self._threads):
+            while thread.is_alive():
+                thread.join(1)
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
@@ -0,0 +1,46 @@
+"""
+Commande : créer les partitions à venir et archiver l'historique expiré
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.conversions.partitions import archive_month, ensure_partitions, expired_months
+
+
+class Command(BaseCommand):
+    help = "Archiver (NDJSON compressé) puis purger les mois d'historique hors rétention"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retention-months', type=int, default=settings.CONVERSION_RETENTION_MONTHS,
+            help="Nombre de mois complets conservés en base en plus du mois courant"
+        )
+        parser.add_argument(
+            '--archive-dir', default=settings.CONVERSION_ARCHIVE_DIR,
+            help="Répertoire des archives"
+        )
+        parser.add_argument(
+            '--months-ahead', type=int, default=3,
+            help="Nombre de partitions mensuelles créées à l'avance (PostgreSQL)"
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Afficher les mois concernés sans rien modifier"
+        )
+
+    def handle(self, *args, **options):
+        months = expired_months(options['retention_months'])
+        if options['dry_run']:
+            for month in months:
+                self.stdout.write(f"À archiver : {month:%Y-%m}")
+            return
+
+        for name in ensure_partitions(options['months_ahead']):
+            self.stdout.write(f"Partition prête : {name}")
+        for month in months:
+            path, count = archive_month(month, options['archive_dir'])
+            if path is None:
+                self.stdout.write(f"{month:%Y-%m} : aucune conversion")
+            else:
+                self.stdout.write(f"{month:%Y-%m} : {count} conversion(s) archivée(s) dans {path}")
+        self.stdout.write(self.style.SUCCESS(f"{len(months)} mois archivé(s)"))
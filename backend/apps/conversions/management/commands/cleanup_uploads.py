@@ -0,0 +1,54 @@
+"""
+Commande : supprimer les envois par morceaux expirés et leurs fichiers partiels
+"""
+import os
+
+from django.core.management.base import BaseCommand
+
+from apps.conversions.models import FileConversion, UploadSession
+from apps.conversions.uploads import expired_sessions
+
+
+class Command(BaseCommand):
+    help = "Supprimer les envois sans activité depuis UPLOAD_SESSION_TTL secondes et les fichiers .part orphelins"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Afficher les envois concernés sans rien supprimer"
+        )
+
+    def handle(self, *args, **options):
+        sessions = expired_sessions()
+        if options['dry_run']:
+            for session in sessions:
+                self.stdout.write(f"Expiré : {session.id} {session} (modifié le {session.updated_at:%Y-%m-%d %H:%M})")
+            return
+
+        # Le fichier partiel est supprimé par le signal post_delete
+        deleted, _ = sessions.delete()
+        orphans = self.remove_orphans()
+        self.stdout.write(self.style.SUCCESS(
+            f"{deleted} envoi(s) expiré(s) supprimé(s), {orphans} fichier(s) partiel(s) orphelin(s)"
+        ))
+
+    def remove_orphans(self):
+        """Fichiers .part dont l'envoi n'est plus en cours (processus interrompu)"""
+        storage = FileConversion.input_file.field.storage
+        directory = storage.path('uploads')
+        if not os.path.isdir(directory):
+            return 0
+        # Liste lue avant les envois en cours : un envoi créé entre-temps n'est pas concerné
+        names = [name for name in os.listdir(directory) if name.endswith('.part')]
+        uploading = {
+            str(pk) for pk in UploadSession.objects.filter(status='uploading').values_list('pk', flat=True)
+        }
+        removed = 0
+        for name in names:
+            if name[:-len('.part')] not in uploading:
+                try:
+                    os.remove(os.path.join(directory, name))
+                except FileNotFoundError:
+                    continue
+                removed += 1
+        return removed
@@ -0,0 +1,35 @@
+"""
+Commande : récupérer les taux de change auprès du fournisseur configuré
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.conversions.currency import RateProviderError, get_rate_cache
+
+
+class Command(BaseCommand):
+    help = "Récupérer et enregistrer un nouveau vecteur de taux de change"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help="Répéter toutes les N secondes (0 : une seule fois)"
+        )
+
+    def handle(self, *args, **options):
+        rate_cache = get_rate_cache()
+        while True:
+            try:
+                fetched_at, as_of, rates = rate_cache.refresh()
+            except RateProviderError as e:
+                if not options['interval']:
+                    raise CommandError(str(e))
+                self.stderr.write(str(e))
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f"{len(rates)} taux ({rate_cache.base}) du {as_of:%Y-%m-%d %H:%M} enregistrés"
+                ))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,40 @@
+"""
+Commande : traiter les conversions de fichiers en attente
+"""
+import signal
+
+from django.core.management.base import BaseCommand
+
+from apps.conversions.jobs import Worker, get_broker
+
+
+class Command(BaseCommand):
+    help = "Démarrer un worker de conversion de fichiers"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=2,
+            help="Nombre de travaux traités simultanément par ce processus"
+        )
+        parser.add_argument(
+            '--poll-timeout', type=float, default=1.0,
+            help="Délai d'attente d'un travail (secondes)"
+        )
+
+    def handle(self, *args, **options):
+        broker = get_broker()
+        worker = Worker(broker, concurrency=options['concurrency'], poll_timeout=options['poll_timeout'])
+
+        def shutdown(signum, frame):
+            self.stdout.write("Arrêt du worker après les travaux en cours...")
+            worker.stop()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        self.stdout.write(self.style.SUCCESS(
+            f"Worker démarré ({broker.__class__.__name__}, concurrence {options['concurrency']})"
+        ))
+        worker.start()
+        try:
+            worker.join()
+        except KeyboardInterrupt:
+            worker.stop()
@@ -0,0 +1,147 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:18
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversionCategory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Nom')),
+                ('slug', models.SlugField(max_length=100, unique=True, verbose_name='Slug')),
+                ('description', models.TextField(blank=True, verbose_name='Description')),
+                ('icon', models.CharField(blank=True, max_length=50, verbose_name='Icône')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Actif')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Créé le')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Modifié le')),
+            ],
+            options={
+                'verbose_name': 'Catégorie de conversion',
+                'verbose_name_plural': 'Catégories de conversion',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ConversionResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('input_sha256', models.CharField(max_length=64, verbose_name="Empreinte SHA-256 de l'entrée")),
+                ('output_format', models.CharField(max_length=20, verbose_name='Format de sortie')),
+                ('options_key', models.CharField(max_length=64, verbose_name='Empreinte des options')),
+                ('output_file', models.FileField(upload_to='conversions/output/', verbose_name='Fichier de sortie')),
+                ('size', models.BigIntegerField(verbose_name='Taille (bytes)')),
+                ('hits', models.PositiveIntegerField(default=0, verbose_name='Succès du cache')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Créé le')),
+                ('last_used_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Dernière utilisation')),
+            ],
+            options={
+                'verbose_name': 'Résultat de conversion en cache',
+                'verbose_name_plural': 'Résultats de conversion en cache',
+                'ordering': ['-last_used_at'],
+                'unique_together': {('input_sha256', 'output_format', 'options_key')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ConversionType',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Nom')),
+                ('slug', models.SlugField(max_length=100, unique=True, verbose_name='Slug')),
+                ('description', models.TextField(blank=True, verbose_name='Description')),
+                ('input_unit', models.CharField(max_length=50, verbose_name="Unité d'entrée")),
+                ('output_unit', models.CharField(max_length=50, verbose_name='Unité de sortie')),
+                ('formula', models.TextField(blank=True, verbose_name='Formule de conversion')),
+                ('factor', models.DecimalField(blank=True, decimal_places=15, help_text='sortie = entrée × facteur + décalage', max_digits=30, null=True, verbose_name='Facteur')),
+                ('offset', models.DecimalField(decimal_places=15, default=0, max_digits=30, verbose_name='Décalage')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Actif')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Créé le')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Modifié le')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversion_types', to='conversions.conversioncategory', verbose_name='Catégorie')),
+            ],
+            options={
+                'verbose_name': 'Type de conversion',
+                'verbose_name_plural': 'Types de conversion',
+                'ordering': ['category', 'name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Conversion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('input_value', models.DecimalField(decimal_places=10, max_digits=20, verbose_name="Valeur d'entrée")),
+                ('output_value', models.DecimalField(decimal_places=10, max_digits=20, verbose_name='Valeur de sortie')),
+                ('input_unit', models.CharField(max_length=50, verbose_name="Unité d'entrée")),
+                ('output_unit', models.CharField(max_length=50, verbose_name='Unité de sortie')),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True, verbose_name='Adresse IP')),
+                ('user_agent', models.TextField(blank=True, verbose_name='User Agent')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Créé le')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='conversions', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+                ('conversion_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversions', to='conversions.conversiontype', verbose_name='Type de conversion')),
+            ],
+            options={
+                'verbose_name': 'Conversion',
+                'verbose_name_plural': 'Conversions',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='FileConversion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('input_file', models.FileField(upload_to='conversions/input/', verbose_name="Fichier d'entrée")),
+                ('input_sha256', models.CharField(blank=True, db_index=True, max_length=64, verbose_name="Empreinte SHA-256 de l'entrée")),
+                ('output_file', models.FileField(blank=True, upload_to='conversions/output/', verbose_name='Fichier de sortie')),
+                ('input_format', models.CharField(max_length=20, verbose_name="Format d'entrée")),
+                ('output_format', models.CharField(max_length=20, verbose_name='Format de sortie')),
+                ('options', models.JSONField(blank=True, default=dict, help_text='Options du convertisseur (ex: max_width, max_height, quality)', verbose_name='Options')),
+                ('file_size_input', models.BigIntegerField(verbose_name='Taille fichier entrée (bytes)')),
+                ('file_size_output', models.BigIntegerField(default=0, verbose_name='Taille fichier sortie (bytes)')),
+                ('conversion_time', models.FloatField(default=0, verbose_name='Temps de conversion (secondes)')),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('processing', 'En cours'), ('completed', 'Terminé'), ('failed', 'Échoué')], default='pending', max_length=20, verbose_name='Statut')),
+                ('error_message', models.TextField(blank=True, verbose_name="Message d'erreur")),
+                ('cache_hit', models.BooleanField(default=False, verbose_name='Résultat en cache')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Créé le')),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='Terminé le')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='file_conversions', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Conversion de fichier',
+                'verbose_name_plural': 'Conversions de fichiers',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255, verbose_name='Nom du fichier')),
+                ('size', models.BigIntegerField(verbose_name='Taille totale (bytes)')),
+                ('received', models.BigIntegerField(default=0, verbose_name='Octets reçus')),
+                ('output_format', models.CharField(max_length=20, verbose_name='Format de sortie')),
+                ('options', models.JSONField(blank=True, default=dict, verbose_name='Options')),
+                ('status', models.CharField(choices=[('uploading', 'En cours'), ('completed', 'Terminé')], default='uploading', max_length=20, verbose_name='Statut')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Créé le')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Modifié le')),
+                ('file_conversion', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload_session', to='conversions.fileconversion', verbose_name='Conversion de fichier')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Envoi par morceaux',
+                'verbose_name_plural': 'Envois par morceaux',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
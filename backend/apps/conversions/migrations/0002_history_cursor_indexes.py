@@ -0,0 +1,31 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conversions', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='conversion',
+            options={'ordering': ['-created_at', '-id'], 'verbose_name': 'Conversion', 'verbose_name_plural': 'Conversions'},
+        ),
+        migrations.AlterModelOptions(
+            name='fileconversion',
+            options={'ordering': ['-created_at', '-id'], 'verbose_name': 'Conversion de fichier', 'verbose_name_plural': 'Conversions de fichiers'},
+        ),
+        migrations.AddIndex(
+            model_name='conversion',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='conversion_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fileconversion',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='fileconv_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,108 @@
+"""
+Partitionnement mensuel de l'historique des conversions (PostgreSQL)
+
+La table est recréée en table partitionnée par intervalle sur created_at
+(clé primaire (id, created_at)), avec une partition par mois depuis la plus
+ancienne conversion jusqu'à trois mois après le mois courant et une
+partition par défaut. Les index, clés étrangères et la séquence de id sont
+conservés. Sur les autres bases, la migration ne fait rien.
+
+La copie des lignes est faite une seule fois, dans la transaction de la
+migration.
+"""
+import datetime
+
+from django.db import migrations
+from django.utils import timezone
+
+TABLE = 'conversions_conversion'
+OLD_TABLE = 'conversions_conversion_unpartitioned'
+MONTHS_AHEAD = 3
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_history(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    quote = connection.ops.quote_name
+    table, old_table = quote(TABLE), quote(OLD_TABLE)
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [TABLE])
+        if cursor.fetchone():
+            return
+
+        cursor.execute(
+            "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'p'", [TABLE]
+        )
+        primary_key = cursor.fetchone()[0]
+        cursor.execute(
+            'SELECT indexname, indexdef FROM pg_indexes '
+            'WHERE schemaname = current_schema() AND tablename = %s AND indexname <> %s',
+            [TABLE, primary_key]
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            'SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint '
+            "WHERE conrelid = to_regclass(%s) AND contype = 'f'", [TABLE]
+        )
+        foreign_keys = cursor.fetchall()
+
+        # Libérer les noms d'index et de contraintes pour la nouvelle table
+        cursor.execute(f'ALTER TABLE {table} RENAME TO {old_table}')
+        for name, _ in foreign_keys:
+            cursor.execute(f'ALTER TABLE {old_table} DROP CONSTRAINT {quote(name)}')
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX {quote(name)}')
+        cursor.execute(f'ALTER TABLE {old_table} DROP CONSTRAINT {quote(primary_key)}')
+
+        cursor.execute(
+            f'CREATE TABLE {table} (LIKE {old_table} INCLUDING DEFAULTS INCLUDING IDENTITY '
+            f'INCLUDING CONSTRAINTS) PARTITION BY RANGE ({quote("created_at")})'
+        )
+        cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {quote(primary_key)} PRIMARY KEY (id, created_at)')
+        cursor.execute(f'CREATE TABLE {quote(TABLE + "_default")} PARTITION OF {table} DEFAULT')
+
+        cursor.execute(f'SELECT min(created_at) FROM {old_table}')
+        oldest = cursor.fetchone()[0]
+        current = timezone.now().astimezone(datetime.timezone.utc).date().replace(day=1)
+        month = oldest.astimezone(datetime.timezone.utc).date().replace(day=1) if oldest else current
+        last = add_months(current, MONTHS_AHEAD)
+        while month <= last:
+            end = add_months(month, 1)
+            cursor.execute(
+                f'CREATE TABLE {quote("%s_p%s" % (TABLE, month.strftime("%Y%m")))} '
+                f'PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)',
+                [
+                    datetime.datetime(month.year, month.month, 1, tzinfo=datetime.timezone.utc),
+                    datetime.datetime(end.year, end.month, 1, tzinfo=datetime.timezone.utc),
+                ]
+            )
+            month = end
+
+        cursor.execute(f'INSERT INTO {table} SELECT * FROM {old_table}')
+        for _, definition in indexes:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {quote(name)} {definition}')
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, 'id'), coalesce(max(id), 1), max(id) IS NOT NULL) "
+            f'FROM {table}', [TABLE]
+        )
+        cursor.execute(f'DROP TABLE {old_table}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conversions', '0002_history_cursor_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_history, migrations.RunPython.noop),
+    ]
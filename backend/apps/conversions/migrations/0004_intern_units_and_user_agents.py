@@ -0,0 +1,164 @@
+"""
+Historique compact : unités et user agents remplacés par des identifiants
+
+Les chaînes input_unit, output_unit et user_agent des conversions sont
+enregistrées une seule fois dans les tables Unit et UserAgent, puis chaque
+conversion est mise à jour par une requête UPDATE ... FROM par colonne
+(PostgreSQL et SQLite 3.33+).
+"""
+import hashlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 5000
+
+UPDATES = [
+    ('input_unit_ref_id', 'conversions_unit', 'symbol', 'input_unit'),
+    ('output_unit_ref_id', 'conversions_unit', 'symbol', 'output_unit'),
+    ('user_agent_ref_id', 'conversions_useragent', 'value', 'user_agent'),
+]
+
+
+def intern_values(apps, schema_editor):
+    Conversion = apps.get_model('conversions', 'Conversion')
+    ConversionType = apps.get_model('conversions', 'ConversionType')
+    Unit = apps.get_model('conversions', 'Unit')
+    UserAgent = apps.get_model('conversions', 'UserAgent')
+    history = Conversion.objects.order_by()
+
+    symbols = set(history.values_list('input_unit', flat=True).distinct())
+    symbols |= set(history.values_list('output_unit', flat=True).distinct())
+    for input_unit, output_unit in ConversionType.objects.values_list('input_unit', 'output_unit'):
+        symbols.update((input_unit, output_unit))
+    Unit.objects.bulk_create([Unit(symbol=symbol) for symbol in sorted(symbols)], ignore_conflicts=True)
+
+    batch = []
+    for value in history.exclude(user_agent='').values_list('user_agent', flat=True).distinct().iterator():
+        digest = hashlib.sha1(value.encode('utf-8', 'surrogatepass')).hexdigest()
+        batch.append(UserAgent(digest=digest, value=value))
+        if len(batch) >= BATCH_SIZE:
+            UserAgent.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    UserAgent.objects.bulk_create(batch, ignore_conflicts=True)
+
+    quote = schema_editor.connection.ops.quote_name
+    table = quote(Conversion._meta.db_table)
+    with schema_editor.connection.cursor() as cursor:
+        for column, lookup_table, lookup_column, source in UPDATES:
+            cursor.execute(
+                f'UPDATE {table} SET {quote(column)} = lookup.id '
+                f'FROM {quote(lookup_table)} AS lookup '
+                f'WHERE lookup.{quote(lookup_column)} = {table}.{quote(source)}'
+            )
+
+
+def restore_values(apps, schema_editor):
+    Conversion = apps.get_model('conversions', 'Conversion')
+    quote = schema_editor.connection.ops.quote_name
+    table = quote(Conversion._meta.db_table)
+    with schema_editor.connection.cursor() as cursor:
+        for column, lookup_table, lookup_column, source in UPDATES:
+            cursor.execute(
+                f'UPDATE {table} SET {quote(source)} = lookup.{quote(lookup_column)} '
+                f'FROM {quote(lookup_table)} AS lookup '
+                f'WHERE lookup.id = {table}.{quote(column)}'
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conversions', '0003_partition_conversion_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Unit',
+            fields=[
+                ('id', models.SmallAutoField(primary_key=True, serialize=False)),
+                ('symbol', models.CharField(max_length=50, unique=True, verbose_name='Symbole')),
+            ],
+            options={
+                'verbose_name': 'Unité',
+                'verbose_name_plural': 'Unités',
+                'ordering': ['symbol'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserAgent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=40, unique=True, verbose_name='Empreinte SHA-1')),
+                ('value', models.TextField(verbose_name='User Agent')),
+            ],
+            options={
+                'verbose_name': 'User Agent',
+                'verbose_name_plural': 'User Agents',
+            },
+        ),
+        migrations.AddField(
+            model_name='conversion',
+            name='input_unit_ref',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='conversions.unit', verbose_name="Unité d'entrée"),
+        ),
+        migrations.AddField(
+            model_name='conversion',
+            name='output_unit_ref',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='conversions.unit', verbose_name='Unité de sortie'),
+        ),
+        migrations.AddField(
+            model_name='conversion',
+            name='user_agent_ref',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='conversions.useragent', verbose_name='User Agent'),
+        ),
+        migrations.RunPython(intern_values, restore_values),
+        # Valeur par défaut pour pouvoir recréer les colonnes en sens inverse
+        migrations.AlterField(
+            model_name='conversion',
+            name='input_unit',
+            field=models.CharField(default='', max_length=50, verbose_name="Unité d'entrée"),
+        ),
+        migrations.AlterField(
+            model_name='conversion',
+            name='output_unit',
+            field=models.CharField(default='', max_length=50, verbose_name='Unité de sortie'),
+        ),
+        migrations.RemoveField(
+            model_name='conversion',
+            name='input_unit',
+        ),
+        migrations.RemoveField(
+            model_name='conversion',
+            name='output_unit',
+        ),
+        migrations.RemoveField(
+            model_name='conversion',
+            name='user_agent',
+        ),
+        migrations.RenameField(
+            model_name='conversion',
+            old_name='input_unit_ref',
+            new_name='input_unit',
+        ),
+        migrations.RenameField(
+            model_name='conversion',
+            old_name='output_unit_ref',
+            new_name='output_unit',
+        ),
+        migrations.RenameField(
+            model_name='conversion',
+            old_name='user_agent_ref',
+            new_name='user_agent',
+        ),
+        migrations.AlterField(
+            model_name='conversion',
+            name='input_unit',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='conversions.unit', verbose_name="Unité d'entrée"),
+        ),
+        migrations.AlterField(
+            model_name='conversion',
+            name='output_unit',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='conversions.unit', verbose_name='Unité de sortie'),
+        ),
+    ]
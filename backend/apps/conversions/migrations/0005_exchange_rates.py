@@ -0,0 +1,30 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conversions', '0004_intern_units_and_user_agents'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExchangeRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('base', models.CharField(max_length=3, verbose_name='Devise de base')),
+                ('currency', models.CharField(max_length=3, verbose_name='Devise')),
+                ('rate', models.DecimalField(decimal_places=12, max_digits=24, verbose_name='Taux')),
+                ('as_of', models.DateTimeField(verbose_name='Date des taux')),
+                ('fetched_at', models.DateTimeField(verbose_name='Récupéré le')),
+            ],
+            options={
+                'verbose_name': 'Taux de change',
+                'verbose_name_plural': 'Taux de change',
+                'ordering': ['-fetched_at', 'currency'],
+                'indexes': [models.Index(fields=['base', '-fetched_at'], name='exchangerate_base_fetched_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conversions', '0005_exchange_rates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileconversion',
+            name='rows_failed',
+            field=models.BigIntegerField(default=0, verbose_name='Lignes en erreur'),
+        ),
+        migrations.AddField(
+            model_name='fileconversion',
+            name='rows_processed',
+            field=models.BigIntegerField(default=0, verbose_name='Lignes traitées'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conversions', '0006_file_conversion_row_counts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fileconversion',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'processing'])), fields=['status', 'created_at'], name='fileconv_active_status_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-18 10:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conversions', '0007_file_conversion_active_status_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='unit',
+            name='id',
+            field=models.AutoField(primary_key=True, serialize=False),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.2 on 2026-10-18 10:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conversions', '0008_unit_autofield'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversionresult',
+            name='rows_failed',
+            field=models.BigIntegerField(default=0, verbose_name='Lignes en erreur'),
+        ),
+        migrations.AddField(
+            model_name='conversionresult',
+            name='rows_processed',
+            field=models.BigIntegerField(default=0, verbose_name='Lignes traitées'),
+        ),
+    ]
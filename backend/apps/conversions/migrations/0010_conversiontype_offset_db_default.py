@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-18 10:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conversions', '0009_conversion_result_row_counts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='conversiontype',
+            name='offset',
+            field=models.DecimalField(db_default=0, decimal_places=15, default=0, max_digits=30, verbose_name='Décalage'),
+        ),
+    ]
@@ -1,6 +1,10 @@
 """
 Modèles pour les conversions dans ConvertHub
 """
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -39,6 +43,21 @@ class ConversionType(models.Model):
     input_unit = models.CharField(max_length=50, verbose_name="Unité d'entrée")
     output_unit = models.CharField(max_length=50, verbose_name="Unité de sortie")
     formula = models.TextField(blank=True, verbose_name="Formule de conversion")
+    factor = models.DecimalField(
+        max_digits=30,
+        decimal_places=15,
+        null=True,
+        blank=True,
+        verbose_name="Facteur",
+        help_text="sortie = entrée × facteur + décalage"
+    )
+    offset = models.DecimalField(
+        max_digits=30,
+        decimal_places=15,
+        default=0,
+        db_default=0,
+        verbose_name="Décalage"
+    )
     is_active = models.BooleanField(default=True, verbose_name="Actif")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Modifié le")
@@ -52,6 +71,33 @@ class ConversionType(models.Model):
         return f"{self.name} ({self.input_unit} → {self.output_unit})"
 
 
+class Unit(models.Model):
+    """Registre des unités référencées par l'historique"""
+    id = models.AutoField(primary_key=True)
+    symbol = models.CharField(max_length=50, unique=True, verbose_name="Symbole")
+
+    class Meta:
+        verbose_name = "Unité"
+        verbose_name_plural = "Unités"
+        ordering = ['symbol']
+
+    def __str__(self):
+        return self.symbol
+
+
+class UserAgent(models.Model):
+    """User agents distincts, indexés par empreinte SHA-1"""
+    digest = models.CharField(max_length=40, unique=True, verbose_name="Empreinte SHA-1")
+    value = models.TextField(verbose_name="User Agent")
+
+    class Meta:
+        verbose_name = "User Agent"
+        verbose_name_plural = "User Agents"
+
+    def __str__(self):
+        return self.value
+
+
 class Conversion(models.Model):
     """Historique des conversions effectuées"""
     user = models.ForeignKey(
@@ -78,19 +124,48 @@ class Conversion(models.Model):
         decimal_places=10, 
         verbose_name="Valeur de sortie"
     )
-    input_unit = models.CharField(max_length=50, verbose_name="Unité d'entrée")
-    output_unit = models.CharField(max_length=50, verbose_name="Unité de sortie")
+    # Références compactes (voir registry.py) : pas d'index, seulement la contrainte
+    input_unit = models.ForeignKey(
+        Unit,
+        on_delete=models.PROTECT,
+        related_name='+',
+        db_index=False,
+        verbose_name="Unité d'entrée"
+    )
+    output_unit = models.ForeignKey(
+        Unit,
+        on_delete=models.PROTECT,
+        related_name='+',
+        db_index=False,
+        verbose_name="Unité de sortie"
+    )
     ip_address = models.GenericIPAddressField(blank=True, null=True, verbose_name="Adresse IP")
-    user_agent = models.TextField(blank=True, verbose_name="User Agent")
+    user_agent = models.ForeignKey(
+        UserAgent,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='+',
+        db_index=False,
+        verbose_name="User Agent"
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
 
     class Meta:
         verbose_name = "Conversion"
         verbose_name_plural = "Conversions"
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Pagination par curseur de l'historique d'un utilisateur
+            models.Index(fields=['user', '-created_at', '-id'], name='conversion_user_created_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.input_value} {self.input_unit} → {self.output_value} {self.output_unit}"
+        from .registry import unit_symbol
+        return (
+            f"{self.input_value} {unit_symbol(self.input_unit_id)} → "
+            f"{self.output_value} {unit_symbol(self.output_unit_id)}"
+        )
 
 
 class FileConversion(models.Model):
@@ -104,12 +179,24 @@ class FileConversion(models.Model):
         verbose_name="Utilisateur"
     )
     input_file = models.FileField(upload_to='conversions/input/', verbose_name="Fichier d'entrée")
-    output_file = models.FileField(upload_to='conversions/output/', verbose_name="Fichier de sortie")
+    input_sha256 = models.CharField(
+        max_length=64,
+        blank=True,
+        db_index=True,
+        verbose_name="Empreinte SHA-256 de l'entrée"
+    )
+    output_file = models.FileField(upload_to='conversions/output/', blank=True, verbose_name="Fichier de sortie")
     input_format = models.CharField(max_length=20, verbose_name="Format d'entrée")
     output_format = models.CharField(max_length=20, verbose_name="Format de sortie")
+    options = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name="Options",
+        help_text="Options du convertisseur (ex: max_width, max_height, quality)"
+    )
     file_size_input = models.BigIntegerField(verbose_name="Taille fichier entrée (bytes)")
-    file_size_output = models.BigIntegerField(verbose_name="Taille fichier sortie (bytes)")
-    conversion_time = models.FloatField(verbose_name="Temps de conversion (secondes)")
+    file_size_output = models.BigIntegerField(default=0, verbose_name="Taille fichier sortie (bytes)")
+    conversion_time = models.FloatField(default=0, verbose_name="Temps de conversion (secondes)")
     status = models.CharField(
         max_length=20,
         choices=[
@@ -122,13 +209,126 @@ class FileConversion(models.Model):
         verbose_name="Statut"
     )
     error_message = models.TextField(blank=True, verbose_name="Message d'erreur")
+    cache_hit = models.BooleanField(default=False, verbose_name="Résultat en cache")
+    rows_processed = models.BigIntegerField(default=0, verbose_name="Lignes traitées")
+    rows_failed = models.BigIntegerField(default=0, verbose_name="Lignes en erreur")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
     completed_at = models.DateTimeField(null=True, blank=True, verbose_name="Terminé le")
 
     class Meta:
         verbose_name = "Conversion de fichier"
         verbose_name_plural = "Conversions de fichiers"
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='fileconv_user_created_idx'),
+            # File d'attente (sonde de disponibilité) : seules les conversions non terminées
+            models.Index(
+                fields=['status', 'created_at'], name='fileconv_active_status_idx',
+                condition=models.Q(status__in=['pending', 'processing'])
+            ),
+        ]
 
     def __str__(self):
         return f"{self.input_format} → {self.output_format} ({self.status})"
+
+
+class UploadSession(models.Model):
+    """Envoi de fichier par morceaux, reprenable"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='upload_sessions',
+        verbose_name="Utilisateur"
+    )
+    filename = models.CharField(max_length=255, verbose_name="Nom du fichier")
+    size = models.BigIntegerField(verbose_name="Taille totale (bytes)")
+    received = models.BigIntegerField(default=0, verbose_name="Octets reçus")
+    output_format = models.CharField(max_length=20, verbose_name="Format de sortie")
+    options = models.JSONField(default=dict, blank=True, verbose_name="Options")
+    status = models.CharField(
+        max_length=20,
+        choices=[
+            ('uploading', 'En cours'),
+            ('completed', 'Terminé'),
+        ],
+        default='uploading',
+        verbose_name="Statut"
+    )
+    file_conversion = models.OneToOneField(
+        FileConversion,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='upload_session',
+        verbose_name="Conversion de fichier"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Modifié le")
+
+    class Meta:
+        verbose_name = "Envoi par morceaux"
+        verbose_name_plural = "Envois par morceaux"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size})"
+
+    @property
+    def partial_name(self):
+        """Nom du fichier partiel dans le stockage"""
+        return f'uploads/{self.id}.part'
+
+    @property
+    def expires_at(self):
+        """Expiration de l'envoi faute d'activité (settings.UPLOAD_SESSION_TTL)"""
+        if self.status != 'uploading' or self.updated_at is None:
+            return None
+        return self.updated_at + timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+
+    @property
+    def is_expired(self):
+        return self.expires_at is not None and self.expires_at <= timezone.now()
+
+
+class ConversionResult(models.Model):
+    """Cache des résultats de conversion de fichiers, indexé par contenu"""
+    input_sha256 = models.CharField(max_length=64, verbose_name="Empreinte SHA-256 de l'entrée")
+    output_format = models.CharField(max_length=20, verbose_name="Format de sortie")
+    options_key = models.CharField(max_length=64, verbose_name="Empreinte des options")
+    output_file = models.FileField(upload_to='conversions/output/', verbose_name="Fichier de sortie")
+    size = models.BigIntegerField(verbose_name="Taille (bytes)")
+    rows_processed = models.BigIntegerField(default=0, verbose_name="Lignes traitées")
+    rows_failed = models.BigIntegerField(default=0, verbose_name="Lignes en erreur")
+    hits = models.PositiveIntegerField(default=0, verbose_name="Succès du cache")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True, verbose_name="Dernière utilisation")
+
+    class Meta:
+        verbose_name = "Résultat de conversion en cache"
+        verbose_name_plural = "Résultats de conversion en cache"
+        ordering = ['-last_used_at']
+        unique_together = [('input_sha256', 'output_format', 'options_key')]
+
+    def __str__(self):
+        return f"{self.input_sha256[:12]} → {self.output_format}"
+
+
+class ExchangeRate(models.Model):
+    """Historique des taux de change (un vecteur par récupération)"""
+    base = models.CharField(max_length=3, verbose_name="Devise de base")
+    currency = models.CharField(max_length=3, verbose_name="Devise")
+    rate = models.DecimalField(max_digits=24, decimal_places=12, verbose_name="Taux")
+    as_of = models.DateTimeField(verbose_name="Date des taux")
+    fetched_at = models.DateTimeField(verbose_name="Récupéré le")
+
+    class Meta:
+        verbose_name = "Taux de change"
+        verbose_name_plural = "Taux de change"
+        ordering = ['-fetched_at', 'currency']
+        indexes = [
+            models.Index(fields=['base', '-fetched_at'], name='exchangerate_base_fetched_idx'),
+        ]
+
+    def __str__(self):
+        return f"1 {self.base} = {self.rate} {self.currency}"
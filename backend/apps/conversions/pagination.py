@@ -0,0 +1,18 @@
+"""
+Pagination de l'historique des conversions
+"""
+from rest_framework.pagination import CursorPagination
+
+
+class HistoryCursorPagination(CursorPagination):
+    """
+    Pagination par curseur sur (-created_at, -id).
+
+    Chaque page est lue par l'index (user, -created_at, -id) à partir de la
+    position encodée dans le curseur : pas d'OFFSET ni de COUNT, le coût est
+    le même à la première et à la cinquante-millième page.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -0,0 +1,181 @@
+"""
+Partitionnement mensuel et archivage de l'historique des conversions
+
+Sous PostgreSQL, la table des conversions est partitionnée par mois sur
+created_at (migration 0003) : les requêtes bornées dans le temps ne lisent
+que les partitions concernées et la purge d'un mois consiste à détacher
+puis supprimer sa partition, sans DELETE ligne à ligne. Les autres bases
+(SQLite pour le développement et les tests) gardent une table simple et
+suppriment les lignes du mois archivé.
+
+Avant d'être purgé, un mois est exporté dans un fichier NDJSON compressé
+(conversions-AAAA-MM.ndjson.gz). Les compteurs de statistiques ne sont pas
+modifiés : ils continuent à compter l'historique archivé.
+"""
+import datetime
+import gzip
+import json
+import os
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Conversion
+from .registry import unit_symbol
+
+TABLE = Conversion._meta.db_table
+PARTITION_RE = re.compile(r'^%s_p(\d{4})(\d{2})$' % re.escape(TABLE))
+
+
+def month_start(value):
+    return datetime.date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def month_bounds(month):
+    """Bornes [début, fin) d'un mois, en UTC"""
+    start = datetime.datetime(month.year, month.month, 1, tzinfo=datetime.timezone.utc)
+    end_month = add_months(month, 1)
+    end = datetime.datetime(end_month.year, end_month.month, 1, tzinfo=datetime.timezone.utc)
+    return start, end
+
+
+def partition_name(month):
+    return f'{TABLE}_p{month:%Y%m}'
+
+
+def is_partitioned():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [TABLE]
+        )
+        return cursor.fetchone() is not None
+
+
+def create_partition(cursor, month):
+    start, end = month_bounds(month)
+    quote = connection.ops.quote_name
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS {quote(partition_name(month))} '
+        f'PARTITION OF {quote(TABLE)} FOR VALUES FROM (%s) TO (%s)',
+        [start, end]
+    )
+
+
+def ensure_partitions(months_ahead=3):
+    """Créer les partitions du mois courant et des mois suivants"""
+    if not is_partitioned():
+        return []
+    current = month_start(timezone.now().astimezone(datetime.timezone.utc))
+    months = [add_months(current, offset) for offset in range(months_ahead + 1)]
+    with connection.cursor() as cursor:
+        for month in months:
+            create_partition(cursor, month)
+    return [partition_name(month) for month in months]
+
+
+def partition_months():
+    """Mois disposant d'une partition (PostgreSQL) ou de lignes (autres bases)"""
+    if is_partitioned():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT child.relname FROM pg_inherits '
+                'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+                'WHERE pg_inherits.inhparent = to_regclass(%s)', [TABLE]
+            )
+            names = [row[0] for row in cursor.fetchall()]
+        return sorted(
+            datetime.date(int(match.group(1)), int(match.group(2)), 1)
+            for match in map(PARTITION_RE.match, names) if match
+        )
+    oldest = Conversion.objects.order_by('created_at').values_list('created_at', flat=True).first()
+    if oldest is None:
+        return []
+    months = []
+    month = month_start(oldest.astimezone(datetime.timezone.utc))
+    last = month_start(timezone.now().astimezone(datetime.timezone.utc))
+    while month <= last:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def expired_months(retention_months):
+    """Mois entièrement antérieurs à la période de rétention"""
+    cutoff = add_months(month_start(timezone.now().astimezone(datetime.timezone.utc)), -retention_months)
+    return [month for month in partition_months() if month < cutoff]
+
+
+def archive_path(month, directory=None):
+    directory = Path(directory or settings.CONVERSION_ARCHIVE_DIR)
+    return directory / f'conversions-{month:%Y-%m}.ndjson.gz'
+
+
+def export_month(month, path, chunk_size=5000):
+    """
+    Écrire les conversions d'un mois dans un fichier NDJSON compressé
+    (unités et user agent en clair, l'archive ne dépend pas des registres).
+    """
+    start, end = month_bounds(month)
+    rows = (
+        Conversion.objects.filter(created_at__gte=start, created_at__lt=end)
+        .order_by()
+        .annotate(user_agent_value=F('user_agent__value'))
+        .values()
+        .iterator(chunk_size=chunk_size)
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(path.name + '.tmp')
+    count = 0
+    with gzip.open(temporary, 'wt', encoding='utf-8') as archive:
+        for row in rows:
+            row['input_unit'] = unit_symbol(row.pop('input_unit_id'))
+            row['output_unit'] = unit_symbol(row.pop('output_unit_id'))
+            del row['user_agent_id']
+            row['user_agent'] = row.pop('user_agent_value') or ''
+            archive.write(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False))
+            archive.write('\n')
+            count += 1
+    if count:
+        os.replace(temporary, path)
+    else:
+        os.remove(temporary)
+    return count
+
+
+def purge_month(month):
+    """
+    Supprimer les conversions d'un mois : détachement et suppression de la
+    partition sous PostgreSQL, DELETE borné sinon.
+    """
+    quote = connection.ops.quote_name
+    with transaction.atomic(), connection.cursor() as cursor:
+        if is_partitioned():
+            name = quote(partition_name(month))
+            cursor.execute(f'ALTER TABLE {quote(TABLE)} DETACH PARTITION {name}')
+            cursor.execute(f'DROP TABLE {name}')
+        else:
+            start, end = month_bounds(month)
+            cursor.execute(
+                f'DELETE FROM {quote(TABLE)} WHERE {quote("created_at")} >= %s AND {quote("created_at")} < %s',
+                [connection.ops.adapt_datetimefield_value(start), connection.ops.adapt_datetimefield_value(end)]
+            )
+
+
+def archive_month(month, directory=None):
+    """Exporter puis purger un mois ; retourne (fichier ou None si vide, nombre de lignes)"""
+    path = archive_path(month, directory)
+    count = export_month(month, path)
+    purge_month(month)
+    return (path if count else None), count
@@ -0,0 +1,166 @@
+"""
+Progression des conversions de fichiers (publication / abonnement)
+
+Les workers publient les changements de statut et le pourcentage d'avancement
+d'une FileConversion ; les flux SSE (vues asynchrones) s'y abonnent au lieu
+d'interroger la base. Le canal est configurable
+(settings.FILE_PROGRESS_CHANNEL) :
+- MemoryChannel : dans le processus courant (MemoryBroker, développement) ;
+- RedisChannel : pub/sub Redis (REDIS_URL), pour des workers et des
+  serveurs web dans des processus ou machines différents.
+
+Le dernier événement de chaque conversion est aussi conservé dans le cache
+Django, pour qu'un abonné arrivant en cours de conversion connaisse le
+pourcentage courant. Les abonnés relisent la base à intervalle régulier :
+un événement perdu retarde la notification sans la bloquer.
+"""
+import asyncio
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ('completed', 'failed')
+EVENT_TIMEOUT = 3600
+
+
+def channel_name(file_conversion_id):
+    return f'conversions:progress:{file_conversion_id}'
+
+
+def make_event(file_conversion_id, status, percent=None, **extra):
+    if percent is None:
+        percent = 100 if status == 'completed' else 0
+    return {'id': file_conversion_id, 'status': status, 'percent': percent, **extra}
+
+
+class MemoryChannel:
+    """Pub/sub entre threads et boucles d'événements d'un même processus"""
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def publish(self, file_conversion_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(file_conversion_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:
+                # Boucle fermée : l'abonné est parti
+                pass
+
+    def subscribe(self, file_conversion_id):
+        return MemorySubscription(self, file_conversion_id)
+
+
+class MemorySubscription:
+    def __init__(self, channel, file_conversion_id):
+        self.channel = channel
+        self.file_conversion_id = file_conversion_id
+        self.queue = asyncio.Queue()
+        self._entry = None
+
+    async def __aenter__(self):
+        self._entry = (asyncio.get_running_loop(), self.queue)
+        with self.channel._lock:
+            self.channel._subscribers.setdefault(self.file_conversion_id, set()).add(self._entry)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        with self.channel._lock:
+            subscribers = self.channel._subscribers.get(self.file_conversion_id)
+            if subscribers is not None:
+                subscribers.discard(self._entry)
+                if not subscribers:
+                    del self.channel._subscribers[self.file_conversion_id]
+
+    async def get(self, timeout):
+        """Prochain événement, ou None après timeout secondes"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class RedisChannel:
+    """Pub/sub Redis (paquet redis, client asynchrone pour les abonnés)"""
+
+    def __init__(self, url=None):
+        import redis
+
+        self.url = url or settings.REDIS_URL
+        self._client = redis.Redis.from_url(self.url)
+
+    def publish(self, file_conversion_id, event):
+        self._client.publish(channel_name(file_conversion_id), json.dumps(event))
+
+    def subscribe(self, file_conversion_id):
+        return RedisSubscription(self.url, file_conversion_id)
+
+
+class RedisSubscription:
+    def __init__(self, url, file_conversion_id):
+        self.url = url
+        self.channel = channel_name(file_conversion_id)
+        self._client = None
+        self._pubsub = None
+
+    async def __aenter__(self):
+        import redis.asyncio
+
+        self._client = redis.asyncio.Redis.from_url(self.url)
+        self._pubsub = self._client.pubsub()
+        await self._pubsub.subscribe(self.channel)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._pubsub.unsubscribe(self.channel)
+        await self._pubsub.aclose()
+        await self._client.aclose()
+
+    async def get(self, timeout):
+        message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if message is None:
+            return None
+        return json.loads(message['data'])
+
+
+_channel = None
+_channel_lock = threading.Lock()
+
+
+def get_channel():
+    global _channel
+    if _channel is None:
+        with _channel_lock:
+            if _channel is None:
+                _channel = import_string(settings.FILE_PROGRESS_CHANNEL)()
+    return _channel
+
+
+def publish(file_conversion_id, status, percent=None, **extra):
+    """Publier l'état d'une conversion (appelé par les workers, jamais bloquant pour eux)"""
+    event = make_event(file_conversion_id, status, percent, **extra)
+    try:
+        cache.set(channel_name(file_conversion_id), event, timeout=EVENT_TIMEOUT)
+        get_channel().publish(file_conversion_id, event)
+    except Exception:
+        logger.exception("Publication de la progression impossible (%s)", file_conversion_id)
+    return event
+
+
+async def alast_event(file_conversion_id):
+    """Dernier événement publié pour une conversion (ou None)"""
+    return await cache.aget(channel_name(file_conversion_id))
+
+
+def subscribe(file_conversion_id):
+    """Abonnement asynchrone : async with subscribe(id) as subscription: await subscription.get(timeout)"""
+    return get_channel().subscribe(file_conversion_id)
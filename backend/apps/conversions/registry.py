@@ -0,0 +1,172 @@
+"""
+Dictionnaires de l'historique : unités et user agents
+
+Les conversions ne stockent que des identifiants entiers ; les chaînes sont
+enregistrées une seule fois dans les tables Unit et UserAgent. Les deux
+correspondances sont gardées en mémoire dans chaque processus : la table des
+unités est petite et chargée en entier, les user agents sont conservés dans
+un cache LRU borné, indexé par empreinte SHA-1.
+
+Seules les unités connues (moteur de conversion, types de conversion ou
+devises des taux de change) peuvent être enregistrées depuis l'API : voir
+is_known_unit.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .models import ConversionType, ExchangeRate, Unit, UserAgent
+
+MAX_CACHED_USER_AGENTS = 4096
+
+_units = {}
+_symbols = {}
+_units_lock = threading.Lock()
+
+_user_agents = OrderedDict()
+_user_agent_values = OrderedDict()
+_user_agents_lock = threading.Lock()
+
+
+def _load_units():
+    units = dict(Unit.objects.values_list('symbol', 'id'))
+    with _units_lock:
+        _units.clear()
+        _units.update(units)
+        _symbols.clear()
+        _symbols.update({unit_id: symbol for symbol, unit_id in units.items()})
+
+
+def _get_or_create(model, lookup, defaults):
+    try:
+        with transaction.atomic():
+            return model.objects.get_or_create(**lookup, defaults=defaults)[0].pk
+    except IntegrityError:
+        # Créé entre-temps par une autre requête
+        return model.objects.get(**lookup).pk
+
+
+def is_known_unit(symbol):
+    """
+    Une unité peut-elle être enregistrée ? Unités déjà enregistrées, unités
+    du moteur (intégrées et types actifs), de tous les types de conversion
+    et codes des devises des taux de change.
+    """
+    from .engine import get_engine
+
+    if symbol in _units or symbol in get_engine().units:
+        return True
+    return (
+        ConversionType.objects.filter(Q(input_unit=symbol) | Q(output_unit=symbol)).exists()
+        or ExchangeRate.objects.filter(Q(currency=symbol.upper()) | Q(base=symbol.upper())).exists()
+    )
+
+
+def unit_id(symbol):
+    """Identifiant d'une unité (créée si elle n'existe pas encore)"""
+    unit = _units.get(symbol)
+    if unit is not None:
+        return unit
+    pk = _get_or_create(Unit, {'symbol': symbol}, {})
+    with _units_lock:
+        _units[symbol] = pk
+        _symbols[pk] = symbol
+    return pk
+
+
+async def aunit_id(symbol):
+    """Variante asynchrone de unit_id"""
+    unit = _units.get(symbol)
+    if unit is not None:
+        return unit
+    try:
+        pk = (await Unit.objects.aget_or_create(symbol=symbol))[0].pk
+    except IntegrityError:
+        pk = (await Unit.objects.aget(symbol=symbol)).pk
+    with _units_lock:
+        _units[symbol] = pk
+        _symbols[pk] = symbol
+    return pk
+
+
+def unit_symbol(pk):
+    """Symbole d'une unité à partir de son identifiant"""
+    if pk is None:
+        return None
+    symbol = _symbols.get(pk)
+    if symbol is None:
+        _load_units()
+        symbol = _symbols.get(pk)
+    return symbol
+
+
+def user_agent_digest(value):
+    return hashlib.sha1(value.encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+def _remember_user_agent(digest, pk, value):
+    with _user_agents_lock:
+        _user_agents[digest] = pk
+        _user_agent_values[pk] = value
+        while len(_user_agents) > MAX_CACHED_USER_AGENTS:
+            _user_agents.popitem(last=False)
+        while len(_user_agent_values) > MAX_CACHED_USER_AGENTS:
+            _user_agent_values.popitem(last=False)
+
+
+def user_agent_id(value):
+    """Identifiant d'un user agent (None pour une chaîne vide)"""
+    if not value:
+        return None
+    digest = user_agent_digest(value)
+    with _user_agents_lock:
+        pk = _user_agents.get(digest)
+        if pk is not None:
+            _user_agents.move_to_end(digest)
+            return pk
+    pk = _get_or_create(UserAgent, {'digest': digest}, {'value': value})
+    _remember_user_agent(digest, pk, value)
+    return pk
+
+
+async def auser_agent_id(value):
+    """Variante asynchrone de user_agent_id"""
+    if not value:
+        return None
+    digest = user_agent_digest(value)
+    with _user_agents_lock:
+        pk = _user_agents.get(digest)
+        if pk is not None:
+            _user_agents.move_to_end(digest)
+            return pk
+    try:
+        pk = (await UserAgent.objects.aget_or_create(digest=digest, defaults={'value': value}))[0].pk
+    except IntegrityError:
+        pk = (await UserAgent.objects.aget(digest=digest)).pk
+    _remember_user_agent(digest, pk, value)
+    return pk
+
+
+def user_agent_value(pk):
+    """Chaîne d'un user agent à partir de son identifiant"""
+    if pk is None:
+        return ''
+    with _user_agents_lock:
+        value = _user_agent_values.get(pk)
+    if value is None:
+        value = UserAgent.objects.filter(pk=pk).values_list('value', flat=True).first() or ''
+        _remember_user_agent(user_agent_digest(value), pk, value)
+    return value
+
+
+def clear_caches():
+    """Vider les caches en mémoire (tests, restauration de la base)"""
+    with _units_lock:
+        _units.clear()
+        _symbols.clear()
+    with _user_agents_lock:
+        _user_agents.clear()
+        _user_agent_values.clear()
@@ -1,8 +1,14 @@
 """
 Sérialiseurs pour l'API des conversions
 """
+from django.conf import settings
+from django.db.models import Count
+from django.urls import reverse
 from rest_framework import serializers
-from .models import ConversionCategory, ConversionType, Conversion, FileConversion
+from .bases import parse_base
+from .engine import ConversionError
+from .models import ConversionCategory, ConversionType, Conversion, FileConversion, UploadSession
+from .registry import is_known_unit, unit_id, unit_symbol, user_agent_value
 
 
 class ConversionCategorySerializer(serializers.ModelSerializer):
@@ -18,9 +24,25 @@ class ConversionCategorySerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
     
     def get_conversion_types_count(self, obj):
+        # Valeur annotée par la vue ou fournie dans le contexte : pas de COUNT par catégorie
+        if hasattr(obj, 'active_types_count'):
+            return obj.active_types_count
+        counts = self.context.get('category_counts')
+        if counts is not None:
+            return counts.get(obj.pk, 0)
         return obj.conversion_types.filter(is_active=True).count()
 
 
+def category_counts():
+    """Nombre de types actifs par catégorie, en une seule requête"""
+    return dict(
+        ConversionType.objects.filter(is_active=True)
+        .order_by()
+        .values_list('category')
+        .annotate(count=Count('id'))
+    )
+
+
 class ConversionTypeSerializer(serializers.ModelSerializer):
     """Sérialiseur pour les types de conversion"""
     category = ConversionCategorySerializer(read_only=True)
@@ -30,17 +52,39 @@ class ConversionTypeSerializer(serializers.ModelSerializer):
         model = ConversionType
         fields = [
             'id', 'category', 'category_id', 'name', 'slug', 'description',
-            'input_unit', 'output_unit', 'formula', 'is_active', 
+            'input_unit', 'output_unit', 'formula', 'factor', 'offset', 'is_active', 
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
+class UnitField(serializers.CharField):
+    """Unité exposée par son symbole, stockée par son identifiant (registre en mémoire)"""
+    
+    def __init__(self, **kwargs):
+        kwargs.setdefault('max_length', 50)
+        super().__init__(**kwargs)
+    
+    def to_representation(self, value):
+        return unit_symbol(value)
+    
+    def run_validation(self, data=serializers.empty):
+        # Validation sur le symbole, puis remplacement par son identifiant :
+        # une unité inconnue n'est pas enregistrée dans le registre
+        symbol = super().run_validation(data)
+        if not is_known_unit(symbol):
+            raise serializers.ValidationError(f"Unité inconnue : {symbol}")
+        return unit_id(symbol)
+
+
 class ConversionSerializer(serializers.ModelSerializer):
     """Sérialiseur pour l'historique des conversions"""
     conversion_type = ConversionTypeSerializer(read_only=True)
     conversion_type_id = serializers.IntegerField(write_only=True)
     user = serializers.ReadOnlyField(source='user.username')
+    input_unit = UnitField(source='input_unit_id')
+    output_unit = UnitField(source='output_unit_id')
+    user_agent = serializers.SerializerMethodField()
     
     class Meta:
         model = Conversion
@@ -50,6 +94,11 @@ class ConversionSerializer(serializers.ModelSerializer):
             'ip_address', 'user_agent', 'created_at'
         ]
         read_only_fields = ['id', 'user', 'ip_address', 'user_agent', 'created_at']
+    
+    def get_user_agent(self, obj):
+        if Conversion.user_agent.is_cached(obj):
+            return obj.user_agent.value if obj.user_agent else ''
+        return user_agent_value(obj.user_agent_id)
 
 
 class FileConversionSerializer(serializers.ModelSerializer):
@@ -57,19 +106,32 @@ class FileConversionSerializer(serializers.ModelSerializer):
     user = serializers.ReadOnlyField(source='user.username')
     input_file_url = serializers.SerializerMethodField()
     output_file_url = serializers.SerializerMethodField()
+    rows_per_second = serializers.SerializerMethodField()
     
     class Meta:
         model = FileConversion
         fields = [
             'id', 'user', 'input_file', 'output_file', 'input_file_url',
-            'output_file_url', 'input_format', 'output_format',
+            'output_file_url', 'input_format', 'output_format', 'options',
             'file_size_input', 'file_size_output', 'conversion_time',
-            'status', 'error_message', 'created_at', 'completed_at'
+            'status', 'error_message', 'cache_hit', 'rows_processed', 'rows_failed',
+            'rows_per_second', 'created_at', 'completed_at'
         ]
         read_only_fields = [
             'id', 'user', 'output_file', 'file_size_input', 'file_size_output',
-            'conversion_time', 'status', 'error_message', 'created_at', 'completed_at'
+            'conversion_time', 'status', 'error_message', 'cache_hit',
+            'rows_processed', 'rows_failed', 'created_at', 'completed_at'
         ]
+        extra_kwargs = {
+            # Déduit de l'extension du fichier s'il n'est pas fourni
+            'input_format': {'required': False},
+        }
+    
+    def get_rows_per_second(self, obj):
+        """Débit des conversions de tableaux (CSV, NDJSON)"""
+        if obj.rows_processed and obj.conversion_time:
+            return round(obj.rows_processed / obj.conversion_time)
+        return None
     
     def get_input_file_url(self, obj):
         if obj.input_file:
@@ -79,13 +141,44 @@ class FileConversionSerializer(serializers.ModelSerializer):
         return None
     
     def get_output_file_url(self, obj):
-        if obj.output_file:
+        # Servi par l'action download (Range, ETag) plutôt que par MEDIA_URL
+        if obj.output_file and obj.status == 'completed':
             request = self.context.get('request')
             if request:
-                return request.build_absolute_uri(obj.output_file.url)
+                return request.build_absolute_uri(
+                    reverse('conversions:fileconversion-download', args=[obj.pk])
+                )
         return None
 
 
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """Sérialiseur pour les envois par morceaux"""
+    upload_id = serializers.UUIDField(source='id', read_only=True)
+    expires_at = serializers.DateTimeField(read_only=True)
+    
+    class Meta:
+        model = UploadSession
+        fields = [
+            'upload_id', 'filename', 'size', 'received', 'output_format',
+            'options', 'status', 'file_conversion', 'created_at', 'updated_at', 'expires_at'
+        ]
+        read_only_fields = ['received', 'status', 'file_conversion', 'created_at', 'updated_at']
+    
+    def validate_size(self, value):
+        if value < 1:
+            raise serializers.ValidationError("Le fichier est vide")
+        if value > settings.UPLOAD_MAX_BYTES:
+            raise serializers.ValidationError(
+                f"Le fichier dépasse la taille maximale ({settings.UPLOAD_MAX_BYTES} octets)"
+            )
+        return value
+    
+    def validate_options(self, value):
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("Les options doivent être un objet")
+        return value
+
+
 class ConversionRequestSerializer(serializers.Serializer):
     """Sérialiseur pour les requêtes de conversion"""
     conversion_type_id = serializers.IntegerField(required=True)
@@ -94,6 +187,54 @@ class ConversionRequestSerializer(serializers.Serializer):
     output_unit = serializers.CharField(max_length=50, required=True)
 
 
+class BatchConversionItemSerializer(serializers.Serializer):
+    """Sérialiseur pour un groupe de valeurs d'une requête par lot"""
+    conversion_type_id = serializers.IntegerField(required=True)
+    input_unit = serializers.CharField(max_length=50, required=True)
+    output_unit = serializers.CharField(max_length=50, required=True)
+    values = serializers.ListField(
+        child=serializers.DecimalField(max_digits=20, decimal_places=10),
+        allow_empty=False
+    )
+
+
+class BaseConversionRequestSerializer(serializers.Serializer):
+    """Sérialiseur pour les conversions entre bases numériques (valeur en chaîne)"""
+    # Au-delà, envoi en flux (convert-base/stream) si BASE_CONVERSION_MAX_DIGITS le permet
+    MAX_DIGITS = 100000
+
+    value = serializers.CharField(max_length=MAX_DIGITS, required=True)
+    input_base = serializers.CharField(max_length=10, required=True)
+    output_base = serializers.CharField(max_length=10, required=True)
+
+    def _validate_base(self, value):
+        try:
+            return parse_base(value)
+        except ConversionError as e:
+            raise serializers.ValidationError(str(e))
+
+    def validate_input_base(self, value):
+        return self._validate_base(value)
+
+    def validate_output_base(self, value):
+        return self._validate_base(value)
+
+
+class BatchConversionRequestSerializer(serializers.Serializer):
+    """Sérialiseur pour les requêtes de conversion par lot"""
+    MAX_VALUES = 10000
+
+    items = BatchConversionItemSerializer(many=True, allow_empty=False)
+    exact = serializers.BooleanField(default=False)
+    
+    def validate_items(self, items):
+        if sum(len(item['values']) for item in items) > self.MAX_VALUES:
+            raise serializers.ValidationError(
+                f"Un lot ne peut pas contenir plus de {self.MAX_VALUES} valeurs"
+            )
+        return items
+
+
 class FileConversionRequestSerializer(serializers.Serializer):
     """Sérialiseur pour les requêtes de conversion de fichiers"""
     input_file = serializers.FileField(required=True)
@@ -0,0 +1,43 @@
+"""
+Signaux de l'application conversions
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .catalog import invalidate_catalog
+from .engine import invalidate_engine
+from .models import ConversionCategory, ConversionType, ConversionResult, FileConversion, UploadSession
+from .storage import delete_if_unreferenced
+from .uploads import discard_partial
+
+
+@receiver(post_save, sender=ConversionType)
+@receiver(post_delete, sender=ConversionType)
+@receiver(post_save, sender=ConversionCategory)
+@receiver(post_delete, sender=ConversionCategory)
+def conversion_catalog_changed(sender, **kwargs):
+    """Reconstruire le moteur et invalider le catalogue en cache lorsque le catalogue change"""
+    # Après la validation : un moteur ou une réponse reconstruits avant
+    # reprendraient l'ancien catalogue
+    transaction.on_commit(invalidate_engine)
+    transaction.on_commit(invalidate_catalog)
+
+
+@receiver(post_delete, sender=FileConversion)
+def release_conversion_files(sender, instance, **kwargs):
+    """Supprimer les fichiers partagés qui ne sont plus utilisés"""
+    delete_if_unreferenced(instance.input_file)
+    delete_if_unreferenced(instance.output_file)
+
+
+@receiver(post_delete, sender=ConversionResult)
+def release_cached_result(sender, instance, **kwargs):
+    delete_if_unreferenced(instance.output_file)
+
+
+@receiver(post_delete, sender=UploadSession)
+def release_partial_upload(sender, instance, **kwargs):
+    """Supprimer le fichier partiel d'un envoi abandonné"""
+    if instance.status == 'uploading':
+        discard_partial(instance)
@@ -0,0 +1,161 @@
+"""
+Stockage adressé par contenu et cache des résultats de conversion
+
+Les fichiers d'entrée sont rangés sous blobs/ selon leur SHA-256 : un même
+contenu envoyé plusieurs fois n'est stocké qu'une fois. Les résultats sont
+mis en cache par (empreinte de l'entrée, format de sortie, options) ; une
+conversion déjà faite réutilise directement le fichier de sortie existant.
+Le cache est limité en taille (settings.FILE_RESULT_CACHE_MAX_BYTES) et
+évincé par ancienneté d'utilisation (LRU).
+"""
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from .models import ConversionResult, FileConversion
+
+logger = logging.getLogger(__name__)
+
+BLOB_PREFIX = 'blobs'
+
+
+def blob_name(sha256, extension=''):
+    return f'{BLOB_PREFIX}/{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}'
+
+
+def store_blob(uploaded_file, sha256, storage):
+    """
+    Ranger un fichier reçu dans le stockage adressé par contenu.
+    Retourne le nom du blob ; rien n'est écrit si le contenu existe déjà.
+    """
+    name = blob_name(sha256, Path(uploaded_file.name).suffix.lower())
+    if storage.exists(name):
+        return name
+    # FileSystemStorage déplace les fichiers temporaires au lieu de les copier
+    return storage.save(name, uploaded_file)
+
+
+def adopt_blob(path, sha256, extension, storage):
+    """
+    Ranger un fichier déjà présent sur le disque du stockage (envoi par
+    morceaux) : un lien physique est créé à sa place définitive, sans copie.
+    Le fichier d'origine est conservé ; il revient à l'appelant de le
+    supprimer une fois la conversion enregistrée (ou d'appeler
+    release_blob si l'enregistrement échoue).
+    """
+    name = blob_name(sha256, extension.lower())
+    destination = storage.path(name)
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    try:
+        os.link(path, destination)
+    except FileExistsError:
+        # Contenu déjà stocké
+        pass
+    return name
+
+
+def release_blob(name, storage):
+    """Supprimer un blob qu'aucune conversion ni aucun résultat ne référence"""
+    if not is_referenced(name):
+        storage.delete(name)
+
+
+def options_key(options):
+    canonical = json.dumps(options or {}, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def lookup_result(sha256, output_format, options):
+    """Chercher un résultat en cache et marquer son utilisation"""
+    if not sha256:
+        return None
+    result = ConversionResult.objects.filter(
+        input_sha256=sha256,
+        output_format=output_format,
+        options_key=options_key(options)
+    ).first()
+    if result is None:
+        return None
+    if not result.output_file.storage.exists(result.output_file.name):
+        result.delete()
+        return None
+    ConversionResult.objects.filter(pk=result.pk).update(
+        hits=F('hits') + 1, last_used_at=timezone.now()
+    )
+    return result
+
+
+def remember_result(file_conversion):
+    """Mettre en cache le résultat d'une conversion terminée"""
+    if not file_conversion.input_sha256 or not file_conversion.output_file:
+        return None
+    try:
+        result = ConversionResult.objects.create(
+            input_sha256=file_conversion.input_sha256,
+            output_format=file_conversion.output_format,
+            options_key=options_key(file_conversion.options),
+            output_file=file_conversion.output_file.name,
+            size=file_conversion.file_size_output,
+            rows_processed=file_conversion.rows_processed,
+            rows_failed=file_conversion.rows_failed
+        )
+    except IntegrityError:
+        # Une autre conversion du même contenu vient d'être mise en cache
+        return None
+    evict()
+    return result
+
+
+def is_referenced(name):
+    """Un fichier est-il encore utilisé par une conversion ou par le cache ?"""
+    return (
+        FileConversion.objects.filter(Q(input_file=name) | Q(output_file=name)).exists()
+        or ConversionResult.objects.filter(output_file=name).exists()
+    )
+
+
+def delete_if_unreferenced(field_file):
+    if field_file and not is_referenced(field_file.name):
+        field_file.storage.delete(field_file.name)
+
+
+def evict(max_bytes=None):
+    """Évincer les résultats les moins récemment utilisés au-delà du budget"""
+    if max_bytes is None:
+        max_bytes = getattr(settings, 'FILE_RESULT_CACHE_MAX_BYTES', None)
+    if max_bytes is None:
+        return 0
+    total = ConversionResult.objects.aggregate(total=Sum('size'))['total'] or 0
+    evicted = 0
+    for result in ConversionResult.objects.order_by('last_used_at').iterator():
+        if total <= max_bytes:
+            break
+        total -= result.size
+        # Le fichier est supprimé par le signal post_delete s'il n'est plus utilisé
+        result.delete()
+        evicted += 1
+    if evicted:
+        logger.info("Cache des résultats : %d entrée(s) évincée(s)", evicted)
+    return evicted
+
+
+def cache_stats():
+    """Statistiques du cache (succès, échecs, taille)"""
+    hashed = FileConversion.objects.exclude(input_sha256='')
+    hits = hashed.filter(cache_hit=True).count()
+    misses = hashed.filter(cache_hit=False).count()
+    aggregate = ConversionResult.objects.aggregate(size=Sum('size'))
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / (hits + misses) if hits + misses else 0.0,
+        'entries': ConversionResult.objects.count(),
+        'size': aggregate['size'] or 0,
+    }
@@ -0,0 +1,53 @@
+"""
+Fournisseurs de taux de change : date des taux sans fuseau horaire
+"""
+import json
+import tempfile
+from datetime import datetime, timezone
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from . import currency
+from .currency import FixtureProvider, HTTPProvider
+from .models import ExchangeRate
+
+MARCH_FIRST = datetime(2024, 3, 1, tzinfo=timezone.utc)
+PAYLOAD = {'base': 'EUR', 'date': '2024-03-01', 'rates': {'USD': '1.0830', 'GBP': '0.8550'}}
+
+
+class NaiveDateTests(TestCase):
+    """Les API de taux renvoient souvent une date seule (« 2024-03-01 »)"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.fixture = Path(directory.name) / 'rates.json'
+        self.fixture.write_text(json.dumps(PAYLOAD))
+        currency._rate_cache = None
+        self.addCleanup(setattr, currency, '_rate_cache', None)
+
+    def test_fixture_provider(self):
+        as_of, rates = FixtureProvider(self.fixture).fetch('USD')
+        self.assertEqual(as_of, MARCH_FIRST)
+        self.assertEqual(rates['USD'], Decimal(1))
+
+    def test_http_provider(self):
+        response = mock.Mock()
+        response.json.return_value = PAYLOAD
+        with mock.patch('requests.get', return_value=response):
+            as_of, rates = HTTPProvider(url='https://rates.test/{base}', api_key='').fetch('EUR')
+        self.assertEqual(as_of, MARCH_FIRST)
+        self.assertEqual(rates['GBP'], Decimal('0.8550'))
+
+    def test_refresh_rates_command(self):
+        with override_settings(CURRENCY_RATES_FIXTURE=str(self.fixture), CURRENCY_BASE='EUR'):
+            call_command('refresh_rates', stdout=StringIO())
+        self.assertEqual(
+            set(ExchangeRate.objects.filter(as_of=MARCH_FIRST).values_list('currency', flat=True)),
+            {'EUR', 'USD', 'GBP'}
+        )
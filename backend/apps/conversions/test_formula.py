@@ -0,0 +1,62 @@
+"""
+Compilateur de formules : seule la variable d'entrée, aucun appel ni attribut
+"""
+import time
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+
+from .formula import FormulaError, compile_formula, input_variables
+
+
+class CompileFormulaTests(SimpleTestCase):
+
+    def test_usual_formulas(self):
+        celsius = compile_formula('F = C × 9/5 + 32', input_variables('°C'))
+        self.assertEqual(celsius(Decimal('100')), Decimal('212'))
+        self.assertEqual(celsius.affine, (Decimal('1.8'), Decimal('32')))
+        self.assertEqual(compile_formula('ft = m × 3,28084', input_variables('m'))(2), Decimal('6.56168'))
+        self.assertEqual(compile_formula('x ^ 2', input_variables('m'))(Decimal(3)), Decimal(9))
+
+    def test_free_text_is_not_a_formula(self):
+        for formula in ('Manuel', 'Taux de change en temps réel', 'Conversion de base', 'y = Manuel'):
+            with self.assertRaises(FormulaError, msg=formula):
+                compile_formula(formula, input_variables('EUR'))
+
+    def test_exactly_the_input_variable(self):
+        for formula in (
+            '42',               # aucune variable
+            'y = 2 * 21',       # aucune variable
+            'x * y',            # deux variables
+            'F = K * 1.8',      # pas la variable d'entrée
+            'C = C * 9/5 + 32', # variable calculée utilisée comme entrée
+        ):
+            with self.assertRaises(FormulaError, msg=formula):
+                compile_formula(formula, input_variables('°C'))
+
+    def test_attributes_and_calls_are_refused(self):
+        for formula in (
+            'x.__class__',
+            'x.real * 2',
+            '(1).__class__.__bases__',
+            'abs(x)',
+            "__import__('os').system('true')",
+            'x if x else 1',
+            '[x][0]',
+            'lambda: x',
+            "x * 'a'",
+            'x < 2',
+        ):
+            with self.assertRaises(FormulaError, msg=formula):
+                compile_formula(formula, input_variables('m'))
+
+    def test_huge_powers_are_refused(self):
+        started = time.monotonic()
+        for formula in ('x ** 1000', 'x ** 9 ** 9', '9 ** 9 ** 9 * x', 'x ** x', '2 ** x', 'x ** -1e9'):
+            with self.assertRaises(FormulaError, msg=formula):
+                compile_formula(formula, input_variables('m'))
+        # Exposants bornés mais composés : erreur d'évaluation, pas de calcul interminable
+        nested = compile_formula('x * (((9 ** 100) ** 100) ** 100) ** 100', input_variables('m'))
+        with self.assertRaises(FormulaError):
+            nested(Decimal(2))
+        self.assertLess(time.monotonic() - started, 5)
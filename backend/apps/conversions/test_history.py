@@ -0,0 +1,62 @@
+"""
+Historique en write-behind : politique de débordement 'sync' et arrêt
+"""
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+
+from .history import HistoryWriter
+from .models import ConversionCategory, ConversionType, Conversion
+from .registry import clear_caches, unit_id
+
+
+# Le thread d'écriture n'est pas lancé : la file se remplit et déborde
+@mock.patch.object(HistoryWriter, '_run', lambda self: None)
+class SyncOverflowTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = ConversionCategory.objects.create(name='Longueur', slug='longueur')
+        cls.conversion_type = ConversionType.objects.create(
+            category=category, name='Mètres en kilomètres', slug='m-km',
+            input_unit='m', output_unit='km', factor='0.001',
+        )
+
+    def setUp(self):
+        clear_caches()
+        self.addCleanup(clear_caches)
+        self.writer = HistoryWriter(max_queue_size=1, batch_size=10, flush_interval=1, overflow_policy='sync')
+        # Pas de vidage de la file à la sortie de l'interpréteur (base de test supprimée)
+        register = mock.patch('apps.conversions.history.atexit.register')
+        self.register = register.start()
+        self.addCleanup(register.stop)
+
+    def conversions(self, count):
+        return [
+            Conversion(
+                conversion_type=self.conversion_type, input_value=Decimal('1000'), output_value=Decimal('1'),
+                input_unit_id=unit_id('m'), output_unit_id=unit_id('km'),
+            )
+            for _ in range(count)
+        ]
+
+    def test_sync_write_is_counted_on_success(self):
+        self.writer.record(self.conversions(3))
+        stats = self.writer.stats()
+        self.assertEqual((stats['enqueued'], stats['sync'], stats['failed']), (1, 2, 0))
+        self.assertEqual(Conversion.objects.count(), 2)
+
+    def test_failed_sync_write_is_counted_as_failed(self):
+        with mock.patch.object(Conversion.objects, 'bulk_create', side_effect=RuntimeError('base indisponible')), \
+                self.assertLogs('apps.conversions.history', 'ERROR'):
+            self.writer.record(self.conversions(3))
+        stats = self.writer.stats()
+        self.assertEqual((stats['enqueued'], stats['sync'], stats['failed']), (1, 0, 2))
+
+    def test_stop_is_registered_once(self):
+        self.writer.record(self.conversions(1))
+        # Redémarrage du thread (après stop ou fork)
+        self.writer._thread = None
+        self.writer.record(self.conversions(1))
+        self.register.assert_called_once_with(self.writer.stop)
@@ -0,0 +1,103 @@
+"""
+Partitionnement de l'historique (migration 0003) sur une table déjà remplie
+
+Test PostgreSQL uniquement : ignoré avec les autres bases. Pour le lancer,
+par exemple : DB_ENGINE=django.db.backends.postgresql python manage.py test
+apps.conversions.test_partitions
+"""
+import datetime
+import tempfile
+import unittest
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from .models import Conversion
+from .partitions import add_months, is_partitioned, month_start, partition_months
+from .registry import clear_caches, unit_id
+
+BEFORE_PARTITIONING = ('conversions', '0002_history_cursor_indexes')
+
+
+def migrate(targets):
+    executor = MigrationExecutor(connection)
+    executor.loader.build_graph()
+    executor.migrate(targets)
+    return executor
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', "PostgreSQL requis")
+class PartitionMigrationTests(TransactionTestCase):
+
+    def setUp(self):
+        clear_caches()
+        self.addCleanup(clear_caches)
+        self.latest = MigrationExecutor(connection).loader.graph.leaf_nodes()
+        self.addCleanup(migrate, self.latest)
+
+    def populate_unpartitioned(self, months):
+        """Revenir avant 0003, recréer une table simple et y écrire une conversion par mois"""
+        executor = migrate([BEFORE_PARTITIONING])
+        old_apps = executor.loader.project_state(BEFORE_PARTITIONING).apps
+        OldConversion = old_apps.get_model('conversions', 'Conversion')
+        # La base de test a déjà été partitionnée : repartir de la table de 0002
+        with connection.schema_editor() as editor:
+            editor.delete_model(OldConversion)
+            editor.create_model(OldConversion)
+        self.assertFalse(is_partitioned())
+
+        category = old_apps.get_model('conversions', 'ConversionCategory').objects.create(
+            name='Longueur', slug='longueur'
+        )
+        conversion_type = old_apps.get_model('conversions', 'ConversionType').objects.create(
+            category=category, name='Mètres en kilomètres', slug='m-km',
+            input_unit='m', output_unit='km', factor=Decimal('0.001'),
+        )
+        for month in months:
+            conversion = OldConversion.objects.create(
+                conversion_type=conversion_type, input_value=Decimal('1500'), output_value=Decimal('1.5'),
+                input_unit='m', output_unit='km', user_agent='test',
+            )
+            created_at = datetime.datetime(month.year, month.month, 15, tzinfo=datetime.timezone.utc)
+            OldConversion.objects.filter(pk=conversion.pk).update(created_at=created_at)
+        return conversion_type.pk
+
+    def test_migrate_populated_table_then_archive(self):
+        current = month_start(timezone.now().astimezone(datetime.timezone.utc))
+        old_months = [add_months(current, -14), add_months(current, -13)]
+        type_id = self.populate_unpartitioned(old_months + [current])
+
+        migrate(self.latest)
+        self.assertTrue(is_partitioned())
+        self.assertEqual(Conversion.objects.count(), 3)
+        months = partition_months()
+        self.assertEqual(months[0], old_months[0])
+        self.assertIn(add_months(current, 3), months)
+        # Unités et user agents repris par la migration 0004
+        first = Conversion.objects.order_by('created_at').first()
+        self.assertEqual((first.input_unit.symbol, first.output_unit.symbol), ('m', 'km'))
+        self.assertEqual(first.user_agent.value, 'test')
+
+        # Écriture après migration : la séquence de id continue après les lignes copiées
+        latest = Conversion.objects.create(
+            conversion_type_id=type_id, input_value=Decimal('2'), output_value=Decimal('0.002'),
+            input_unit_id=unit_id('m'), output_unit_id=unit_id('km'),
+        )
+        self.assertGreater(latest.id, Conversion.objects.exclude(pk=latest.pk).order_by('-id').first().id)
+
+        with tempfile.TemporaryDirectory() as directory:
+            out = StringIO()
+            call_command('archive_conversions', retention_months=12, archive_dir=directory, stdout=out)
+            archives = sorted(path.name for path in Path(directory).iterdir())
+        self.assertEqual(archives, [f'conversions-{month:%Y-%m}.ndjson.gz' for month in old_months])
+        self.assertEqual(Conversion.objects.count(), 2)
+        remaining = partition_months()
+        self.assertNotIn(old_months[0], remaining)
+        self.assertNotIn(old_months[1], remaining)
+        self.assertIn(current, remaining)
@@ -0,0 +1,76 @@
+"""
+Registre des unités : seules les unités connues sont enregistrées, le
+moteur n'est reconstruit qu'après validation d'une modification du catalogue
+"""
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import include, path
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .engine import get_engine, invalidate_engine
+from .models import ConversionCategory, ConversionType, Conversion, ExchangeRate, Unit
+from .registry import clear_caches, is_known_unit
+
+urlpatterns = [
+    path('api/', include('apps.conversions.urls')),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class UnitRegistryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('unites', 'unites@example.com', 'password')
+        category = ConversionCategory.objects.create(name='Longueur', slug='longueur')
+        cls.conversion_type = ConversionType.objects.create(
+            category=category, name='Lieues', slug='lieues',
+            input_unit='lieue', output_unit='km', factor='4.444',
+        )
+        now = timezone.now()
+        ExchangeRate.objects.create(base='EUR', currency='CHF', rate='0.95', as_of=now, fetched_at=now)
+
+    def setUp(self):
+        clear_caches()
+        invalidate_engine()
+        self.addCleanup(clear_caches)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, input_unit, output_unit):
+        return self.client.post('/api/conversions/', {
+            'conversion_type_id': self.conversion_type.id,
+            'input_value': '1', 'output_value': '4.444',
+            'input_unit': input_unit, 'output_unit': output_unit,
+        }, format='json')
+
+    def test_known_units(self):
+        # Unité intégrée, unité d'un type de conversion, devise des taux
+        for symbol in ('m', 'lieue', 'CHF', 'chf', 'EUR'):
+            self.assertTrue(is_known_unit(symbol), symbol)
+        self.assertFalse(is_known_unit('Manuel'))
+
+    def test_unknown_unit_is_not_interned(self):
+        response = self.post('lieue', 'parsec-bidon')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('output_unit', response.data)
+        self.assertFalse(Unit.objects.filter(symbol='parsec-bidon').exists())
+        self.assertFalse(Conversion.objects.exists())
+
+    def test_known_unit_is_interned(self):
+        response = self.post('lieue', 'km')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['output_unit'], 'km')
+        self.assertTrue(Unit.objects.filter(symbol='lieue').exists())
+
+    def test_engine_is_rebuilt_after_commit(self):
+        engine = get_engine()
+        with self.captureOnCommitCallbacks(execute=True):
+            ConversionType.objects.create(
+                category=self.conversion_type.category, name='Toises', slug='toises',
+                input_unit='toise', output_unit='m', factor='1.949',
+            )
+            # Transaction en cours : le moteur n'est pas reconstruit
+            self.assertIs(get_engine(), engine)
+        self.assertIsNot(get_engine(), engine)
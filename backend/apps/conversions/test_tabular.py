@@ -0,0 +1,177 @@
+"""
+Convertisseur de tableaux : CSV ↔ NDJSON, cellules invalides ou hors limites,
+limites de blocs
+"""
+import csv
+import json
+import os
+import tempfile
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from .converters.tabular import convert_table
+from .engine import invalidate_engine
+from .jobs import process_file_conversion
+from .models import ConversionCategory, ConversionResult, ConversionType, FileConversion
+from .storage import options_key
+
+ROWS = [
+    {'site': 'A', 'distance': '1500'},
+    {'site': 'B', 'distance': '2,5'},
+    {'site': 'C', 'distance': ''},
+    {'site': 'D', 'distance': 'abc'},
+    {'site': 'E', 'distance': 'inf'},
+    {'site': 'F', 'distance': '-250'},
+]
+EXPECTED = [1.5, 0.0025, None, None, None, -0.25]
+
+
+class ConvertTableTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = ConversionCategory.objects.create(name='Longueur', slug='longueur')
+        cls.conversion_type = ConversionType.objects.create(
+            category=category, name='Mètres en kilomètres', slug='m-km',
+            input_unit='m', output_unit='km', factor='0.001',
+        )
+
+    def setUp(self):
+        invalidate_engine()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def options(self, **extra):
+        return dict({
+            'column': 'distance', 'conversion_type_id': self.conversion_type.id,
+            'input_unit': 'm', 'output_unit': 'km',
+        }, **extra)
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8', newline='') as handle:
+            handle.write(text)
+        return path
+
+    def write_csv(self, name, rows):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8', newline='') as handle:
+            writer = csv.DictWriter(handle, fieldnames=['site', 'distance'])
+            writer.writeheader()
+            writer.writerows(rows)
+        return path
+
+    def read_ndjson(self, path):
+        with open(path, encoding='utf-8') as handle:
+            return [json.loads(line) for line in handle]
+
+    def test_csv_to_ndjson(self):
+        source = self.write_csv('mesures.csv', ROWS)
+        destination = os.path.join(self.directory, 'sortie.ndjson')
+        stats = convert_table(source, destination, 'ndjson', self.options())
+
+        self.assertEqual(stats, {'rows_processed': 6, 'rows_failed': 3})
+        rows = self.read_ndjson(destination)
+        self.assertEqual([row['site'] for row in rows], list('ABCDEF'))
+        self.assertEqual([row['distance_km'] for row in rows], EXPECTED)
+        # Les colonnes d'origine sont conservées telles quelles
+        self.assertEqual(rows[3]['distance'], 'abc')
+
+    def test_ndjson_to_csv(self):
+        lines = [
+            {'site': 'A', 'distance': 1500},
+            {'site': 'B', 'distance': None},
+            {'site': 'C', 'distance': True},
+            {'site': 'D', 'distance': '42'},
+        ]
+        source = self.write('mesures.ndjson', ''.join(json.dumps(line) + '\n' for line in lines) + '\n')
+        destination = os.path.join(self.directory, 'sortie.csv')
+        stats = convert_table(source, destination, 'csv', self.options(exact=True))
+
+        self.assertEqual(stats, {'rows_processed': 4, 'rows_failed': 2})
+        with open(destination, encoding='utf-8', newline='') as handle:
+            rows = list(csv.DictReader(handle))
+        self.assertEqual(list(rows[0]), ['site', 'distance', 'distance_km'])
+        self.assertEqual(
+            [Decimal(row['distance_km']) if row['distance_km'] else None for row in rows],
+            [Decimal('1.5'), None, None, Decimal('0.042')]
+        )
+
+    def test_declared_input_format_wins_over_extension(self):
+        # Blob stocké sous une extension trompeuse : le format déclaré est utilisé
+        source = self.write('blob.csv', json.dumps({'site': 'A', 'distance': 10}) + '\n')
+        destination = os.path.join(self.directory, 'sortie.ndjson')
+        stats = convert_table(source, destination, 'ndjson', self.options(input_format='ndjson'))
+
+        self.assertEqual(stats, {'rows_processed': 1, 'rows_failed': 0})
+        self.assertEqual(self.read_ndjson(destination)[0]['distance_km'], 0.01)
+        with self.assertRaises(ValueError):
+            convert_table(source, destination, 'ndjson', self.options(input_format='xlsx'))
+
+    def test_out_of_range_cell_fails_only_its_row(self):
+        rows = [{'site': 'A', 'distance': '1'}, {'site': 'B', 'distance': '1e14'}, {'site': 'C', 'distance': '2'}]
+        source = self.write_csv('mesures.csv', rows)
+        for exact in (False, True):
+            destination = os.path.join(self.directory, f'sortie-{exact}.ndjson')
+            stats = convert_table(source, destination, 'ndjson', self.options(exact=exact))
+
+            self.assertEqual(stats, {'rows_processed': 3, 'rows_failed': 1}, exact)
+            results = [row['distance_km'] for row in self.read_ndjson(destination)]
+            self.assertIsNone(results[1])
+            self.assertEqual([Decimal(str(results[0])), Decimal(str(results[2]))], [Decimal('0.001'), Decimal('0.002')])
+
+    def test_chunk_boundaries(self):
+        rows = [{'site': str(index), 'distance': '' if index % 7 == 0 else str(index)} for index in range(1, 24)]
+        source = self.write_csv('mesures.csv', rows)
+        expected = None
+        for chunk_size in (1, 5, 7, 23, 1000):
+            destination = os.path.join(self.directory, f'sortie-{chunk_size}.ndjson')
+            progress = []
+            stats = convert_table(
+                source, destination, 'ndjson', self.options(chunk_size=chunk_size), progress=progress.append
+            )
+            self.assertEqual(stats, {'rows_processed': 23, 'rows_failed': 3}, chunk_size)
+            self.assertEqual(len(progress), -(-23 // chunk_size), chunk_size)
+            self.assertEqual(progress[-1], 1)
+            output = self.read_ndjson(destination)
+            if expected is None:
+                expected = output
+            self.assertEqual(output, expected, chunk_size)
+        self.assertEqual([row['site'] for row in expected], [str(index) for index in range(1, 24)])
+
+
+class CachedResultTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media = override_settings(MEDIA_ROOT=directory.name)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def test_cache_hit_copies_row_counts(self):
+        options = {'column': 'distance'}
+        storage = FileConversion.output_file.field.storage
+        output_name = storage.save('conversions/output/resultat.ndjson', ContentFile(b'{}\n'))
+        ConversionResult.objects.create(
+            input_sha256='a' * 64, output_format='ndjson', options_key=options_key(options),
+            output_file=output_name, size=3, rows_processed=120, rows_failed=4,
+        )
+        file_conversion = FileConversion.objects.create(
+            user=User.objects.create_user('tableaux'),
+            input_file=storage.save('blobs/mesures.csv', ContentFile(b'distance\n1\n')),
+            input_sha256='a' * 64, input_format='csv', output_format='ndjson',
+            options=options, file_size_input=11,
+        )
+
+        # La progression n'est pas publiée (pas de Redis pendant les tests)
+        with mock.patch('apps.conversions.jobs.publish'):
+            process_file_conversion(file_conversion.id)
+        file_conversion.refresh_from_db()
+        self.assertTrue(file_conversion.cache_hit)
+        self.assertEqual((file_conversion.rows_processed, file_conversion.rows_failed), (120, 4))
@@ -0,0 +1,138 @@
+"""
+Envois par morceaux : limite d'envois en cours, préallocation, réécriture,
+expiration et annulation de la finalisation
+"""
+import hashlib
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import include, path
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import FileConversion, UploadSession
+from .storage import blob_name
+from .uploads import _update_hash, partial_path, session_sha256
+
+urlpatterns = [
+    path('api/', include('apps.conversions.urls')),
+]
+
+UPLOADS = '/api/file-conversions/uploads/'
+CONTENT = b'colonne\n' + b'1\n' * 100
+
+
+@override_settings(ROOT_URLCONF=__name__, UPLOAD_MAX_OPEN_SESSIONS=2, UPLOAD_SESSION_TTL=3600)
+class UploadSessionTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media = override_settings(MEDIA_ROOT=directory.name)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.user = User.objects.create_user('envoi', 'envoi@example.com', 'password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def start(self, size=len(CONTENT)):
+        response = self.client.post(
+            UPLOADS, {'filename': 'table.csv', 'size': size, 'output_format': 'json'}, format='json'
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        return UploadSession.objects.get(pk=response.data['upload_id'])
+
+    def send(self, session, data, offset=0):
+        return self.client.put(
+            f'{UPLOADS}{session.id}/?offset={offset}', data, content_type='application/octet-stream'
+        )
+
+    def expire(self, session):
+        UploadSession.objects.filter(pk=session.pk).update(
+            updated_at=timezone.now() - timedelta(hours=2)
+        )
+
+    def test_open_sessions_are_capped_per_user(self):
+        first = self.start()
+        self.start()
+        response = self.client.post(
+            UPLOADS, {'filename': 'table.csv', 'size': 10, 'output_format': 'json'}, format='json'
+        )
+        self.assertEqual(response.status_code, 429)
+        # Un envoi expiré ne compte plus
+        self.expire(first)
+        self.start()
+
+    def test_space_is_reserved_on_first_chunk(self):
+        session = self.start(size=len(CONTENT))
+        self.assertEqual(os.path.getsize(partial_path(session)), 0)
+        response = self.send(session, CONTENT[:10])
+        self.assertEqual(response.data['offset'], 10)
+        self.assertEqual(os.path.getsize(partial_path(session)), len(CONTENT))
+
+    def test_expired_session_is_refused_and_cleaned_up(self):
+        session = self.start()
+        self.send(session, CONTENT[:10])
+        self.expire(session)
+        self.assertEqual(self.send(session, CONTENT[10:], offset=10).status_code, 410)
+
+        orphan = os.path.join(os.path.dirname(partial_path(session)), 'orphelin.part')
+        open(orphan, 'wb').close()
+        kept = self.start()
+        out = StringIO()
+        call_command('cleanup_uploads', stdout=out)
+        self.assertIn("1 envoi(s) expiré(s) supprimé(s), 1 fichier(s) partiel(s) orphelin(s)", out.getvalue())
+        self.assertFalse(UploadSession.objects.filter(pk=session.pk).exists())
+        self.assertFalse(os.path.exists(partial_path(session)))
+        self.assertFalse(os.path.exists(orphan))
+        self.assertTrue(os.path.exists(partial_path(kept)))
+
+    def test_rewriting_received_bytes_keeps_digest_consistent(self):
+        session = self.start()
+        self.send(session, CONTENT[:10])
+        response = self.send(session, b'X' * 10)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['offset'], 10)
+        self.send(session, CONTENT[10:], offset=10)
+
+        # Octets déjà hachés réécrits : l'empreinte suit le contenu du disque
+        with open(partial_path(session), 'r+b') as partial:
+            partial.write(b'X' * 10)
+        _update_hash(session.id, 0, b'X' * 10)
+        with open(partial_path(session), 'rb') as partial:
+            self.assertEqual(session_sha256(session), hashlib.sha256(partial.read()).hexdigest())
+
+    def test_finalize_moves_partial_file(self):
+        session = self.start()
+        self.send(session, CONTENT)
+        response = self.client.post(f'{UPLOADS}{session.id}/finalize/')
+        self.assertEqual(response.status_code, 201, response.data)
+        file_conversion = FileConversion.objects.get()
+        with file_conversion.input_file.open('rb') as stored:
+            self.assertEqual(stored.read(), CONTENT)
+        self.assertFalse(os.path.exists(partial_path(session)))
+
+    def test_failed_finalize_keeps_partial_file(self):
+        session = self.start()
+        self.send(session, CONTENT)
+        with mock.patch.object(FileConversion.objects, 'create', side_effect=RuntimeError('base indisponible')):
+            with self.assertRaises(RuntimeError):
+                self.client.post(f'{UPLOADS}{session.id}/finalize/')
+
+        # Rien n'est perdu : le fichier partiel est intact et le blob retiré
+        with open(partial_path(session), 'rb') as partial:
+            self.assertEqual(partial.read(), CONTENT)
+        session.refresh_from_db()
+        self.assertEqual(session.status, 'uploading')
+        storage = FileConversion.input_file.field.storage
+        self.assertFalse(storage.exists(blob_name(hashlib.sha256(CONTENT).hexdigest(), '.csv')))
+
+        # L'envoi peut être finalisé de nouveau
+        response = self.client.post(f'{UPLOADS}{session.id}/finalize/')
+        self.assertEqual(response.status_code, 201, response.data)
@@ -0,0 +1,171 @@
+"""
+Budgets de requêtes SQL des endpoints de l'API des conversions
+
+Chaque endpoint de liste et de détail a un nombre maximal de requêtes,
+indépendant du nombre de lignes renvoyées : un test échoue dès qu'une
+modification introduit une requête par ligne (N+1).
+"""
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path
+from rest_framework.test import APIClient
+
+from .catalog import invalidate_catalog
+from .models import ConversionCategory, ConversionType, Conversion, FileConversion
+from .registry import clear_caches, unit_id
+
+urlpatterns = [
+    path('api/', include('apps.conversions.urls')),
+]
+
+# Endpoint → nombre maximal de requêtes (l'authentification est forcée,
+# la session ne coûte donc aucune requête)
+QUERY_BUDGETS = {
+    'categories-list': 2,
+    'categories-detail': 1,
+    'categories-conversion-types': 2,
+    'types-list': 3,
+    'types-detail': 2,
+    # Pagination par curseur : pas de COUNT
+    'conversions-list': 2,
+    'conversions-detail': 2,
+    'file-conversions-list': 1,
+    'file-conversions-detail': 1,
+}
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class QueryBudgetTests(TestCase):
+    """Nombre de requêtes par endpoint, avec une page complète de résultats"""
+
+    ROWS = 20
+
+    @classmethod
+    def setUpTestData(cls):
+        clear_caches()
+        cls.user = User.objects.create_user('budget', 'budget@example.com', 'password')
+        cls.conversion_types = []
+        for index in range(4):
+            category = ConversionCategory.objects.create(name=f'Catégorie {index}', slug=f'categorie-{index}')
+            for number in range(5):
+                cls.conversion_types.append(ConversionType.objects.create(
+                    category=category,
+                    name=f'Type {index}-{number}',
+                    slug=f'type-{index}-{number}',
+                    input_unit='m',
+                    output_unit='km',
+                    formula='x / 1000',
+                ))
+        Conversion.objects.bulk_create(
+            Conversion(
+                user=cls.user,
+                conversion_type=cls.conversion_types[index % len(cls.conversion_types)],
+                input_value=Decimal(index),
+                output_value=Decimal(index) / 1000,
+                input_unit_id=unit_id('m'),
+                output_unit_id=unit_id('km'),
+            )
+            for index in range(cls.ROWS)
+        )
+        FileConversion.objects.bulk_create(
+            FileConversion(
+                user=cls.user,
+                input_file=f'conversions/inputs/{index}.png',
+                input_format='png',
+                output_format='jpeg',
+                file_size_input=1,
+            )
+            for index in range(cls.ROWS)
+        )
+
+    def setUp(self):
+        # Mesurer le coût réel des vues, pas celui du cache du catalogue
+        invalidate_catalog()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertWithinBudget(self, name, url, rows=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200, url)
+        if rows is not None:
+            data = response.json()
+            if isinstance(data, dict):
+                data = data['results']
+            self.assertEqual(len(data), rows, url)
+        budget = QUERY_BUDGETS[name]
+        self.assertLessEqual(
+            len(queries), budget,
+            f"{url} : {len(queries)} requêtes pour un budget de {budget}\n"
+            + '\n'.join(query['sql'] for query in queries.captured_queries)
+        )
+
+    def test_categories(self):
+        self.assertWithinBudget('categories-list', '/api/categories/', rows=4)
+        self.assertWithinBudget('categories-detail', '/api/categories/categorie-0/')
+        self.assertWithinBudget(
+            'categories-conversion-types', '/api/categories/categorie-0/conversion_types/', rows=5
+        )
+
+    def test_types(self):
+        self.assertWithinBudget('types-list', '/api/types/', rows=20)
+        self.assertWithinBudget('types-list', '/api/types/?category=categorie-1', rows=5)
+        self.assertWithinBudget('types-detail', '/api/types/type-0-0/')
+
+    def test_conversions(self):
+        conversion = Conversion.objects.filter(user=self.user).first()
+        self.assertWithinBudget('conversions-list', '/api/conversions/', rows=self.ROWS)
+        self.assertWithinBudget('conversions-detail', f'/api/conversions/{conversion.pk}/')
+
+    def test_file_conversions(self):
+        file_conversion = FileConversion.objects.filter(user=self.user).first()
+        self.assertWithinBudget('file-conversions-list', '/api/file-conversions/', rows=self.ROWS)
+        self.assertWithinBudget('file-conversions-detail', f'/api/file-conversions/{file_conversion.pk}/')
+
+    def test_history_cursor_pages(self):
+        seen = []
+        url = '/api/conversions/?page_size=7'
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                data = self.client.get(url, HTTP_ACCEPT='application/json').json()
+            self.assertLessEqual(len(queries), QUERY_BUDGETS['conversions-list'])
+            self.assertNotIn('count', data)
+            seen.extend(row['id'] for row in data['results'])
+            url = data['next']
+        self.assertEqual(len(seen), self.ROWS)
+        self.assertEqual(len(set(seen)), self.ROWS)
+
+    def test_catalog_cache_hits_skip_database(self):
+        self.client.get('/api/types/', HTTP_ACCEPT='application/json')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/types/', HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 0)
+
+    def test_catalog_cache_ignores_unread_parameters(self):
+        self.client.get('/api/types/', HTTP_ACCEPT='application/json')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/types/?utm_source=lettre', HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 0)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/types/?category=categorie-0', HTTP_ACCEPT='application/json')
+        self.assertEqual(response.json()['count'], 5)
+        self.assertGreater(len(queries), 0)
+
+    def test_catalog_cache_is_invalidated_after_commit(self):
+        self.client.get('/api/types/', HTTP_ACCEPT='application/json')
+        with self.captureOnCommitCallbacks(execute=True):
+            conversion_type = self.conversion_types[0]
+            conversion_type.name = 'Type renommé'
+            conversion_type.save()
+            # Transaction en cours : la réponse en cache reste servie
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get('/api/types/', HTTP_ACCEPT='application/json')
+            self.assertEqual(len(queries), 0)
+        response = self.client.get('/api/types/', HTTP_ACCEPT='application/json')
+        self.assertIn('Type renommé', [row['name'] for row in response.json()['results']])
@@ -0,0 +1,201 @@
+"""
+Gestion des fichiers envoyés pour les conversions
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler
+from django.utils import timezone
+
+try:
+    import fcntl
+except ImportError:
+    # Windows : pas de verrou entre processus (serveur de développement)
+    fcntl = None
+
+
+class HashingUploadHandler(FileUploadHandler):
+    """
+    Calculer le SHA-256 de chaque fichier pendant la réception.
+
+    Le gestionnaire laisse passer les données aux gestionnaires suivants
+    (mémoire ou fichier temporaire) et dépose les empreintes dans
+    request.upload_hashes, indexées par nom de champ.
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        self.request.upload_hashes = {}
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.hasher = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.hasher.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        self.request.upload_hashes[self.field_name] = self.hasher.hexdigest()
+        return None
+
+
+def file_sha256(uploaded_file, chunk_size=1024 * 1024):
+    """Empreinte d'un fichier déjà reçu (lorsque le gestionnaire n'a pas été utilisé)"""
+    hasher = hashlib.sha256()
+    for chunk in uploaded_file.chunks(chunk_size):
+        hasher.update(chunk)
+    uploaded_file.seek(0)
+    return hasher.hexdigest()
+
+
+# Envoi par morceaux : les octets sont écrits directement à leur position
+# (os.pwrite) dans un fichier préalloué à l'arrivée du premier morceau et
+# hachés au fil de l'eau lorsque les morceaux arrivent dans l'ordre. Un
+# envoi sans activité depuis UPLOAD_SESSION_TTL secondes est expiré
+# (commande cleanup_uploads).
+
+WRITE_BLOCK_SIZE = 1024 * 1024
+
+_hashers = OrderedDict()
+_hashers_lock = threading.Lock()
+MAX_TRACKED_HASHERS = 1024
+
+
+class ChunkError(Exception):
+    """Morceau refusé (position incohérente ou taille invalide)"""
+
+
+def partial_path(session):
+    from .models import FileConversion
+    return FileConversion.input_file.field.storage.path(session.partial_name)
+
+
+def session_expiry():
+    """Dernière activité en deçà de laquelle un envoi est expiré"""
+    return timezone.now() - timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+
+
+def open_sessions(user):
+    """Envois en cours et non expirés d'un utilisateur"""
+    from .models import UploadSession
+    return UploadSession.objects.filter(
+        user=user, status='uploading', updated_at__gte=session_expiry()
+    )
+
+
+def expired_sessions():
+    from .models import UploadSession
+    return UploadSession.objects.filter(status='uploading', updated_at__lt=session_expiry())
+
+
+def create_partial_file(session):
+    """
+    Créer le fichier partiel d'un envoi (vide : la taille annoncée n'est
+    réservée qu'à l'arrivée du premier morceau)
+    """
+    path = partial_path(session)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+    with _hashers_lock:
+        _hashers[session.id] = [hashlib.sha256(), 0]
+        while len(_hashers) > MAX_TRACKED_HASHERS:
+            _hashers.popitem(last=False)
+    return path
+
+
+def _preallocate(fd, size):
+    if os.fstat(fd).st_size >= size:
+        return
+    if hasattr(os, 'posix_fallocate'):
+        os.posix_fallocate(fd, 0, size)
+    else:
+        os.ftruncate(fd, size)
+
+
+def _update_hash(session_id, offset, data):
+    with _hashers_lock:
+        state = _hashers.get(session_id)
+        if state is None:
+            return
+        hasher, hashed = state
+        if offset < hashed:
+            # Octets déjà hachés réécrits : l'empreinte sera recalculée depuis le disque
+            del _hashers[session_id]
+        elif offset == hashed:
+            hasher.update(data)
+            state[1] = offset + len(data)
+
+
+def write_chunk(session, offset, stream, length):
+    """
+    Écrire un morceau lu depuis stream à la position offset, qui doit être
+    exactement la position reçue (aucun octet déjà reçu n'est réécrit).
+    Retourne la nouvelle position reçue, enregistrée dans la session.
+    """
+    from .models import UploadSession
+
+    if length <= 0 or offset < 0 or offset + length > session.size:
+        raise ChunkError("Taille de morceau invalide")
+
+    fd = os.open(partial_path(session), os.O_WRONLY)
+    try:
+        # Un seul morceau écrit à la fois par envoi, y compris entre processus :
+        # la position est relue et mise à jour sous le verrou du fichier
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        session.refresh_from_db(fields=['received'])
+        if offset != session.received:
+            raise ChunkError(f"Position attendue : {session.received}")
+        _preallocate(fd, session.size)
+        position = offset
+        remaining = length
+        try:
+            while remaining:
+                data = stream.read(min(WRITE_BLOCK_SIZE, remaining))
+                if not data:
+                    raise ChunkError("Morceau incomplet")
+                written = 0
+                while written < len(data):
+                    written += os.pwrite(fd, memoryview(data)[written:], position + written)
+                _update_hash(session.id, position, data)
+                position += len(data)
+                remaining -= len(data)
+        except Exception:
+            # Morceau interrompu : ses octets seront réécrits par le prochain envoi
+            with _hashers_lock:
+                _hashers.pop(session.id, None)
+            raise
+        end = offset + length
+        UploadSession.objects.filter(pk=session.pk).update(received=end, updated_at=timezone.now())
+        session.received = end
+    finally:
+        # Ferme le fichier et libère le verrou
+        os.close(fd)
+    return end
+
+
+def session_sha256(session):
+    """Empreinte du fichier complet (calculée au fil de l'eau si possible)"""
+    with _hashers_lock:
+        state = _hashers.pop(session.id, None)
+    if state is not None and state[1] == session.size:
+        return state[0].hexdigest()
+    # Morceaux reçus par un autre processus : relire le fichier
+    hasher = hashlib.sha256()
+    with open(partial_path(session), 'rb') as partial:
+        for block in iter(lambda: partial.read(WRITE_BLOCK_SIZE), b''):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def discard_partial(session):
+    with _hashers_lock:
+        _hashers.pop(session.id, None)
+    try:
+        os.remove(partial_path(session))
+    except FileNotFoundError:
+        pass
@@ -1,25 +1,66 @@
 """
 Vues pour l'API des conversions
 """
+from pathlib import Path
+
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.parsers import MultiPartParser, FormParser
-from django.utils import timezone
+from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from django.conf import settings
 from django.db import transaction
+from django.db.models import Count, Q
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from django.contrib.auth.models import AnonymousUser
 
-from .models import ConversionCategory, ConversionType, Conversion, FileConversion
+from .bases import iter_format, parse_base, to_int
+from .batch import evaluate, group_items, to_decimal
+from .catalog import catalog_response
+from .currency import get_rate_cache
+from .converters import normalize_format
+from .downloads import serve_file
+from .engine import ConversionError, get_engine
+from .history import record_conversions
+from .jobs import get_broker
+from .models import ConversionCategory, ConversionType, Conversion, FileConversion, UploadSession
+from .pagination import HistoryCursorPagination
+from .registry import unit_id, user_agent_id
 from .serializers import (
     ConversionCategorySerializer, ConversionTypeSerializer, 
     ConversionSerializer, FileConversionSerializer,
-    ConversionRequestSerializer, FileConversionRequestSerializer
+    BaseConversionRequestSerializer, BatchConversionRequestSerializer, ConversionRequestSerializer,
+    FileConversionRequestSerializer, UploadSessionSerializer, category_counts
 )
+from .storage import adopt_blob, lookup_result, release_blob, store_blob
+from .uploads import (
+    ChunkError, HashingUploadHandler, create_partial_file, discard_partial, file_sha256,
+    open_sessions, session_sha256, write_chunk
+)
+
 
+class CatalogCacheMixin:
+    """Réponses JSON du catalogue servies depuis le cache (voir catalog.py)"""
+    
+    def cached_response(self, request, handler, *args, **kwargs):
+        if request.accepted_renderer.format != 'json':
+            # API navigable : rendu habituel
+            return handler(request, *args, **kwargs)
+        return catalog_response(request, lambda: handler(request, *args, **kwargs).data)
+    
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+    
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
 
-class ConversionCategoryViewSet(viewsets.ReadOnlyModelViewSet):
+
+class ConversionCategoryViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     """API pour les catégories de conversion"""
-    queryset = ConversionCategory.objects.filter(is_active=True)
+    queryset = ConversionCategory.objects.filter(is_active=True).annotate(
+        active_types_count=Count('conversion_types', filter=Q(conversion_types__is_active=True))
+    ).order_by('name')
     serializer_class = ConversionCategorySerializer
     permission_classes = [permissions.AllowAny]
     lookup_field = 'slug'
@@ -27,15 +68,21 @@ class ConversionCategoryViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=True, methods=['get'])
     def conversion_types(self, request, slug=None):
         """Récupérer tous les types de conversion d'une catégorie"""
+        return self.cached_response(request, self._conversion_types, slug=slug)
+    
+    def _conversion_types(self, request, slug=None):
         category = self.get_object()
-        conversion_types = category.conversion_types.filter(is_active=True)
-        serializer = ConversionTypeSerializer(conversion_types, many=True)
+        conversion_types = category.conversion_types.filter(is_active=True).select_related('category')
+        serializer = ConversionTypeSerializer(
+            conversion_types, many=True,
+            context={'request': request, 'category_counts': {category.pk: category.active_types_count}}
+        )
         return Response(serializer.data)
 
 
-class ConversionTypeViewSet(viewsets.ReadOnlyModelViewSet):
+class ConversionTypeViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     """API pour les types de conversion"""
-    queryset = ConversionType.objects.filter(is_active=True)
+    queryset = ConversionType.objects.filter(is_active=True).select_related('category')
     serializer_class = ConversionTypeSerializer
     permission_classes = [permissions.AllowAny]
     lookup_field = 'slug'
@@ -46,13 +93,19 @@ class ConversionTypeViewSet(viewsets.ReadOnlyModelViewSet):
         if category_slug:
             queryset = queryset.filter(category__slug=category_slug)
         return queryset
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['category_counts'] = category_counts()
+        return context
 
 
 class ConversionViewSet(viewsets.ModelViewSet):
     """API pour l'historique des conversions"""
-    queryset = Conversion.objects.all()
+    queryset = Conversion.objects.select_related('user', 'user_agent', 'conversion_type__category')
     serializer_class = ConversionSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = HistoryCursorPagination
     
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -64,6 +117,12 @@ class ConversionViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(user__isnull=True)
         return queryset
     
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ('list', 'retrieve'):
+            context['category_counts'] = category_counts()
+        return context
+    
     def perform_create(self, serializer):
         """Créer une conversion avec les informations de l'utilisateur"""
         # Récupérer l'adresse IP et le user agent
@@ -76,7 +135,7 @@ class ConversionViewSet(viewsets.ModelViewSet):
         serializer.save(
             user=user,
             ip_address=ip_address,
-            user_agent=user_agent
+            user_agent_id=user_agent_id(user_agent)
         )
     
     def get_client_ip(self):
@@ -94,51 +153,53 @@ class ConversionViewSet(viewsets.ModelViewSet):
         serializer = ConversionRequestSerializer(data=request.data)
         if serializer.is_valid():
             try:
-                # Récupérer le type de conversion
-                conversion_type = ConversionType.objects.get(
-                    id=serializer.validated_data['conversion_type_id'],
-                    is_active=True
-                )
+                # Le type et la transformation proviennent du moteur en mémoire
+                engine = get_engine()
+                conversion_type = engine.get_type(serializer.validated_data['conversion_type_id'])
+                if conversion_type is None:
+                    raise ConversionType.DoesNotExist
                 
-                # Effectuer la conversion (logique simplifiée pour l'instant)
                 input_value = serializer.validated_data['input_value']
                 output_value = self._perform_conversion(
+                    engine,
+                    conversion_type,
                     input_value,
                     serializer.validated_data['input_unit'],
                     serializer.validated_data['output_unit']
                 )
                 
-                # Créer l'enregistrement de conversion
-                conversion_data = {
-                    'conversion_type': conversion_type,
+                # Enregistrer la conversion (immédiatement ou en write-behind)
+                conversion = Conversion(
+                    user=request.user if request.user.is_authenticated else None,
+                    conversion_type_id=conversion_type.id,
+                    input_value=input_value,
+                    output_value=output_value,
+                    input_unit_id=unit_id(serializer.validated_data['input_unit']),
+                    output_unit_id=unit_id(serializer.validated_data['output_unit']),
+                    ip_address=self.get_client_ip(),
+                    user_agent_id=user_agent_id(request.META.get('HTTP_USER_AGENT', ''))
+                )
+                saved = record_conversions([conversion])
+                
+                return Response({
+                    'success': True,
                     'input_value': input_value,
                     'output_value': output_value,
                     'input_unit': serializer.validated_data['input_unit'],
                     'output_unit': serializer.validated_data['output_unit'],
-                }
-                
-                conversion_serializer = ConversionSerializer(data=conversion_data)
-                if conversion_serializer.is_valid():
-                    conversion_serializer.save(
-                        user=request.user if request.user.is_authenticated else None,
-                        ip_address=self.get_client_ip(),
-                        user_agent=request.META.get('HTTP_USER_AGENT', '')
-                    )
-                    
-                    return Response({
-                        'success': True,
-                        'input_value': input_value,
-                        'output_value': output_value,
-                        'input_unit': serializer.validated_data['input_unit'],
-                        'output_unit': serializer.validated_data['output_unit'],
-                        'conversion_id': conversion_serializer.instance.id
-                    })
+                    'conversion_id': conversion.id if saved else None
+                })
                 
             except ConversionType.DoesNotExist:
                 return Response(
                     {'error': 'Type de conversion non trouvé'}, 
                     status=status.HTTP_404_NOT_FOUND
                 )
+            except ConversionError as e:
+                return Response(
+                    {'error': str(e)},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             except Exception as e:
                 return Response(
                     {'error': f'Erreur lors de la conversion: {str(e)}'}, 
@@ -147,18 +208,164 @@ class ConversionViewSet(viewsets.ModelViewSet):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-    def _perform_conversion(self, input_value, input_unit, output_unit):
-        """Logique de conversion (à implémenter selon les besoins)"""
-        # Pour l'instant, retourner une valeur factice
-        # Cette logique sera implémentée plus tard avec des algorithmes réels
-        return input_value * 1.5  # Exemple simplifié
+    @action(detail=False, methods=['post'], url_path='convert-batch')
+    def convert_batch(self, request):
+        """Effectuer des conversions par lot et les enregistrer en une seule requête"""
+        serializer = BatchConversionRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        items = serializer.validated_data['items']
+        exact = serializer.validated_data['exact']
+        engine = get_engine()
+        results = [None] * len(items)
+        
+        # Une seule évaluation vectorisée par (type, unité d'entrée, unité de sortie)
+        for (type_id, input_unit, output_unit), members in group_items(items).items():
+            conversion_type = engine.get_type(type_id)
+            values = [value for _, item_values in members for value in item_values]
+            try:
+                if conversion_type is None:
+                    raise ConversionError('Type de conversion non trouvé')
+                plan = engine.resolve(conversion_type, input_unit, output_unit)
+                output_values = evaluate(plan, values, exact=exact)
+            except ConversionError as e:
+                for index, _ in members:
+                    results[index] = {'error': str(e)}
+                continue
+            
+            start = 0
+            for index, item_values in members:
+                end = start + len(item_values)
+                results[index] = {'output_values': output_values[start:end]}
+                start = end
+        
+        # Historique : une seule requête INSERT pour tout le lot (ou write-behind)
+        user = request.user if request.user.is_authenticated else None
+        ip_address = self.get_client_ip()
+        agent_id = user_agent_id(request.META.get('HTTP_USER_AGENT', ''))
+        conversions = [
+            Conversion(
+                user=user,
+                conversion_type_id=item['conversion_type_id'],
+                input_value=input_value,
+                output_value=to_decimal(output_value),
+                input_unit_id=unit_id(item['input_unit']),
+                output_unit_id=unit_id(item['output_unit']),
+                ip_address=ip_address,
+                user_agent_id=agent_id
+            )
+            for item, result in zip(items, results)
+            if 'output_values' in result
+            for input_value, output_value in zip(item['values'], result['output_values'])
+        ]
+        record_conversions(conversions)
+        
+        return Response({
+            'success': all('output_values' in result for result in results),
+            'exact': exact,
+            'results': [
+                dict(result,
+                     conversion_type_id=item['conversion_type_id'],
+                     input_unit=item['input_unit'],
+                     output_unit=item['output_unit'])
+                for item, result in zip(items, results)
+            ]
+        })
+    
+    @action(detail=False, methods=['post'], url_path='convert-base')
+    def convert_base(self, request):
+        """Convertir un entier entre bases numériques (2 à 36, base64)"""
+        serializer = BaseConversionRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        data = serializer.validated_data
+        try:
+            number = to_int(data['value'], data['input_base'])
+        except ConversionError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'success': True,
+            'input_value': data['value'],
+            'output_value': ''.join(iter_format(number, data['output_base'])),
+            'input_base': data['input_base'],
+            'output_base': data['output_base'],
+        })
+    
+    @action(detail=False, methods=['post'], url_path='convert-base/stream', parser_classes=[])
+    def convert_base_stream(self, request):
+        """
+        Conversion de base en flux : chiffres dans le corps brut de la requête,
+        bases en paramètres (?input_base=…&output_base=…), résultat en
+        text/plain envoyé par morceaux au fur et à mesure du calcul.
+        """
+        max_digits = settings.BASE_CONVERSION_MAX_DIGITS
+        try:
+            input_base = parse_base(request.query_params.get('input_base', ''))
+            output_base = parse_base(request.query_params.get('output_base', ''))
+        except ConversionError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        too_long = Response(
+            {'error': f"Valeur trop longue (au plus {max_digits} caractères)"},
+            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+        if int(request.META.get('CONTENT_LENGTH') or 0) > max_digits:
+            return too_long
+        
+        chunks = []
+        size = 0
+        while True:
+            chunk = request.stream.read(1024 * 1024) if request.stream else b''
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_digits:
+                return too_long
+            chunks.append(chunk)
+        try:
+            number = to_int(b''.join(chunks).decode('ascii'), input_base)
+        except UnicodeDecodeError:
+            return Response({'error': f"Valeur invalide en base {input_base}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        except ConversionError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return StreamingHttpResponse(
+            (digits.encode('ascii') for digits in iter_format(number, output_base)),
+            content_type='text/plain; charset=us-ascii'
+        )
+    
+    @action(detail=False, methods=['get'])
+    def rates(self, request):
+        """Taux de change courants (paramètre base optionnel pour les taux croisés)"""
+        rate_cache = get_rate_cache()
+        try:
+            fetched_at, as_of, rates = rate_cache.snapshot()
+        except ConversionError as e:
+            return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        base = request.query_params.get('base', rate_cache.base).upper()
+        if base not in rates:
+            return Response({'error': f"Devise inconnue : {base}"}, status=status.HTTP_400_BAD_REQUEST)
+        pivot = rates[base]
+        return Response({
+            'base': base,
+            'as_of': as_of,
+            'fetched_at': fetched_at,
+            'rates': {code: str(rate / pivot) for code, rate in sorted(rates.items())},
+        })
+    
+    def _perform_conversion(self, engine, conversion_type, input_value, input_unit, output_unit):
+        """Convertir une valeur (formule compilée du type ou fermeture du moteur)"""
+        return engine.convert_with_type(conversion_type, input_value, input_unit, output_unit)
 
 
 class FileConversionViewSet(viewsets.ModelViewSet):
     """API pour les conversions de fichiers"""
-    queryset = FileConversion.objects.all()
+    queryset = FileConversion.objects.select_related('user')
     serializer_class = FileConversionSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = HistoryCursorPagination
     parser_classes = [MultiPartParser, FormParser]
     
     def get_queryset(self):
@@ -169,14 +376,174 @@ class FileConversionViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(user__isnull=True)
         return queryset
     
+    def initialize_request(self, request, *args, **kwargs):
+        # Empreinte SHA-256 calculée pendant la réception du fichier
+        request.upload_handlers.insert(0, HashingUploadHandler(request))
+        return super().initialize_request(request, *args, **kwargs)
+    
     def perform_create(self, serializer):
-        """Créer une conversion de fichier"""
+        """Créer une conversion de fichier (ou réutiliser un résultat en cache)"""
         user = self.request.user if self.request.user.is_authenticated else None
-        serializer.save(user=user, status='pending')
+        input_file = serializer.validated_data['input_file']
+        input_format = serializer.validated_data.get('input_format') or Path(input_file.name).suffix
+        output_format = normalize_format(serializer.validated_data['output_format'])
+        options = serializer.validated_data.get('options') or {}
+        
+        sha256 = getattr(self.request._request, 'upload_hashes', {}).get('input_file')
+        if sha256 is None:
+            sha256 = file_sha256(input_file)
+        input_name = store_blob(input_file, sha256, FileConversion.input_file.field.storage)
+        
+        fields = {
+            'user': user,
+            'input_file': input_name,
+            'input_sha256': sha256,
+            'input_format': normalize_format(input_format),
+            'output_format': output_format,
+            'file_size_input': input_file.size,
+        }
+        serializer.save(**fields, **self._result_fields(sha256, output_format, options))
+    
+    def _result_fields(self, sha256, output_format, options):
+        """Statut initial : résultat réutilisé depuis le cache ou conversion en attente"""
+        cached = lookup_result(sha256, output_format, options)
+        if cached is None:
+            return {'status': 'pending'}
+        return {
+            'status': 'completed',
+            'cache_hit': True,
+            'output_file': cached.output_file.name,
+            'file_size_output': cached.size,
+            'rows_processed': cached.rows_processed,
+            'rows_failed': cached.rows_failed,
+            'conversion_time': 0,
+            'completed_at': timezone.now(),
+        }
+    
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser, FormParser],
+            permission_classes=[permissions.IsAuthenticated])
+    def uploads(self, request):
+        """Démarrer un envoi par morceaux (filename, size, output_format, options)"""
+        serializer = UploadSessionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if open_sessions(request.user).count() >= settings.UPLOAD_MAX_OPEN_SESSIONS:
+            return Response(
+                {'error': f'Au plus {settings.UPLOAD_MAX_OPEN_SESSIONS} envoi(s) en cours par utilisateur'},
+                status=status.HTTP_429_TOO_MANY_REQUESTS
+            )
+        session = serializer.save(
+            user=request.user,
+            output_format=normalize_format(serializer.validated_data['output_format'])
+        )
+        create_partial_file(session)
+        return Response(
+            dict(UploadSessionSerializer(session).data, offset=0),
+            status=status.HTTP_201_CREATED
+        )
+    
+    @action(detail=False, methods=['get', 'put'], url_path=r'uploads/(?P<upload_id>[0-9a-f-]+)',
+            permission_classes=[permissions.IsAuthenticated])
+    def upload_chunk(self, request, upload_id=None):
+        """
+        GET : position à partir de laquelle reprendre l'envoi.
+        PUT ?offset=N : corps brut de la requête écrit à la position N.
+        """
+        session = get_object_or_404(UploadSession, pk=upload_id, user=request.user)
+        if request.method == 'GET':
+            return Response(dict(UploadSessionSerializer(session).data, offset=session.received))
+        
+        if session.status != 'uploading':
+            return Response({'error': 'Cet envoi est terminé'}, status=status.HTTP_409_CONFLICT)
+        if session.is_expired:
+            return Response({'error': 'Cet envoi a expiré'}, status=status.HTTP_410_GONE)
+        try:
+            offset = int(request.query_params.get('offset', session.received))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return Response({'error': 'Position invalide'}, status=status.HTTP_400_BAD_REQUEST)
+        if length > settings.UPLOAD_CHUNK_MAX_BYTES:
+            return Response(
+                {'error': f'Un morceau ne peut pas dépasser {settings.UPLOAD_CHUNK_MAX_BYTES} octets'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+        
+        # Le corps n'est pas analysé : il est lu directement depuis le flux
+        try:
+            end = write_chunk(session, offset, request._request, length)
+        except ChunkError as e:
+            return Response(
+                {'error': str(e), 'offset': session.received},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response({'upload_id': session.id, 'offset': end})
+    
+    @action(detail=False, methods=['post'], url_path=r'uploads/(?P<upload_id>[0-9a-f-]+)/finalize',
+            permission_classes=[permissions.IsAuthenticated])
+    def finalize_upload(self, request, upload_id=None):
+        """Terminer un envoi et créer la conversion de fichier correspondante"""
+        storage = FileConversion.input_file.field.storage
+        input_name = None
+        try:
+            with transaction.atomic():
+                session = get_object_or_404(
+                    UploadSession.objects.select_for_update(), pk=upload_id, user=request.user
+                )
+                if session.status != 'uploading':
+                    return Response({'error': 'Cet envoi est terminé'}, status=status.HTTP_409_CONFLICT)
+                if session.is_expired:
+                    return Response({'error': 'Cet envoi a expiré'}, status=status.HTTP_410_GONE)
+                if session.received != session.size:
+                    return Response(
+                        {'error': 'Envoi incomplet', 'offset': session.received},
+                        status=status.HTTP_409_CONFLICT
+                    )
+                
+                # Le fichier partiel est lié à sa place définitive, sans copie ;
+                # il n'est supprimé qu'une fois la conversion enregistrée
+                sha256 = session_sha256(session)
+                input_format = Path(session.filename).suffix
+                input_name = adopt_blob(
+                    storage.path(session.partial_name), sha256, input_format, storage
+                )
+                file_conversion = FileConversion.objects.create(
+                    user=request.user,
+                    input_file=input_name,
+                    input_sha256=sha256,
+                    input_format=normalize_format(input_format),
+                    output_format=session.output_format,
+                    options=session.options,
+                    file_size_input=session.size,
+                    **self._result_fields(sha256, session.output_format, session.options)
+                )
+                session.status = 'completed'
+                session.file_conversion = file_conversion
+                session.save(update_fields=['status', 'file_conversion', 'updated_at'])
+        except Exception:
+            # Enregistrement annulé : le fichier partiel reste en place
+            # (l'envoi peut être finalisé de nouveau), le blob est retiré
+            # si rien d'autre ne l'utilise
+            if input_name is not None:
+                release_blob(input_name, storage)
+            raise
+        discard_partial(session)
+        
+        serializer = self.get_serializer(file_conversion)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Télécharger le fichier converti (Range, ETag et If-None-Match pris en charge)"""
+        file_conversion = self.get_object()
+        if file_conversion.status != 'completed' or not file_conversion.output_file:
+            return Response(
+                {'error': "Le fichier converti n'est pas disponible"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return serve_file(request, file_conversion.output_file)
     
     @action(detail=True, methods=['post'])
     def process(self, request, pk=None):
-        """Traiter une conversion de fichier"""
+        """Placer une conversion de fichier dans la file des workers"""
         file_conversion = self.get_object()
         
         if file_conversion.status != 'pending':
@@ -185,29 +552,10 @@ class FileConversionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Marquer comme en cours de traitement
-        file_conversion.status = 'processing'
-        file_conversion.save()
+        # Le traitement est fait par les workers : la requête n'attend pas
+        job_id = get_broker().enqueue(file_conversion.id, file_conversion.output_format)
         
-        try:
-            # Ici, on appellera plus tard Celery pour le traitement asynchrone
-            # Pour l'instant, simulation d'un traitement
-            import time
-            time.sleep(1)  # Simulation
-            
-            # Marquer comme terminé
-            file_conversion.status = 'completed'
-            file_conversion.completed_at = timezone.now()
-            file_conversion.save()
-            
-            return Response({'status': 'completed'})
-            
-        except Exception as e:
-            file_conversion.status = 'failed'
-            file_conversion.error_message = str(e)
-            file_conversion.save()
-            
-            return Response(
-                {'error': f'Erreur lors du traitement: {str(e)}'}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        return Response(
+            {'status': file_conversion.status, 'job_id': job_id},
+            status=status.HTTP_202_ACCEPTED
+        )
@@ -0,0 +1,425 @@
+"""
+Bancs d'essai de ConvertHub (commande bench)
+
+Deux parties :
+- micro-benchmarks : moteur de conversion, sérialiseurs et convertisseurs
+  de fichiers, mesurés comme timeit (boucles calibrées, plusieurs
+  répétitions) ;
+- générateur de charge : rejoue dans le processus, avec plusieurs threads
+  clients, un mélange réaliste de requêtes (convert, catalogue,
+  historique, conversions de fichiers) sur une base de test jetable
+  (SQLite ou PostgreSQL selon la configuration).
+
+Le rapport est un dictionnaire JSON (latences p50/p95/p99, débit, requêtes
+SQL par requête HTTP) comparable à un rapport de référence.
+"""
+import os
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+import django
+from django.db import connection
+
+# Mélange de requêtes : (nom, poids)
+LOAD_MIX = [
+    ('convert', 35),
+    ('convert_batch', 5),
+    ('catalog_categories', 10),
+    ('catalog_types', 10),
+    ('catalog_type_detail', 5),
+    ('catalog_category_types', 5),
+    ('history_list', 15),
+    ('history_detail', 5),
+    ('file_conversions_list', 7),
+    ('file_conversion_detail', 3),
+]
+
+# Mesures comparées à la référence, et celles pour lesquelles plus haut est mieux
+COMPARED_METRICS = {'median_us', 'p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps'}
+HIGHER_IS_BETTER = {'throughput_rps'}
+
+
+def percentile(sorted_values, fraction):
+    """Percentile par interpolation linéaire sur des valeurs triées"""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def latency_summary(durations):
+    """Résumé de latences (secondes) en millisecondes"""
+    values = sorted(duration * 1000 for duration in durations)
+    return {
+        'count': len(values),
+        'mean_ms': round(statistics.fmean(values), 3) if values else None,
+        'p50_ms': round(percentile(values, 0.50), 3) if values else None,
+        'p95_ms': round(percentile(values, 0.95), 3) if values else None,
+        'p99_ms': round(percentile(values, 0.99), 3) if values else None,
+    }
+
+
+def environment():
+    """Contexte de la mesure (commit, versions, base de données)"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'cpu_count': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+# Micro-benchmarks
+
+def measure(func, repeat=5, min_duration=0.05):
+    """Temps d'un appel : boucles calibrées puis médiane de `repeat` répétitions"""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_duration or loops >= 10 ** 6:
+            break
+        loops *= 10 if elapsed < min_duration / 10 else 2
+    timings = [elapsed / loops]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        timings.append((time.perf_counter() - started) / loops)
+    median = statistics.median(timings)
+    return {
+        'loops': loops,
+        'repeat': repeat,
+        'best_us': round(min(timings) * 1e6, 3),
+        'median_us': round(median * 1e6, 3),
+        'ops_per_sec': round(1 / median, 1) if median else None,
+    }
+
+
+def micro_benchmarks(workdir, repeat=5, only=None):
+    """Exécuter les micro-benchmarks ; retourne {nom: mesures}"""
+    from apps.conversions.bases import convert_base
+    from apps.conversions.batch import evaluate
+    from apps.conversions.converters import get_converter
+    from apps.conversions.engine import get_engine
+    from apps.conversions.models import Conversion, ConversionType
+    from apps.conversions.serializers import (
+        ConversionRequestSerializer, ConversionSerializer, ConversionTypeSerializer
+    )
+
+    engine = get_engine()
+    formula_type = engine.get_type(ConversionType.objects.get(slug='celsius-fahrenheit').pk)
+    graph_type = engine.get_type(ConversionType.objects.get(slug='metres-pieds').pk)
+    plan = engine.resolve(graph_type, 'km', 'mi')
+    values = [Decimal(index) / 7 for index in range(10000)]
+    big_hex = '%x' % random.Random(1).getrandbits(200000)
+    big_decimal = '9' + ''.join(random.Random(2).choices('0123456789', k=6000))
+    types = list(ConversionType.objects.select_related('category'))
+    history = list(Conversion.objects.select_related('user', 'user_agent', 'conversion_type__category')[:100])
+    type_context = {'category_counts': {conversion_type.category_id: 1 for conversion_type in types}}
+
+    image_source, table_source = prepare_files(workdir)
+    image_converter = get_converter('png', 'jpeg')
+    table_converter = get_converter('csv', 'csv')
+    mass_type = ConversionType.objects.get(slug='kg-livres')
+    table_options = {'column': 'poids', 'conversion_type_id': mass_type.pk,
+                     'input_unit': 'kg', 'output_unit': 'lb'}
+    # Démarrage du pool de processus hors mesure
+    image_converter(image_source, os.path.join(workdir, 'warmup.jpeg'), 'jpeg', {})
+
+    benchmarks = {
+        'engine.convert': lambda: engine.convert(Decimal('12.5'), 'km', 'mi'),
+        'engine.convert_with_type.formula': lambda: engine.convert_with_type(
+            formula_type, Decimal('21.5'), '°C', '°F'),
+        'batch.evaluate.float_10k': lambda: evaluate(plan, values),
+        'batch.evaluate.exact_10k': lambda: evaluate(plan, values, exact=True),
+        'bases.hex_to_dec_50k_digits': lambda: convert_base(big_hex, 16, 10),
+        'bases.dec_to_base7_6k_digits': lambda: convert_base(big_decimal, 10, 7),
+        'serializer.conversion_request': lambda: ConversionRequestSerializer(data={
+            'conversion_type_id': 1, 'input_value': '12.5', 'input_unit': 'km', 'output_unit': 'mi',
+        }).is_valid(),
+        'serializer.conversion_types_list': lambda: ConversionTypeSerializer(
+            types, many=True, context=type_context).data,
+        'serializer.conversions_page_100': lambda: ConversionSerializer(
+            history, many=True, context=type_context).data,
+        'converter.image_png_to_jpeg_512': lambda: image_converter(
+            image_source, os.path.join(workdir, 'out.jpeg'), 'jpeg', {'quality': 85}),
+        'converter.table_csv_100k_rows': lambda: table_converter(
+            table_source, os.path.join(workdir, 'out.csv'), 'csv', table_options),
+    }
+    results = {}
+    for name, func in benchmarks.items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        results[name] = measure(func, repeat=repeat)
+    return results
+
+
+def prepare_files(workdir):
+    """Fichiers d'entrée des convertisseurs (image 512×512, CSV de 100 000 lignes)"""
+    from PIL import Image
+
+    image_source = os.path.join(workdir, 'bench.png')
+    gradient = Image.linear_gradient('L').resize((512, 512))
+    Image.merge('RGB', (gradient, gradient.rotate(90), gradient.rotate(180))).save(image_source)
+
+    table_source = os.path.join(workdir, 'bench.csv')
+    rng = random.Random(3)
+    with open(table_source, 'w') as table:
+        table.write('id,poids\n')
+        table.writelines(f'{index},{rng.uniform(0, 100):.3f}\n' for index in range(100000))
+    return image_source, table_source
+
+
+# Générateur de charge
+
+def seed(history_rows=500, file_rows=50):
+    """Données de la base de test : catalogue, utilisateur, historique, fichiers"""
+    from django.contrib.auth.models import User
+
+    from apps.conversions.models import Conversion, ConversionCategory, ConversionType, FileConversion
+    from apps.conversions.registry import unit_id
+
+    units, _ = ConversionCategory.objects.get_or_create(
+        slug='unites', defaults={'name': 'Unités', 'icon': '📏'})
+    ConversionCategory.objects.get_or_create(slug='devises', defaults={'name': 'Devises', 'icon': '💰'})
+    catalog = [
+        ('Température Celsius vers Fahrenheit', 'celsius-fahrenheit', '°C', '°F', 'F = C × 9/5 + 32'),
+        ('Longueur mètres vers pieds', 'metres-pieds', 'm', 'ft', 'ft = m × 3.28084'),
+        ('Poids kilogrammes vers livres', 'kg-livres', 'kg', 'lb', 'lb = kg × 2.20462'),
+        ('Longueur kilomètres vers miles', 'km-miles', 'km', 'mi', ''),
+        ('Volume litres vers gallons', 'litres-gallons', 'l', 'gal', ''),
+        ('Masse grammes vers onces', 'grammes-onces', 'g', 'oz', ''),
+    ]
+    for name, slug, input_unit, output_unit, formula in catalog:
+        ConversionType.objects.get_or_create(slug=slug, defaults={
+            'name': name, 'category': units, 'input_unit': input_unit,
+            'output_unit': output_unit, 'formula': formula,
+        })
+
+    user, created = User.objects.get_or_create(username='bench')
+    if created:
+        user.set_password('bench')
+        user.save()
+
+    types = list(ConversionType.objects.filter(category=units))
+    rng = random.Random(4)
+    if not Conversion.objects.filter(user=user).exists():
+        conversions = []
+        for _ in range(history_rows):
+            conversion_type = rng.choice(types)
+            conversions.append(Conversion(
+                user=user, conversion_type=conversion_type,
+                input_value=Decimal(rng.randint(1, 1000)), output_value=Decimal(rng.randint(1, 1000)),
+                input_unit_id=unit_id(conversion_type.input_unit),
+                output_unit_id=unit_id(conversion_type.output_unit),
+                ip_address='127.0.0.1',
+            ))
+        Conversion.objects.bulk_create(conversions)
+    if not FileConversion.objects.filter(user=user).exists():
+        FileConversion.objects.bulk_create([
+            FileConversion(
+                user=user, input_file=f'conversions/input/bench-{index}.png',
+                output_file=f'conversions/output/bench-{index}.jpeg', input_format='png',
+                output_format='jpeg', file_size_input=1000, file_size_output=500,
+                status='completed',
+            )
+            for index in range(file_rows)
+        ])
+    return user, types
+
+
+class QueryCounter:
+    """Compteur de requêtes SQL (connection.execute_wrapper)"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def build_requests(user, types):
+    """Fabriques de requêtes du mélange : nom -> fonction(rng) -> (méthode, chemin, données)"""
+    from apps.conversions.models import Conversion, FileConversion
+
+    history_ids = list(Conversion.objects.filter(user=user).values_list('id', flat=True)[:200])
+    file_ids = list(FileConversion.objects.filter(user=user).values_list('id', flat=True))
+
+    def convert(rng):
+        conversion_type = rng.choice(types)
+        return 'post', '/api/conversions/convert/', {
+            'conversion_type_id': conversion_type.id, 'input_value': str(rng.uniform(0, 1000))[:12],
+            'input_unit': conversion_type.input_unit, 'output_unit': conversion_type.output_unit,
+        }
+
+    def convert_batch(rng):
+        conversion_type = rng.choice(types)
+        return 'post', '/api/conversions/convert-batch/', {'items': [{
+            'conversion_type_id': conversion_type.id,
+            'input_unit': conversion_type.input_unit, 'output_unit': conversion_type.output_unit,
+            'values': [str(rng.randint(0, 1000)) for _ in range(50)],
+        }]}
+
+    return {
+        'convert': convert,
+        'convert_batch': convert_batch,
+        'catalog_categories': lambda rng: ('get', '/api/categories/', None),
+        'catalog_types': lambda rng: ('get', '/api/types/', None),
+        'catalog_type_detail': lambda rng: ('get', f'/api/types/{rng.choice(types).slug}/', None),
+        'catalog_category_types': lambda rng: ('get', '/api/categories/unites/conversion_types/', None),
+        'history_list': lambda rng: ('get', '/api/conversions/', None),
+        'history_detail': lambda rng: ('get', f'/api/conversions/{rng.choice(history_ids)}/', None),
+        'file_conversions_list': lambda rng: ('get', '/api/file-conversions/', None),
+        'file_conversion_detail': lambda rng: ('get', f'/api/file-conversions/{rng.choice(file_ids)}/', None),
+    }
+
+
+def run_load(total_requests=2000, concurrency=4, warmup=100, seed_value=0):
+    """
+    Rejouer le mélange LOAD_MIX avec `concurrency` clients en parallèle.
+    Retourne les latences, le débit et les requêtes SQL par point d'accès.
+    """
+    from django.test import Client
+
+    user, types = seed()
+    factories = build_requests(user, types)
+    names = [name for name, _ in LOAD_MIX]
+    weights = [weight for _, weight in LOAD_MIX]
+    samples = {name: [] for name in names}
+    queries = {name: 0 for name in names}
+    errors = {name: 0 for name in names}
+    lock = threading.Lock()
+    remaining = [total_requests]
+
+    def client_loop(index, count=None):
+        rng = random.Random(seed_value * 1000 + index)
+        client = Client(HTTP_ACCEPT='application/json')
+        client.force_login(user)
+        try:
+            while True:
+                with lock:
+                    if count is not None:
+                        if count <= 0:
+                            return
+                        count -= 1
+                    elif remaining[0] <= 0:
+                        return
+                    else:
+                        remaining[0] -= 1
+                name = rng.choices(names, weights)[0]
+                method, path, data = factories[name](rng)
+                counter = QueryCounter()
+                started = time.perf_counter()
+                with connection.execute_wrapper(counter):
+                    if method == 'post':
+                        response = client.post(path, data, content_type='application/json')
+                    else:
+                        response = client.get(path)
+                duration = time.perf_counter() - started
+                if count is not None:
+                    continue
+                with lock:
+                    samples[name].append(duration)
+                    queries[name] += counter.count
+                    if response.status_code >= 400:
+                        errors[name] += 1
+        finally:
+            connection.close()
+
+    # Préchauffage (caches, moteur, connexions) hors mesure
+    client_loop(-1, count=warmup)
+
+    threads = [threading.Thread(target=client_loop, args=(index,)) for index in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    endpoints = {}
+    for name in names:
+        if not samples[name]:
+            continue
+        endpoints[name] = dict(
+            latency_summary(samples[name]),
+            errors=errors[name],
+            queries_per_request=round(queries[name] / len(samples[name]), 2),
+        )
+    all_samples = [duration for durations in samples.values() for duration in durations]
+    total_queries = sum(queries.values())
+    return {
+        'requests': len(all_samples),
+        'concurrency': concurrency,
+        'duration_s': round(elapsed, 3),
+        'overall': dict(
+            latency_summary(all_samples),
+            errors=sum(errors.values()),
+            throughput_rps=round(len(all_samples) / elapsed, 1) if elapsed else None,
+            queries_per_request=round(total_queries / len(all_samples), 2) if all_samples else None,
+        ),
+        'endpoints': endpoints,
+    }
+
+
+# Comparaison avec une référence
+
+def compare(report, baseline, threshold):
+    """
+    Régressions par rapport à un rapport de référence : latences et temps
+    plus élevés (ou débits plus faibles) de plus de `threshold`, et toute
+    augmentation du nombre de requêtes SQL par requête HTTP.
+    """
+    regressions = []
+
+    def check(label, current, previous):
+        for metric, value in current.items():
+            reference = previous.get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(reference, (int, float)) or not reference:
+                continue
+            if metric == 'queries_per_request':
+                if value > reference:
+                    regressions.append(f'{label}.{metric} : {reference} → {value}')
+                continue
+            if metric not in COMPARED_METRICS:
+                continue
+            change = (value - reference) / reference
+            if metric in HIGHER_IS_BETTER:
+                change = -change
+            if change > threshold:
+                regressions.append(f'{label}.{metric} : {reference} → {value} ({change:+.0%})')
+
+    for name, current in report.get('micro', {}).items():
+        if name in baseline.get('micro', {}):
+            check(f'micro.{name}', current, baseline['micro'][name])
+    load, baseline_load = report.get('load'), baseline.get('load')
+    if load and baseline_load:
+        check('load.overall', load['overall'], baseline_load['overall'])
+        for name, current in load['endpoints'].items():
+            if name in baseline_load['endpoints']:
+                check(f'load.{name}', current, baseline_load['endpoints'][name])
+    return regressions
+
+
+def temporary_directory():
+    return tempfile.TemporaryDirectory(prefix='converthub-bench-')
@@ -0,0 +1,273 @@
+"""
+Compteurs de statistiques pré-agrégés
+
+Chaque conversion enregistrée (ou supprimée) met à jour des compteurs
+journaliers et des totaux par portée : global, catégorie, type de
+conversion et utilisateur. Les incréments sont appliqués en une seule
+requête INSERT ... ON CONFLICT DO UPDATE par table (PostgreSQL et
+SQLite), si bien que les vues de statistiques lisent quelques lignes au
+lieu de compter l'historique.
+
+Avec STATS_FLUSH_INTERVAL > 0 (2 secondes par défaut), les incréments sont
+cumulés en mémoire dans chaque processus et appliqués ensemble à cet
+intervalle par un thread d'arrière-plan : les conversions ne se disputent
+plus le verrou de la ligne du compteur global, au prix de statistiques en
+retard d'au plus STATS_FLUSH_INTERVAL secondes. Avec 0 (et pendant les
+tests), chaque écriture applique ses incréments immédiatement.
+
+Un type de conversion qui change de catégorie déplace ses compteurs vers
+la nouvelle catégorie ; les compteurs d'un utilisateur supprimé sont
+supprimés. La commande rebuild_stats recalcule tous les compteurs depuis
+l'historique.
+"""
+import atexit
+import logging
+import os
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .models import DailyCounter, TotalCounter
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_KEY = 0
+
+
+def _day(created_at):
+    return timezone.localdate(created_at) if created_at else timezone.localdate()
+
+
+def _category_ids(type_ids):
+    """Catégorie de chaque type (moteur en mémoire, base de données en dernier recours)"""
+    from apps.conversions.engine import get_engine
+    from apps.conversions.models import ConversionType
+
+    engine = get_engine()
+    categories = {}
+    for type_id in type_ids:
+        info = engine.get_type(type_id)
+        if info is not None:
+            categories[type_id] = info.category_id
+    missing = set(type_ids) - set(categories)
+    if missing:
+        categories.update(
+            ConversionType.objects.filter(id__in=missing).values_list('id', 'category_id')
+        )
+    return categories
+
+
+def conversion_deltas(conversions, sign=1):
+    """Incréments (portée, clé, mesure, jour) pour des conversions d'unités"""
+    categories = _category_ids({conversion.conversion_type_id for conversion in conversions})
+    deltas = Counter()
+    for conversion in conversions:
+        day = _day(conversion.created_at)
+        buckets = [('global', GLOBAL_KEY), ('type', conversion.conversion_type_id)]
+        category_id = categories.get(conversion.conversion_type_id)
+        if category_id is not None:
+            buckets.append(('category', category_id))
+        if conversion.user_id is not None:
+            buckets.append(('user', conversion.user_id))
+        for scope, key in buckets:
+            deltas[(scope, key, 'conversions', day)] += sign
+    return deltas
+
+
+def file_conversion_deltas(file_conversions, sign=1):
+    """Incréments pour des conversions de fichiers (global et utilisateur)"""
+    deltas = Counter()
+    for file_conversion in file_conversions:
+        day = _day(file_conversion.created_at)
+        deltas[('global', GLOBAL_KEY, 'file_conversions', day)] += sign
+        if file_conversion.user_id is not None:
+            deltas[('user', file_conversion.user_id, 'file_conversions', day)] += sign
+    return deltas
+
+
+def _upsert(model, key_fields, rows):
+    """Ajouter count aux lignes existantes ou les créer, en une requête"""
+    if not rows:
+        return
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    columns = [quote(model._meta.get_field(name).column) for name in key_fields]
+    count = quote('count')
+    row_placeholder = '(%s)' % ', '.join(['%s'] * (len(columns) + 1))
+    sql = (
+        f"INSERT INTO {table} ({', '.join(columns)}, {count}) "
+        f"VALUES {', '.join([row_placeholder] * len(rows))} "
+        f"ON CONFLICT ({', '.join(columns)}) "
+        f"DO UPDATE SET {count} = {table}.{count} + EXCLUDED.{count}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [value for row in rows for value in row])
+
+
+def apply_deltas(deltas):
+    """
+    Appliquer des incréments aux compteurs journaliers et aux totaux.
+
+    Les lignes sont triées pour que deux transactions concurrentes
+    verrouillent les compteurs dans le même ordre.
+    """
+    deltas = {bucket: count for bucket, count in deltas.items() if count}
+    if not deltas:
+        return
+    totals = Counter()
+    for (scope, key, metric, day), count in deltas.items():
+        totals[(scope, key, metric)] += count
+    daily_rows = [
+        (scope, key, metric, connection.ops.adapt_datefield_value(day), count)
+        for (scope, key, metric, day), count in sorted(deltas.items())
+    ]
+    total_rows = [
+        (scope, key, metric, count)
+        for (scope, key, metric), count in sorted(totals.items())
+        if count
+    ]
+    try:
+        with transaction.atomic():
+            _upsert(DailyCounter, ['scope', 'key', 'metric', 'day'], daily_rows)
+            _upsert(TotalCounter, ['scope', 'key', 'metric'], total_rows)
+    except Exception:
+        # Les statistiques ne doivent jamais faire échouer une conversion
+        logger.exception("Échec de la mise à jour des compteurs de statistiques")
+        return False
+    return True
+
+
+class CounterBuffer:
+    """Incréments en attente dans le processus, appliqués ensemble à intervalle régulier"""
+
+    def __init__(self, flush_interval):
+        self.flush_interval = flush_interval
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pid = None
+        self._thread = None
+
+    def add(self, deltas):
+        with self._lock:
+            self._pending.update(deltas)
+        self._ensure_started()
+
+    def _ensure_started(self):
+        # Après un fork, le thread du parent n'existe plus
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._start_lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='stats-counters', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            # Le thread garde sa propre connexion : la renouveler si elle est périmée
+            close_old_connections()
+            self.flush()
+
+    def flush(self):
+        """Appliquer les incréments en attente (remis en attente si l'écriture échoue)"""
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+        if pending and not apply_deltas(pending):
+            with self._lock:
+                self._pending.update(pending)
+
+    def after_fork(self):
+        # Les incréments du parent sont appliqués par le parent
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = CounterBuffer(settings.STATS_FLUSH_INTERVAL)
+    return _buffer
+
+
+def add_deltas(deltas):
+    """Incréments appliqués immédiatement ou cumulés jusqu'à la prochaine écriture"""
+    if not settings.STATS_FLUSH_INTERVAL:
+        apply_deltas(deltas)
+    else:
+        get_buffer().add(deltas)
+
+
+def flush_counters():
+    """Appliquer les incréments en attente dans ce processus (arrêt, tests)"""
+    if _buffer is not None:
+        _buffer.flush()
+
+
+def count_conversions(conversions, sign=1):
+    if conversions:
+        add_deltas(conversion_deltas(conversions, sign))
+
+
+def count_file_conversions(file_conversions, sign=1):
+    if file_conversions:
+        add_deltas(file_conversion_deltas(file_conversions, sign))
+
+
+def move_type_category(type_id, old_category_id, new_category_id):
+    """Déplacer les compteurs d'un type de conversion vers sa nouvelle catégorie"""
+    flush_counters()
+    deltas = Counter()
+    rows = DailyCounter.objects.filter(scope='type', key=type_id).values_list('metric', 'day', 'count')
+    for metric, day, count in rows:
+        if old_category_id is not None:
+            deltas[('category', old_category_id, metric, day)] -= count
+        if new_category_id is not None:
+            deltas[('category', new_category_id, metric, day)] += count
+    apply_deltas(deltas)
+
+
+def forget_user(user_id):
+    """Supprimer les compteurs d'un utilisateur supprimé (son historique devient anonyme)"""
+    flush_counters()
+    with transaction.atomic():
+        DailyCounter.objects.filter(scope='user', key=user_id).delete()
+        TotalCounter.objects.filter(scope='user', key=user_id).delete()
+
+
+def _after_fork():
+    if _buffer is not None:
+        _buffer.after_fork()
+
+
+atexit.register(flush_counters)
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def get_totals(scope, key=None, metric=None):
+    """Totaux d'une portée : {(clé, mesure): nombre}"""
+    queryset = TotalCounter.objects.filter(scope=scope)
+    if key is not None:
+        queryset = queryset.filter(key=key)
+    if metric is not None:
+        queryset = queryset.filter(metric=metric)
+    return {
+        (counter_key, counter_metric): count
+        for counter_key, counter_metric, count in queryset.values_list('key', 'metric', 'count')
+    }
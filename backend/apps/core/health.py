@@ -0,0 +1,151 @@
+"""
+Sondes de disponibilité (readiness)
+
+Chaque dépendance (base de données, cache, broker des conversions de
+fichiers) est vérifiée dans un thread avec un délai court
+(HEALTH_CHECK_TIMEOUT) : une dépendance bloquée rend la sonde « timeout »
+au lieu de bloquer la réponse. Le résultat est conservé HEALTH_CACHE_TTL
+secondes dans le processus et une seule vérification est en cours à la
+fois : des sondes rapprochées du répartiteur de charge ne se cumulent pas
+sur la base.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Min
+from django.utils import timezone
+
+CHECK_WORKERS = 4
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=CHECK_WORKERS, thread_name_prefix='health')
+    return _executor
+
+
+# Vérifications (exécutées dans les threads du pool)
+
+def check_database():
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    finally:
+        # Connexion propre au thread du pool : fermée si elle est devenue inutilisable
+        connection.close_if_unusable_or_obsolete()
+    return {}
+
+
+def check_cache():
+    key = f'health:{uuid.uuid4().hex}'
+    cache.set(key, 1, timeout=10)
+    value = cache.get(key)
+    cache.delete(key)
+    if value != 1:
+        raise RuntimeError("Valeur relue différente de la valeur écrite")
+    return {}
+
+
+def check_broker():
+    from apps.conversions.jobs import get_broker
+
+    return {'queue_depth': get_broker().depth()}
+
+
+def check_file_conversions():
+    """Conversions de fichiers en attente et âge de la plus ancienne"""
+    from apps.conversions.models import FileConversion
+
+    try:
+        rows = (
+            FileConversion.objects.filter(status__in=['pending', 'processing'])
+            .order_by().values('status').annotate(count=Count('id'), oldest=Min('created_at'))
+        )
+        by_status = {row['status']: row for row in rows}
+    finally:
+        connection.close_if_unusable_or_obsolete()
+    pending = by_status.get('pending')
+    oldest = pending['oldest'] if pending else None
+    return {
+        'pending': pending['count'] if pending else 0,
+        'processing': by_status['processing']['count'] if 'processing' in by_status else 0,
+        'oldest_pending_age_s': round((timezone.now() - oldest).total_seconds(), 1) if oldest else None,
+    }
+
+
+# Dépendances requises pour accepter du trafic, puis informations seules
+REQUIRED_CHECKS = {
+    'database': check_database,
+    'cache': check_cache,
+    'broker': check_broker,
+}
+INFORMATIONAL_CHECKS = {
+    'file_conversions': check_file_conversions,
+}
+
+
+def timed(func):
+    started = time.perf_counter()
+    details = func()
+    return details, time.perf_counter() - started
+
+
+def run_checks(timeout=None):
+    """Exécuter toutes les vérifications en parallèle, chacune limitée à `timeout` secondes"""
+    timeout = settings.HEALTH_CHECK_TIMEOUT if timeout is None else timeout
+    checks = {**REQUIRED_CHECKS, **INFORMATIONAL_CHECKS}
+    executor = get_executor()
+    futures = {name: executor.submit(timed, func) for name, func in checks.items()}
+    deadline = time.monotonic() + timeout
+
+    results = {}
+    for name, future in futures.items():
+        try:
+            details, duration = future.result(timeout=max(deadline - time.monotonic(), 0))
+        except TimeoutError:
+            future.cancel()
+            results[name] = {'status': 'timeout', 'latency_ms': round(timeout * 1000, 1)}
+        except Exception as e:
+            results[name] = {'status': 'error', 'error': f'{type(e).__name__}: {e}'}
+        else:
+            results[name] = {'status': 'ok', 'latency_ms': round(duration * 1000, 1), **details}
+
+    ready = all(results[name]['status'] == 'ok' for name in REQUIRED_CHECKS)
+    return {
+        'status': 'ready' if ready else 'unavailable',
+        'timestamp': timezone.now(),
+        'checks': results,
+    }
+
+
+_last_result = None
+_last_checked = 0.0
+_check_lock = threading.Lock()
+
+
+def readiness():
+    """Dernier résultat s'il a moins de HEALTH_CACHE_TTL secondes, sinon nouvelle vérification"""
+    global _last_result, _last_checked
+    ttl = settings.HEALTH_CACHE_TTL
+    result = _last_result
+    if result is not None and time.monotonic() - _last_checked < ttl:
+        return result
+    with _check_lock:
+        # Une autre requête a pu faire la vérification pendant l'attente
+        if _last_result is not None and time.monotonic() - _last_checked < ttl:
+            return _last_result
+        _last_result = run_checks()
+        _last_checked = time.monotonic()
+        return _last_result
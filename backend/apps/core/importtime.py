@@ -0,0 +1,129 @@
+"""
+Temps d'import au démarrage (commande importtime)
+
+Le démarrage d'un processus (web ou worker) est rejoué dans un interpréteur
+neuf lancé avec `python -X importtime`, dont la sortie (stderr) est
+analysée : temps propre et cumulé de chaque module, total par paquet de
+premier niveau, et bibliothèques lourdes importées au démarrage alors que
+le code du projet devrait ne les charger qu'à la première utilisation.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import namedtuple
+
+# Code exécuté au démarrage de chaque type de processus
+TARGETS = {
+    # WSGI/ASGI : application et URLconf (chargée à la première requête)
+    'web': (
+        "import django; django.setup(); "
+        "from django.conf import settings; from django.core.handlers.wsgi import WSGIHandler; "
+        "import importlib; WSGIHandler(); importlib.import_module(settings.ROOT_URLCONF)"
+    ),
+    'worker': (
+        "import django; django.setup(); "
+        "import apps.conversions.management.commands.run_conversion_worker"
+    ),
+}
+
+# Bibliothèques à ne charger qu'à la première utilisation
+LAZY_MODULES = ('PIL', 'numpy', 'requests', 'magic', 'multiprocessing')
+
+# Paquets du projet : un import direct d'une bibliothèque de LAZY_MODULES
+# depuis ces paquets dépasse le budget (les imports faits par les
+# dépendances, comme rest_framework.compat, sont seulement signalés)
+PROJECT_PACKAGES = ('apps', 'converthub')
+
+ImportLine = namedtuple('ImportLine', ['module', 'self_us', 'cumulative_us', 'depth'])
+
+
+def parse(output):
+    """Lignes « import time: self [us] | cumulative | imported package » de -X importtime"""
+    lines = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            self_us, cumulative_us = int(self_us), int(cumulative_us)
+        except ValueError:
+            # En-tête de colonnes
+            continue
+        module = name.strip()
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        lines.append(ImportLine(module, self_us, cumulative_us, depth))
+    return lines
+
+
+def import_chain(lines, index):
+    """Modules ayant provoqué l'import de lines[index] (le module importé est affiché après ses dépendances)"""
+    chain = []
+    depth = lines[index].depth
+    for line in lines[index + 1:]:
+        if line.depth < depth:
+            chain.append(line.module)
+            depth = line.depth
+            if depth == 0:
+                break
+    return chain
+
+
+def measure(target, settings_module, cwd):
+    """Lancer un interpréteur neuf ; retourne (lignes d'import, durée totale en secondes)"""
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+    started = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', TARGETS[target]],
+        cwd=cwd, env=env, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - started
+    if process.returncode != 0:
+        errors = [line for line in process.stderr.splitlines() if not line.startswith('import time:')]
+        raise RuntimeError('\n'.join(errors[-20:]) or f"Code de sortie {process.returncode}")
+    return parse(process.stderr), wall
+
+
+def report(target, settings_module, cwd, repeat=3, top=15):
+    """
+    Mesurer `repeat` démarrages (le premier chauffe les .pyc et le cache
+    disque) et détailler le plus rapide.
+    """
+    runs = [measure(target, settings_module, cwd) for _ in range(repeat)]
+    totals = [sum(line.self_us for line in lines) for lines, _ in runs]
+    best = min(range(len(runs)), key=totals.__getitem__)
+    lines, wall = runs[best]
+
+    packages = {}
+    for line in lines:
+        package = line.module.split('.')[0]
+        packages[package] = packages.get(package, 0) + line.self_us
+    eager = []
+    for index, line in enumerate(lines):
+        if line.module in LAZY_MODULES:
+            chain = import_chain(lines, index)
+            eager.append({
+                'module': line.module,
+                'imported_by': chain,
+                'from_project': bool(chain) and chain[0].split('.')[0] in PROJECT_PACKAGES,
+            })
+
+    return {
+        'target': target,
+        'runs': repeat,
+        'import_ms': round(totals[best] / 1000, 1),
+        'import_ms_median': round(statistics.median(totals) / 1000, 1),
+        'startup_ms': round(wall * 1000, 1),
+        'modules': len(lines),
+        'packages': [
+            {'package': package, 'self_ms': round(self_us / 1000, 1)}
+            for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]
+        ],
+        'slowest': [
+            {'module': line.module, 'self_ms': round(line.self_us / 1000, 1),
+             'cumulative_ms': round(line.cumulative_us / 1000, 1)}
+            for line in sorted(lines, key=lambda line: -line.self_us)[:top]
+        ],
+        'eager_lazy_modules': eager,
+    }
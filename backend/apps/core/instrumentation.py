@@ -0,0 +1,420 @@
+"""
+Instrumentation des requêtes (optionnelle, settings.INSTRUMENTATION)
+
+Pour chaque requête, le middleware mesure le temps total, le nombre et la
+durée des requêtes SQL, les succès et défauts du cache et le temps passé
+dans les sérialiseurs DRF. Les mesures sont agrégées par vue dans le
+processus et exposées au format Prometheus (/api/core/metrics/), ajoutées
+à l'en-tête Server-Timing et journalisées au-delà de SLOW_REQUEST_MS.
+
+Une requête peut aussi être profilée (cProfile, ou pyinstrument s'il est
+installé) : par échantillonnage (PROFILE_SAMPLE_RATE) ou avec l'en-tête
+X-Profile portant PROFILE_TOKEN. Les profils sont écrits dans PROFILE_DIR.
+
+Les mesures d'une requête sont portées par une variable de contexte :
+elles suivent la requête dans les threads de sync_to_async (vues
+asynchrones) sans mélanger les requêtes servies en parallèle.
+"""
+import contextvars
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Bornes des histogrammes de durée (secondes)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+UNMATCHED_VIEW = '<unmatched>'
+
+_current = contextvars.ContextVar('converthub_request_metrics', default=None)
+
+
+def instrumentation_settings():
+    return settings.INSTRUMENTATION
+
+
+class RequestMetrics:
+    """Mesures d'une requête en cours"""
+    __slots__ = ('db_queries', 'db_time', 'cache_hits', 'cache_misses', 'serializer_time', 'serializer_depth')
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+
+def current_metrics():
+    """Mesures de la requête courante (None hors requête instrumentée)"""
+    return _current.get()
+
+
+# Points de mesure
+
+def execute_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_queries += 1
+        metrics.db_time += time.perf_counter() - started
+
+
+def connection_opened(sender, connection, **kwargs):
+    if execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+
+_missing = object()
+
+
+def _count_get(get):
+    def instrumented_get(self, key, default=None, *args, **kwargs):
+        metrics = _current.get()
+        if metrics is None:
+            return get(self, key, default, *args, **kwargs)
+        value = get(self, key, _missing, *args, **kwargs)
+        if value is _missing:
+            metrics.cache_misses += 1
+            return default
+        metrics.cache_hits += 1
+        return value
+    instrumented_get.instrumented = True
+    return instrumented_get
+
+
+def _count_get_many(get_many):
+    def instrumented_get_many(self, keys, *args, **kwargs):
+        keys = list(keys)
+        values = get_many(self, keys, *args, **kwargs)
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.cache_hits += len(values)
+            metrics.cache_misses += len(keys) - len(values)
+        return values
+    instrumented_get_many.instrumented = True
+    return instrumented_get_many
+
+
+def _timed(method):
+    """Chronométrer un appel de sérialiseur (les appels imbriqués ne comptent qu'une fois)"""
+    def instrumented(self, *args, **kwargs):
+        metrics = _current.get()
+        if metrics is None or metrics.serializer_depth:
+            return method(self, *args, **kwargs)
+        metrics.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            metrics.serializer_time += time.perf_counter() - started
+            metrics.serializer_depth -= 1
+    instrumented.instrumented = True
+    return instrumented
+
+
+_hooks_installed = False
+_hooks_lock = threading.Lock()
+
+
+def install_hooks():
+    """Brancher les points de mesure (une fois par processus)"""
+    global _hooks_installed
+    with _hooks_lock:
+        if _hooks_installed:
+            return
+        from django.core.cache.backends.base import BaseCache
+        from django.db import connections
+        from rest_framework.serializers import BaseSerializer, ListSerializer
+
+        # Base de données : toutes les connexions, y compris celles ouvertes plus tard
+        connection_created.connect(connection_opened, dispatch_uid='converthub_instrumentation')
+        for connection in connections.all(initialized_only=True):
+            connection_opened(None, connection)
+
+        # Cache : classes des backends configurés (aget et aget_many passent par get et get_many)
+        for options in settings.CACHES.values():
+            backend = import_string(options['BACKEND'])
+            if not getattr(backend.get, 'instrumented', False):
+                backend.get = _count_get(backend.get)
+            if backend.get_many is not BaseCache.get_many and not getattr(backend.get_many, 'instrumented', False):
+                backend.get_many = _count_get_many(backend.get_many)
+
+        # Sérialiseurs : validation et représentation
+        BaseSerializer.data = property(_timed(BaseSerializer.data.fget))
+        for serializer_class in (BaseSerializer, ListSerializer):
+            serializer_class.is_valid = _timed(serializer_class.is_valid)
+        _hooks_installed = True
+
+
+# Agrégats du processus
+
+class MetricsRegistry:
+    """Compteurs et histogrammes par (vue, méthode), exposés au format Prometheus"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = {}
+            self.durations = {}
+            self.views = {}
+            self.profiles = 0
+
+    def record(self, view, method, status, duration, metrics):
+        bucket = next((index for index, bound in enumerate(DURATION_BUCKETS) if duration <= bound),
+                      len(DURATION_BUCKETS))
+        with self._lock:
+            key = (view, method, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            histogram = self.durations.get((view, method))
+            if histogram is None:
+                histogram = self.durations[(view, method)] = [[0] * (len(DURATION_BUCKETS) + 1), 0.0]
+            histogram[0][bucket] += 1
+            histogram[1] += duration
+            totals = self.views.get(view)
+            if totals is None:
+                totals = self.views[view] = [0, 0.0, 0, 0, 0.0]
+            totals[0] += metrics.db_queries
+            totals[1] += metrics.db_time
+            totals[2] += metrics.cache_hits
+            totals[3] += metrics.cache_misses
+            totals[4] += metrics.serializer_time
+
+    def record_profile(self):
+        with self._lock:
+            self.profiles += 1
+
+    def render(self):
+        """Texte d'exposition Prometheus (format 0.0.4)"""
+        with self._lock:
+            requests = dict(self.requests)
+            durations = {key: (list(counts), total) for key, (counts, total) in self.durations.items()}
+            views = {key: list(totals) for key, totals in self.views.items()}
+            profiles = self.profiles
+
+        lines = [
+            '# HELP converthub_http_requests_total Requêtes HTTP traitées',
+            '# TYPE converthub_http_requests_total counter',
+        ]
+        for (view, method, status), count in sorted(requests.items()):
+            lines.append(f'converthub_http_requests_total{labels(view=view, method=method, status=status)} {count}')
+
+        lines += [
+            '# HELP converthub_http_request_duration_seconds Durée des requêtes HTTP',
+            '# TYPE converthub_http_request_duration_seconds histogram',
+        ]
+        for (view, method), (counts, total) in sorted(durations.items()):
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS + ('+Inf',), counts):
+                cumulative += count
+                lines.append('converthub_http_request_duration_seconds_bucket'
+                             f'{labels(view=view, method=method, le=bound)} {cumulative}')
+            lines.append(f'converthub_http_request_duration_seconds_sum{labels(view=view, method=method)} {total!r}')
+            lines.append(f'converthub_http_request_duration_seconds_count{labels(view=view, method=method)} {cumulative}')
+
+        series = [
+            ('converthub_db_queries_total', 'counter', 'Requêtes SQL', 0),
+            ('converthub_db_query_duration_seconds_total', 'counter', 'Temps passé en requêtes SQL', 1),
+            ('converthub_serializer_duration_seconds_total', 'counter', 'Temps passé dans les sérialiseurs', 4),
+        ]
+        for name, kind, description, index in series:
+            lines += [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+            for view, totals in sorted(views.items()):
+                lines.append(f'{name}{labels(view=view)} {totals[index]!r}')
+
+        lines += [
+            '# HELP converthub_cache_requests_total Lectures du cache (succès et défauts)',
+            '# TYPE converthub_cache_requests_total counter',
+        ]
+        for view, totals in sorted(views.items()):
+            lines.append(f'converthub_cache_requests_total{labels(view=view, result="hit")} {totals[2]}')
+            lines.append(f'converthub_cache_requests_total{labels(view=view, result="miss")} {totals[3]}')
+
+        lines += [
+            '# HELP converthub_profiles_total Profils de requêtes enregistrés',
+            '# TYPE converthub_profiles_total counter',
+            f'converthub_profiles_total {profiles}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+def labels(**values):
+    escaped = (
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in values.items()
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+registry = MetricsRegistry()
+
+
+# Profilage
+
+# Un seul profil à la fois par processus (cProfile est global à un thread)
+_profile_lock = threading.Lock()
+
+
+def should_profile(request):
+    options = instrumentation_settings()
+    token = options['PROFILE_TOKEN']
+    if token and request.headers.get('X-Profile') == token:
+        return True
+    rate = options['PROFILE_SAMPLE_RATE']
+    return rate > 0 and random.random() < rate
+
+
+class Profiler:
+    """Profil d'une requête : cProfile (.prof, pstats / snakeviz) ou pyinstrument (.html)"""
+
+    def __init__(self, kind):
+        self.kind = kind
+        if kind == 'pyinstrument':
+            import pyinstrument
+
+            self._profiler = pyinstrument.Profiler(async_mode='enabled')
+        else:
+            import cProfile
+
+            self._profiler = cProfile.Profile()
+
+    def start(self):
+        if self.kind == 'pyinstrument':
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+
+    def stop(self):
+        if self.kind == 'pyinstrument':
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+
+    def save(self, request, duration):
+        directory = instrumentation_settings()['PROFILE_DIR']
+        os.makedirs(directory, exist_ok=True)
+        view = view_name(request).replace(':', '-').replace('/', '-')
+        name = f'{time.strftime("%Y%m%d-%H%M%S")}-{request.method}-{view}-{duration * 1000:.0f}ms-{os.getpid()}'
+        if self.kind == 'pyinstrument':
+            path = os.path.join(directory, name + '.html')
+            with open(path, 'w') as handle:
+                handle.write(self._profiler.output_html())
+        else:
+            path = os.path.join(directory, name + '.prof')
+            self._profiler.dump_stats(path)
+        registry.record_profile()
+        return path
+
+
+@contextmanager
+def maybe_profile(request, timer):
+    """Profiler la requête si elle est échantillonnée et qu'aucun profil n'est en cours"""
+    profiler = None
+    if should_profile(request) and _profile_lock.acquire(blocking=False):
+        try:
+            profiler = Profiler(instrumentation_settings()['PROFILER'])
+            profiler.start()
+        except Exception:
+            _profile_lock.release()
+            logger.exception("Profilage impossible")
+            profiler = None
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            try:
+                profiler.stop()
+                path = profiler.save(request, timer())
+                logger.info("Profil de %s %s : %s", request.method, request.path, path)
+            except Exception:
+                logger.exception("Enregistrement du profil impossible")
+            finally:
+                _profile_lock.release()
+
+
+# Middleware
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNMATCHED_VIEW
+    return match.view_name or UNMATCHED_VIEW
+
+
+class InstrumentationMiddleware:
+    """
+    Mesures par requête (actif si INSTRUMENTATION['ENABLED']). Compatible
+    WSGI et ASGI : sous ASGI, les vues asynchrones ne passent pas par un thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not instrumentation_settings()['ENABLED']:
+            raise MiddlewareNotUsed
+        install_hooks()
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with maybe_profile(request, lambda: time.perf_counter() - started):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, time.perf_counter() - started, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with maybe_profile(request, lambda: time.perf_counter() - started):
+                response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, time.perf_counter() - started, metrics)
+
+    def finish(self, request, response, duration, metrics):
+        view = view_name(request)
+        if view == 'core:metrics':
+            return response
+        registry.record(view, request.method, response.status_code, duration, metrics)
+        response['Server-Timing'] = ', '.join([
+            f'app;dur={duration * 1000:.1f}',
+            f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.db_queries} queries"',
+            f'serializer;dur={metrics.serializer_time * 1000:.1f}',
+        ])
+        slow = instrumentation_settings()['SLOW_REQUEST_MS']
+        if slow and duration * 1000 >= slow:
+            logger.warning(
+                "Requête lente %s %s (%s) : %.0f ms, %d requêtes SQL (%.0f ms), cache %d/%d, sérialiseurs %.0f ms",
+                request.method, request.path, view, duration * 1000, metrics.db_queries,
+                metrics.db_time * 1000, metrics.cache_hits, metrics.cache_hits + metrics.cache_misses,
+                metrics.serializer_time * 1000,
+            )
+        return response
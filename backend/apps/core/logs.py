@@ -0,0 +1,341 @@
+"""
+Journalisation non bloquante
+
+QueueHandler ne fait que déposer l'enregistrement dans une file bornée :
+l'écriture sur disque (et sur la console) est faite par un thread dédié,
+par lots, avec rotation du fichier par taille et/ou par période. Si la file
+est pleine (disque lent ou plein), les enregistrements sont abandonnés et
+comptés au lieu de bloquer la requête ; le nombre d'abandons est écrit dès
+que l'écriture reprend.
+
+Configuration (settings.LOGGING) :
+    'handlers': {'queue': {
+        'class': 'apps.core.logs.QueueHandler',
+        'filename': ..., 'max_bytes': ..., 'when': 'midnight', 'as_json': False,
+    }}
+"""
+import atexit
+import copy
+import datetime
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+import weakref
+
+DEFAULT_FORMAT = '%(asctime)s %(levelname)s %(name)s %(process)d %(message)s'
+
+# Périodes de rotation acceptées pour `when`
+ROTATION_PERIODS = ('midnight', 'hourly', 'never')
+
+# Intervalle minimal entre deux messages d'erreur d'écriture sur stderr
+ERROR_REPORT_INTERVAL = 60
+
+# Attributs standard d'un LogRecord (les autres viennent de `extra`)
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+
+class JSONFormatter(logging.Formatter):
+    """Une ligne JSON par enregistrement, champs `extra` compris"""
+
+    def format(self, record):
+        data = {
+            'time': datetime.datetime.fromtimestamp(record.created).astimezone().isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exception'] = record.exc_text
+        if record.stack_info:
+            data['stack'] = record.stack_info
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class RotatingWriter:
+    """Fichier journal écrit par lots, avec rotation par taille et par période"""
+
+    def __init__(self, filename, max_bytes=0, when='never', backup_count=7, encoding='utf-8'):
+        if when not in ROTATION_PERIODS:
+            raise ValueError(f"Période de rotation inconnue : {when} ({', '.join(ROTATION_PERIODS)})")
+        self.filename = os.fspath(filename)
+        self.max_bytes = max_bytes
+        self.when = when
+        self.backup_count = backup_count
+        self.encoding = encoding
+        self.stream = None
+        self.rollover_at = None
+
+    def open(self):
+        os.makedirs(os.path.dirname(self.filename) or '.', exist_ok=True)
+        self.stream = open(self.filename, 'a', encoding=self.encoding)
+        self.rollover_at = self.next_rollover(time.time())
+
+    def close(self):
+        if self.stream is not None:
+            try:
+                self.stream.close()
+            finally:
+                self.stream = None
+
+    def next_rollover(self, now):
+        if self.when == 'never':
+            return None
+        current = datetime.datetime.fromtimestamp(now)
+        if self.when == 'hourly':
+            boundary = current.replace(minute=0, second=0, microsecond=0) + datetime.timedelta(hours=1)
+        else:
+            boundary = datetime.datetime.combine(current.date() + datetime.timedelta(days=1), datetime.time())
+        return boundary.timestamp()
+
+    def write(self, text):
+        if self.stream is None:
+            self.open()
+        data = text.encode(self.encoding)
+        if self.should_rollover(len(data)):
+            self.rollover()
+        self.stream.write(text)
+        self.stream.flush()
+
+    def should_rollover(self, data_size):
+        if self.rollover_at is not None and time.time() >= self.rollover_at:
+            return True
+        if not self.max_bytes:
+            return False
+        # Taille réelle : d'autres processus peuvent écrire dans le même fichier
+        size = os.fstat(self.stream.fileno()).st_size
+        return size > 0 and size + data_size > self.max_bytes
+
+    def rollover(self):
+        # Plusieurs processus peuvent partager le fichier : s'il a déjà été
+        # renommé par un autre, il suffit de rouvrir le nouveau
+        rotated_elsewhere = self.rotated_elsewhere()
+        self.close()
+        if not rotated_elsewhere:
+            stamp = time.strftime('%Y%m%d-%H%M%S')
+            target = f'{self.filename}.{stamp}'
+            index = 1
+            while os.path.exists(target):
+                target = f'{self.filename}.{stamp}-{index}'
+                index += 1
+            try:
+                os.rename(self.filename, target)
+            except FileNotFoundError:
+                pass
+            self.remove_old_backups()
+        self.open()
+
+    def rotated_elsewhere(self):
+        try:
+            return os.stat(self.filename).st_ino != os.fstat(self.stream.fileno()).st_ino
+        except OSError:
+            return True
+
+    def remove_old_backups(self):
+        if not self.backup_count:
+            return
+        directory, base = os.path.split(self.filename)
+        prefix = base + '.'
+        backups = sorted(name for name in os.listdir(directory or '.') if name.startswith(prefix))
+        for name in backups[:-self.backup_count]:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+class QueueHandler(logging.Handler):
+    """
+    Handler non bloquant : file bornée vidée par un thread d'écriture.
+
+    La classe ne dérive pas de logging.handlers.QueueHandler : depuis Python
+    3.12, dictConfig traite ses sous-classes à part (options queue, listener
+    et handlers) et refuse cette configuration.
+
+    filename : fichier journal (None : console seulement) ; console : copie
+    sur stderr ; as_json : une ligne JSON par enregistrement ; max_bytes et
+    when ('midnight', 'hourly', 'never') : rotation ; backup_count :
+    fichiers conservés ; queue_size, batch_size et flush_interval : file et
+    écriture par lots.
+    """
+
+    def __init__(self, filename=None, console=True, as_json=False, format=DEFAULT_FORMAT,
+                 max_bytes=0, when='never', backup_count=7, queue_size=10000,
+                 batch_size=256, flush_interval=0.5):
+        super().__init__()
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.writer = RotatingWriter(filename, max_bytes, when, backup_count) if filename else None
+        self.console = console
+        self.output_formatter = JSONFormatter() if as_json else logging.Formatter(format)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._last_error_report = 0
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.start()
+        _handlers.add(self)
+
+    # Côté appelant : jamais d'attente
+
+    def prepare(self, record):
+        # Le message et la pile d'appels sont calculés ici (les arguments
+        # peuvent changer après l'appel) ; le formatage complet est fait par
+        # le thread d'écriture
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = self.output_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def emit(self, record):
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+        try:
+            self.enqueue(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+    # Thread d'écriture
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            if record is None:
+                return
+            batch = [record]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    record = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if record is None:
+                    stop = True
+                    break
+                batch.append(record)
+            try:
+                self._write(batch)
+            except Exception as e:
+                # Le thread d'écriture doit survivre à toute erreur d'écriture
+                self._report_error(e)
+            if stop:
+                return
+
+    def _write(self, batch):
+        with self._dropped_lock:
+            dropped, self.dropped = self.dropped, 0
+        if dropped:
+            batch.insert(0, logging.makeLogRecord({
+                'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                'msg': f"{dropped} message(s) de journal abandonné(s) : file pleine",
+            }))
+        lines = []
+        for record in batch:
+            try:
+                lines.append(self.output_formatter.format(record) + '\n')
+            except Exception:
+                lines.append(f'{record.levelname} {record.name} (formatage impossible) {record.msg!r}\n')
+        text = ''.join(lines)
+
+        if self.console:
+            try:
+                sys.stderr.write(text)
+                sys.stderr.flush()
+            except (OSError, ValueError):
+                pass
+        if self.writer is not None:
+            try:
+                self.writer.write(text)
+            except OSError as e:
+                # Disque plein ou inaccessible : le lot est perdu, l'API continue.
+                # La fermeture peut échouer à son tour (vidage du tampon) : le
+                # thread d'écriture ne doit pas s'arrêter pour autant
+                try:
+                    self.writer.close()
+                except OSError:
+                    pass
+                with self._dropped_lock:
+                    self.dropped += len(batch)
+                self._report_error(e)
+
+    def _report_error(self, error):
+        now = time.monotonic()
+        if now - self._last_error_report >= ERROR_REPORT_INTERVAL:
+            self._last_error_report = now
+            try:
+                target = self.writer.filename if self.writer is not None else 'console'
+                sys.stderr.write(f"Écriture du journal {target} impossible : {error}\n")
+            except (OSError, ValueError):
+                pass
+
+    def stop(self, timeout=5):
+        """Vider la file puis arrêter le thread d'écriture"""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        thread.join(timeout)
+
+    def close(self):
+        self.stop()
+        if self.writer is not None:
+            self.writer.close()
+        super().close()
+
+    def _after_fork(self):
+        # Le thread d'écriture n'existe pas dans l'enfant : repartir d'un état propre
+        self.queue = queue.Queue(maxsize=self.queue.maxsize)
+        self._thread = None
+        self._dropped_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        if self.writer is not None:
+            self.writer.close()
+
+
+_handlers = weakref.WeakSet()
+
+
+def _stop_all():
+    for handler in list(_handlers):
+        handler.stop()
+
+
+def _after_fork():
+    for handler in list(_handlers):
+        handler._after_fork()
+
+
+atexit.register(_stop_all)
+os.register_at_fork(after_in_child=_after_fork)
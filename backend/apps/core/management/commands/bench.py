@@ -0,0 +1,98 @@
+"""
+Commande : micro-benchmarks et test de charge local de l'API
+"""
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from apps.core import bench
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesurer le moteur, les sérialiseurs et les convertisseurs, puis rejouer un "
+        "mélange de requêtes sur une base de test (latences, débit, requêtes SQL)"
+    )
+
+    def add_arguments(self, parser):
+        parts = parser.add_mutually_exclusive_group()
+        parts.add_argument('--micro-only', action='store_true', help="Micro-benchmarks uniquement")
+        parts.add_argument('--load-only', action='store_true', help="Test de charge uniquement")
+        parser.add_argument('--micro', action='append', metavar='PREFIXE',
+                            help="Limiter les micro-benchmarks à ces préfixes (ex: engine, bases)")
+        parser.add_argument('--repeat', type=int, default=5, help="Répétitions par micro-benchmark")
+        parser.add_argument('--requests', type=int, default=2000, help="Nombre de requêtes du test de charge")
+        parser.add_argument('--concurrency', type=int, default=4, help="Clients simultanés")
+        parser.add_argument('--warmup', type=int, default=100, help="Requêtes de préchauffage (non mesurées)")
+        parser.add_argument('--seed', type=int, default=0, help="Graine du tirage des requêtes")
+        parser.add_argument('--output', help="Écrire le rapport JSON dans ce fichier")
+        parser.add_argument('--baseline', help="Rapport JSON de référence à comparer")
+        parser.add_argument('--threshold', type=float, default=0.15,
+                            help="Dégradation tolérée par rapport à la référence (0.15 = 15 %%)")
+        parser.add_argument('--fail-on-regression', action='store_true',
+                            help="Code de sortie non nul en cas de régression")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as handle:
+                baseline = json.load(handle)
+
+        report = {'environment': bench.environment(), 'options': {
+            key: options[key] for key in ('requests', 'concurrency', 'warmup', 'repeat', 'seed')
+        }}
+        # Cache local : les entrées (catalogue, moteur, identifiants) se rapportent à la base de test
+        local_cache = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                   'LOCATION': 'converthub-bench'}}
+        with bench.temporary_directory() as workdir, override_settings(CACHES=local_cache):
+            old_name = self.setup_database(workdir)
+            try:
+                bench.seed()
+                if not options['load_only']:
+                    self.stderr.write("Micro-benchmarks…")
+                    report['micro'] = bench.micro_benchmarks(workdir, options['repeat'], options['micro'])
+                if not options['micro_only']:
+                    self.stderr.write(
+                        f"Test de charge : {options['requests']} requêtes, {options['concurrency']} clients…"
+                    )
+                    report['load'] = bench.run_load(
+                        options['requests'], options['concurrency'], options['warmup'], options['seed']
+                    )
+            finally:
+                self.teardown_database(old_name)
+
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        if baseline is not None:
+            regressions = bench.compare(report, baseline, options['threshold'])
+            for regression in regressions:
+                self.stderr.write(self.style.WARNING(f"Régression : {regression}"))
+            if not regressions:
+                self.stderr.write(self.style.SUCCESS("Aucune régression par rapport à la référence"))
+            elif options['fail_on_regression']:
+                raise CommandError(f"{len(regressions)} régression(s) par rapport à la référence")
+
+    def setup_database(self, workdir):
+        """Base de test jetable (jamais la base configurée), fichier pour SQLite : partagée entre threads"""
+        setup_test_environment(debug=False)
+        if connection.vendor == 'sqlite':
+            connection.settings_dict['TEST']['NAME'] = os.path.join(workdir, 'bench.sqlite3')
+        return connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+
+    def teardown_database(self, old_name):
+        from apps.conversions.engine import invalidate_engine
+        from apps.conversions.registry import clear_caches
+
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+        # Les caches en mémoire référencent des lignes de la base de test
+        clear_caches()
+        invalidate_engine()
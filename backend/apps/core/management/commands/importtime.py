@@ -0,0 +1,77 @@
+"""
+Commande : temps d'import au démarrage et budget
+"""
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core import importtime
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesurer le temps d'import au démarrage d'un processus web ou worker "
+        "(python -X importtime) et vérifier le budget"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', choices=sorted(importtime.TARGETS), action='append',
+                            help="Processus à mesurer (web et worker par défaut)")
+        parser.add_argument('--budget-ms', type=float, default=settings.IMPORT_TIME_BUDGET_MS,
+                            help="Temps d'import maximal (ms, 0 : pas de budget)")
+        parser.add_argument('--repeat', type=int, default=3, help="Démarrages mesurés par processus")
+        parser.add_argument('--top', type=int, default=15, help="Nombre de modules et paquets détaillés")
+        parser.add_argument('--json', action='store_true', help="Rapport JSON")
+
+    def handle(self, *args, **options):
+        settings_module = os.environ.get('DJANGO_SETTINGS_MODULE', 'converthub.settings')
+        budget = options['budget_ms']
+        reports = []
+        for target in options['target'] or sorted(importtime.TARGETS):
+            try:
+                reports.append(importtime.report(
+                    target, settings_module, settings.BASE_DIR, max(options['repeat'], 1), options['top']
+                ))
+            except RuntimeError as e:
+                raise CommandError(f"Démarrage « {target} » impossible :\n{e}")
+
+        if options['json']:
+            self.stdout.write(json.dumps(reports, indent=2))
+        else:
+            for report in reports:
+                self.write_report(report, budget)
+
+        failures = []
+        for report in reports:
+            if budget and report['import_ms'] > budget:
+                failures.append(f"{report['target']} : {report['import_ms']} ms > budget {budget:g} ms")
+            for eager in report['eager_lazy_modules']:
+                if eager['from_project']:
+                    failures.append(
+                        f"{report['target']} : {eager['module']} importé au démarrage par {eager['imported_by'][0]}"
+                    )
+        if failures:
+            raise CommandError("Budget de démarrage dépassé\n" + '\n'.join(failures))
+
+    def write_report(self, report, budget):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{report['target']} : imports {report['import_ms']} ms "
+            f"(médiane {report['import_ms_median']} ms sur {report['runs']}), "
+            f"démarrage {report['startup_ms']} ms, {report['modules']} modules"
+            + (f", budget {budget:g} ms" if budget else '')
+        ))
+        self.stdout.write("  Par paquet (temps propre) :")
+        for package in report['packages']:
+            self.stdout.write(f"    {package['self_ms']:8.1f} ms  {package['package']}")
+        self.stdout.write("  Modules les plus lents (propre / cumulé) :")
+        for module in report['slowest']:
+            self.stdout.write(
+                f"    {module['self_ms']:8.1f} ms {module['cumulative_ms']:8.1f} ms  {module['module']}"
+            )
+        for eager in report['eager_lazy_modules']:
+            style = self.style.ERROR if eager['from_project'] else self.style.WARNING
+            self.stdout.write(style(
+                f"  {eager['module']} chargé au démarrage : {' <- '.join(eager['imported_by'])}"
+            ))
@@ -0,0 +1,64 @@
+"""
+Commande : recalculer les compteurs de statistiques depuis l'historique
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+from apps.conversions.models import Conversion, FileConversion
+from apps.core.counters import GLOBAL_KEY
+from apps.core.models import DailyCounter, TotalCounter
+
+# (mesure, queryset, portée, champ de regroupement)
+SOURCES = [
+    ('conversions', Conversion.objects, 'global', None),
+    ('conversions', Conversion.objects, 'type', 'conversion_type_id'),
+    ('conversions', Conversion.objects, 'category', 'conversion_type__category_id'),
+    ('conversions', Conversion.objects.filter(user__isnull=False), 'user', 'user_id'),
+    ('file_conversions', FileConversion.objects, 'global', None),
+    ('file_conversions', FileConversion.objects.filter(user__isnull=False), 'user', 'user_id'),
+]
+
+
+class Command(BaseCommand):
+    help = "Reconstruire les compteurs de statistiques à partir de l'historique"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help="Nombre de compteurs insérés par requête"
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        with transaction.atomic():
+            DailyCounter.objects.all().delete()
+            TotalCounter.objects.all().delete()
+            for metric, queryset, scope, field in SOURCES:
+                group = ['day'] + ([field] if field else [])
+                rows = (
+                    queryset.order_by()
+                    .annotate(day=TruncDate('created_at'))
+                    .values(*group)
+                    .annotate(count=Count('id'))
+                    .values_list(*group, 'count')
+                    .iterator()
+                )
+                totals = {}
+                daily = []
+                for row in rows:
+                    day, key, count = (row[0], row[1], row[2]) if field else (row[0], GLOBAL_KEY, row[1])
+                    daily.append(DailyCounter(day=day, scope=scope, key=key, metric=metric, count=count))
+                    totals[key] = totals.get(key, 0) + count
+                    if len(daily) >= batch_size:
+                        DailyCounter.objects.bulk_create(daily)
+                        daily = []
+                DailyCounter.objects.bulk_create(daily)
+                TotalCounter.objects.bulk_create(
+                    [TotalCounter(scope=scope, key=key, metric=metric, count=count)
+                     for key, count in totals.items()],
+                    batch_size=batch_size
+                )
+                self.stdout.write(f"{metric} / {scope} : {len(totals)} total(aux)")
+        self.stdout.write(self.style.SUCCESS("Compteurs de statistiques reconstruits"))
@@ -0,0 +1,46 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Jour')),
+                ('scope', models.CharField(choices=[('global', 'Global'), ('category', 'Catégorie'), ('type', 'Type de conversion'), ('user', 'Utilisateur')], max_length=20, verbose_name='Portée')),
+                ('key', models.BigIntegerField(default=0, verbose_name='Identifiant')),
+                ('metric', models.CharField(choices=[('conversions', 'Conversions'), ('file_conversions', 'Conversions de fichiers')], max_length=30, verbose_name='Mesure')),
+                ('count', models.BigIntegerField(default=0, verbose_name='Nombre')),
+            ],
+            options={
+                'verbose_name': 'Compteur journalier',
+                'verbose_name_plural': 'Compteurs journaliers',
+                'ordering': ['-day'],
+                'unique_together': {('scope', 'key', 'metric', 'day')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TotalCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('global', 'Global'), ('category', 'Catégorie'), ('type', 'Type de conversion'), ('user', 'Utilisateur')], max_length=20, verbose_name='Portée')),
+                ('key', models.BigIntegerField(default=0, verbose_name='Identifiant')),
+                ('metric', models.CharField(choices=[('conversions', 'Conversions'), ('file_conversions', 'Conversions de fichiers')], max_length=30, verbose_name='Mesure')),
+                ('count', models.BigIntegerField(default=0, verbose_name='Nombre')),
+            ],
+            options={
+                'verbose_name': 'Compteur total',
+                'verbose_name_plural': 'Compteurs totaux',
+                'unique_together': {('scope', 'key', 'metric')},
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+"""
+Modèles de l'application core : compteurs de statistiques pré-agrégés
+"""
+from django.db import models
+
+SCOPE_CHOICES = [
+    ('global', 'Global'),
+    ('category', 'Catégorie'),
+    ('type', 'Type de conversion'),
+    ('user', 'Utilisateur'),
+]
+
+METRIC_CHOICES = [
+    ('conversions', 'Conversions'),
+    ('file_conversions', 'Conversions de fichiers'),
+]
+
+
+class DailyCounter(models.Model):
+    """Nombre d'événements d'un jour pour une portée (global, catégorie, type, utilisateur)"""
+    day = models.DateField(verbose_name="Jour")
+    scope = models.CharField(max_length=20, choices=SCOPE_CHOICES, verbose_name="Portée")
+    key = models.BigIntegerField(default=0, verbose_name="Identifiant")
+    metric = models.CharField(max_length=30, choices=METRIC_CHOICES, verbose_name="Mesure")
+    count = models.BigIntegerField(default=0, verbose_name="Nombre")
+
+    class Meta:
+        verbose_name = "Compteur journalier"
+        verbose_name_plural = "Compteurs journaliers"
+        unique_together = ['scope', 'key', 'metric', 'day']
+        ordering = ['-day']
+
+    def __str__(self):
+        return f"{self.day} {self.scope}:{self.key} {self.metric} = {self.count}"
+
+
+class TotalCounter(models.Model):
+    """Total depuis l'origine d'une portée, lu directement par les vues de statistiques"""
+    scope = models.CharField(max_length=20, choices=SCOPE_CHOICES, verbose_name="Portée")
+    key = models.BigIntegerField(default=0, verbose_name="Identifiant")
+    metric = models.CharField(max_length=30, choices=METRIC_CHOICES, verbose_name="Mesure")
+    count = models.BigIntegerField(default=0, verbose_name="Nombre")
+
+    class Meta:
+        verbose_name = "Compteur total"
+        verbose_name_plural = "Compteurs totaux"
+        unique_together = ['scope', 'key', 'metric']
+
+    def __str__(self):
+        return f"{self.scope}:{self.key} {self.metric} = {self.count}"
@@ -0,0 +1,55 @@
+"""
+Signaux de l'application core : mise à jour des compteurs de statistiques
+"""
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from apps.conversions.models import Conversion, ConversionType, FileConversion
+
+from .counters import count_conversions, count_file_conversions, forget_user, move_type_category
+
+
+@receiver(post_save, sender=Conversion)
+def conversion_saved(sender, instance, created, **kwargs):
+    # Les écritures par lot (bulk_create) sont comptées par l'historique
+    if created:
+        count_conversions([instance])
+
+
+@receiver(post_delete, sender=Conversion)
+def conversion_deleted(sender, instance, **kwargs):
+    count_conversions([instance], sign=-1)
+
+
+@receiver(post_save, sender=FileConversion)
+def file_conversion_saved(sender, instance, created, **kwargs):
+    if created:
+        count_file_conversions([instance])
+
+
+@receiver(post_delete, sender=FileConversion)
+def file_conversion_deleted(sender, instance, **kwargs):
+    count_file_conversions([instance], sign=-1)
+
+
+@receiver(pre_save, sender=ConversionType)
+def conversion_type_saving(sender, instance, raw=False, **kwargs):
+    # Catégorie avant modification, pour déplacer les compteurs après l'enregistrement
+    instance._previous_category_id = None
+    if instance.pk is not None and not raw:
+        instance._previous_category_id = (
+            ConversionType.objects.filter(pk=instance.pk).values_list('category_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=ConversionType)
+def conversion_type_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_category_id', None)
+    if not created and previous is not None and previous != instance.category_id:
+        move_type_category(instance.pk, previous, instance.category_id)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    forget_user(instance.pk)
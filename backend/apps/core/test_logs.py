@@ -0,0 +1,69 @@
+"""
+Journalisation : configuration LOGGING du projet et thread d'écriture
+"""
+import copy
+import logging
+import logging.config
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from converthub import settings as project_settings
+
+from .logs import QueueHandler
+
+
+class LoggingConfigTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.filename = os.path.join(directory.name, 'django.log')
+        # Configuration courante rétablie après le test
+        loggers = [logging.getLogger(), logging.getLogger('django')]
+        saved = [(logger, logger.handlers[:], logger.level, logger.propagate) for logger in loggers]
+
+        def restore():
+            for logger, handlers, level, propagate in saved:
+                for handler in logger.handlers:
+                    if handler not in handlers:
+                        handler.close()
+                logger.handlers[:] = handlers
+                logger.setLevel(level)
+                logger.propagate = propagate
+        self.addCleanup(restore)
+
+    def test_project_logging_config(self):
+        config = copy.deepcopy(project_settings.LOGGING)
+        config['handlers']['queue'].update(filename=self.filename, console=False)
+        # Python 3.12+ : dictConfig refuse les sous-classes de logging.handlers.QueueHandler
+        logging.config.dictConfig(config)
+
+        handler = logging.getLogger().handlers[0]
+        self.assertIsInstance(handler, QueueHandler)
+        logging.getLogger('apps.test').warning("message %s", 'écrit')
+        handler.stop()
+        with open(self.filename, encoding='utf-8') as log:
+            self.assertIn('message écrit', log.read())
+
+    def test_writer_survives_close_failure(self):
+        handler = QueueHandler(filename=self.filename, console=False, flush_interval=0.01)
+        self.addCleanup(handler.close)
+        record = logging.makeLogRecord({'msg': 'disque plein', 'levelname': 'ERROR', 'levelno': logging.ERROR})
+        with mock.patch.object(handler.writer, 'write', side_effect=OSError(28, 'No space left on device')), \
+                mock.patch.object(handler.writer, 'close', side_effect=OSError(28, 'No space left on device')), \
+                mock.patch('sys.stderr'):
+            handler.emit(record)
+            handler.emit(record)
+            handler.stop()
+        self.assertEqual(handler.dropped, 2)
+
+        # Le disque est de nouveau disponible : l'écriture reprend et signale les pertes
+        handler.emit(logging.makeLogRecord({'msg': 'reprise', 'levelname': 'INFO', 'levelno': logging.INFO}))
+        handler.stop()
+        with open(self.filename, encoding='utf-8') as log:
+            content = log.read()
+        self.assertIn('2 message(s) de journal abandonné(s)', content)
+        self.assertIn('reprise', content)
@@ -0,0 +1,116 @@
+"""
+Compteurs de statistiques : identiques à ceux recalculés par rebuild_stats
+"""
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from apps.conversions.history import record_conversions
+from apps.conversions.models import ConversionCategory, ConversionType, Conversion, FileConversion
+from apps.conversions.registry import clear_caches, unit_id
+
+from . import counters
+from .counters import CounterBuffer, flush_counters
+from .models import DailyCounter, TotalCounter
+
+
+def snapshot():
+    """Compteurs non nuls : {(portée, clé, mesure, jour ou None): nombre}"""
+    daily = {
+        (scope, key, metric, day): count
+        for scope, key, metric, day, count in DailyCounter.objects.exclude(count=0)
+        .values_list('scope', 'key', 'metric', 'day', 'count')
+    }
+    totals = {
+        (scope, key, metric, None): count
+        for scope, key, metric, count in TotalCounter.objects.exclude(count=0)
+        .values_list('scope', 'key', 'metric', 'count')
+    }
+    return {**daily, **totals}
+
+
+@override_settings(CONVERSION_HISTORY={'WRITE_BEHIND': False})
+class CountersMatchRebuildTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.longueur = ConversionCategory.objects.create(name='Longueur', slug='longueur')
+        cls.masse = ConversionCategory.objects.create(name='Masse', slug='masse')
+        cls.km = ConversionType.objects.create(
+            category=cls.longueur, name='Mètres en kilomètres', slug='m-km',
+            input_unit='m', output_unit='km', factor='0.001',
+        )
+        cls.kg = ConversionType.objects.create(
+            category=cls.longueur, name='Grammes en kilogrammes', slug='g-kg',
+            input_unit='g', output_unit='kg', factor='0.001',
+        )
+        cls.alice = User.objects.create_user('alice')
+        cls.bob = User.objects.create_user('bob')
+
+    def setUp(self):
+        clear_caches()
+        self.addCleanup(clear_caches)
+
+    def conversion(self, conversion_type, user):
+        return Conversion(
+            conversion_type=conversion_type, user=user,
+            input_value=Decimal('1000'), output_value=Decimal('1'),
+            input_unit_id=unit_id(conversion_type.input_unit),
+            output_unit_id=unit_id(conversion_type.output_unit),
+        )
+
+    def exercise(self):
+        """Écritures unitaires et par lot, suppressions, changement de catégorie, utilisateur supprimé"""
+        record_conversions([self.conversion(self.km, self.alice)])
+        record_conversions([self.conversion(self.km, None)])
+        record_conversions([
+            self.conversion(self.kg, self.bob), self.conversion(self.kg, self.alice),
+            self.conversion(self.km, self.bob),
+        ])
+        Conversion.objects.filter(user=self.alice, conversion_type=self.km).first().delete()
+        for user in (self.alice, self.bob, None):
+            FileConversion.objects.create(
+                user=user, input_file='blobs/entree.csv', input_format='csv',
+                output_format='ndjson', file_size_input=10,
+            )
+        FileConversion.objects.filter(user=self.alice).delete()
+
+        # Le type « g-kg » était mal classé
+        self.kg.category = self.masse
+        self.kg.save()
+        self.bob.delete()
+
+    def assert_matches_rebuild(self):
+        live = snapshot()
+        call_command('rebuild_stats', stdout=StringIO())
+        self.assertEqual(live, snapshot())
+        self.assertEqual(TotalCounter.objects.get(scope='category', key=self.masse.pk).count, 2)
+        self.assertFalse(TotalCounter.objects.filter(scope='user', key=self.bob.pk).exists())
+
+    def test_immediate(self):
+        self.exercise()
+        self.assert_matches_rebuild()
+
+    def test_buffered(self):
+        buffer = CounterBuffer(flush_interval=3600)
+        with override_settings(STATS_FLUSH_INTERVAL=3600), \
+                mock.patch.object(counters, '_buffer', buffer), \
+                mock.patch.object(CounterBuffer, '_ensure_started'):
+            record_conversions([self.conversion(self.km, self.alice) for _ in range(3)])
+            # Rien n'est écrit avant l'application des incréments cumulés
+            self.assertFalse(TotalCounter.objects.filter(scope='global').exists())
+            with CaptureQueriesContext(connection) as queries:
+                flush_counters()
+            # Une requête par table de compteurs pour tout ce qui était en attente
+            self.assertEqual(sum(query['sql'].startswith('INSERT') for query in queries), 2)
+            self.assertEqual(TotalCounter.objects.get(scope='global', metric='conversions').count, 3)
+
+            self.exercise()
+            flush_counters()
+        self.assert_matches_rebuild()
@@ -8,5 +8,7 @@ app_name = 'core'
 
 urlpatterns = [
     path('health/', views.HealthCheckView.as_view(), name='health'),
+    path('health/ready/', views.ReadinessView.as_view(), name='readiness'),
     path('stats/', views.GlobalStatsView.as_view(), name='stats'),
+    path('metrics/', views.metrics, name='metrics'),
 ]
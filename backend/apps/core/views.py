@@ -1,22 +1,52 @@
 """
 Vues pour l'application core
 """
-from rest_framework import generics, permissions
+from rest_framework import generics, permissions, status
 from rest_framework.response import Response
-from rest_framework.decorators import api_view, permission_classes
-from django.db.models import Count
-from apps.conversions.models import Conversion, FileConversion, ConversionCategory
+from rest_framework.views import APIView
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from apps.conversions.models import ConversionCategory
+from .counters import GLOBAL_KEY, get_totals
+from .health import readiness
+from .instrumentation import registry
 
 
-@api_view(['GET'])
-@permission_classes([permissions.AllowAny])
-def health_check(request):
-    """Vérification de l'état de l'API"""
-    return Response({
-        'status': 'healthy',
-        'message': 'ConvertHub API is running',
-        'timestamp': '2024-01-01T00:00:00Z'
-    })
+class HealthCheckView(APIView):
+    """Vivacité (liveness) : le processus répond, sans interroger les dépendances"""
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+
+    def get(self, request):
+        return Response({
+            'status': 'healthy',
+            'message': 'ConvertHub API is running',
+            'timestamp': timezone.now()
+        })
+
+
+class ReadinessView(APIView):
+    """Disponibilité (readiness) : base de données, cache et broker, 503 si l'un d'eux est indisponible"""
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+
+    def get(self, request):
+        result = readiness()
+        response_status = status.HTTP_200_OK if result['status'] == 'ready' else status.HTTP_503_SERVICE_UNAVAILABLE
+        return Response(result, status=response_status, headers={'Cache-Control': 'no-store'})
+
+
+def metrics(request):
+    """Agrégats de l'instrumentation au format Prometheus (processus courant)"""
+    options = settings.INSTRUMENTATION
+    if not options['ENABLED']:
+        raise Http404
+    token = options['METRICS_TOKEN']
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=401)
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 
 class GlobalStatsView(generics.RetrieveAPIView):
@@ -24,22 +54,21 @@ class GlobalStatsView(generics.RetrieveAPIView):
     permission_classes = [permissions.AllowAny]
     
     def retrieve(self, request, *args, **kwargs):
-        """Récupérer les statistiques globales"""
-        total_conversions = Conversion.objects.count()
-        total_file_conversions = FileConversion.objects.count()
-        total_categories = ConversionCategory.objects.filter(is_active=True).count()
+        """Récupérer les statistiques globales (compteurs pré-agrégés)"""
+        totals = get_totals('global', key=GLOBAL_KEY)
+        category_totals = get_totals('category', metric='conversions')
+        categories = ConversionCategory.objects.filter(is_active=True).values_list('id', 'name')
         
         # Statistiques par catégorie
-        category_stats = ConversionCategory.objects.filter(
-            is_active=True
-        ).annotate(
-            conversion_count=Count('conversion_types__conversions')
-        ).values('name', 'conversion_count')
+        category_stats = [
+            {'name': name, 'conversion_count': category_totals.get((category_id, 'conversions'), 0)}
+            for category_id, name in categories
+        ]
         
         return Response({
-            'total_conversions': total_conversions,
-            'total_file_conversions': total_file_conversions,
-            'total_categories': total_categories,
-            'category_stats': list(category_stats),
-            'last_updated': '2024-01-01T00:00:00Z'
+            'total_conversions': totals.get((GLOBAL_KEY, 'conversions'), 0),
+            'total_file_conversions': totals.get((GLOBAL_KEY, 'file_conversions'), 0),
+            'total_categories': len(category_stats),
+            'category_stats': category_stats,
+            'last_updated': timezone.now()
         })
@@ -3,6 +3,7 @@ Sérialiseurs pour l'application users
 """
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from apps.core.counters import get_totals
 
 
 class UserProfileSerializer(serializers.ModelSerializer):
@@ -25,8 +26,15 @@ class UserStatsSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'total_conversions', 'total_file_conversions']
         read_only_fields = ['id', 'username', 'total_conversions', 'total_file_conversions']
     
+    def get_totals(self, obj):
+        # Compteurs pré-agrégés : une seule requête pour les deux totaux
+        if getattr(self, '_totals_user', None) != obj.pk:
+            self._totals = get_totals('user', key=obj.pk)
+            self._totals_user = obj.pk
+        return self._totals
+    
     def get_total_conversions(self, obj):
-        return obj.conversions.count()
+        return self.get_totals(obj).get((obj.pk, 'conversions'), 0)
     
     def get_total_file_conversions(self, obj):
-        return obj.file_conversions.count()
+        return self.get_totals(obj).get((obj.pk, 'file_conversions'), 0)
@@ -3,6 +3,7 @@ Django settings for ConvertHub project.
 """
 
 import os
+import sys
 from pathlib import Path
 from decouple import config
 
@@ -45,6 +46,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Inactif sauf si INSTRUMENTATION_ENABLED
+    'apps.core.instrumentation.InstrumentationMiddleware',
 ]
 
 ROOT_URLCONF = 'converthub.urls'
@@ -68,9 +71,11 @@ TEMPLATES = [
 WSGI_APPLICATION = 'converthub.wsgi.application'
 
 # Database
+# DB_ENGINE=django.db.backends.sqlite3 (DB_NAME = chemin du fichier) pour les
+# essais locaux, par exemple `python manage.py bench`
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': config('DB_ENGINE', default='django.db.backends.postgresql'),
         'NAME': config('DB_NAME', default='converthub'),
         'USER': config('DB_USER', default='converthub'),
         'PASSWORD': config('DB_PASSWORD', default='converthub123'),
@@ -128,10 +133,15 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20,
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
-        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
 }
 
+# API navigable (HTML) : par défaut seulement en développement ; la désactiver
+# évite de charger les gabarits et formulaires DRF dans les workers
+API_BROWSABLE = config('API_BROWSABLE', default=DEBUG, cast=bool)
+if API_BROWSABLE:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append('rest_framework.renderers.BrowsableAPIRenderer')
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -145,27 +155,130 @@ REDIS_URL = config('REDIS_URL', default='redis://localhost:6379')
 CELERY_BROKER_URL = REDIS_URL
 CELERY_RESULT_BACKEND = REDIS_URL
 
-# Logging
+# Cache : mémoire locale par défaut, Redis pour partager le cache (catalogue,
+# versions du moteur de conversion) entre les processus
+if config('USE_REDIS_CACHE', default=False, cast=bool):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Historique des conversions : écriture différée (write-behind) optionnelle
+CONVERSION_HISTORY = {
+    'WRITE_BEHIND': config('HISTORY_WRITE_BEHIND', default=False, cast=bool),
+    'MAX_QUEUE_SIZE': config('HISTORY_MAX_QUEUE_SIZE', default=10000, cast=int),
+    'BATCH_SIZE': config('HISTORY_BATCH_SIZE', default=500, cast=int),
+    'FLUSH_INTERVAL': config('HISTORY_FLUSH_INTERVAL', default=1.0, cast=float),
+    'OVERFLOW_POLICY': config('HISTORY_OVERFLOW_POLICY', default='drop'),
+}
+
+# Compteurs de statistiques : incréments cumulés puis appliqués toutes les
+# STATS_FLUSH_INTERVAL secondes (0 : à chaque écriture). Pendant les tests,
+# appliqués immédiatement : le thread d'arrière-plan écrirait hors de la
+# transaction de chaque test
+TESTING = sys.argv[1:2] == ['test']
+STATS_FLUSH_INTERVAL = config('STATS_FLUSH_INTERVAL', default=0.0 if TESTING else 2.0, cast=float)
+
+# Rétention de l'historique : mois conservés en base, archives NDJSON compressées
+CONVERSION_RETENTION_MONTHS = config('CONVERSION_RETENTION_MONTHS', default=12, cast=int)
+CONVERSION_ARCHIVE_DIR = config('CONVERSION_ARCHIVE_DIR', default=str(BASE_DIR / 'archives'))
+
+# Conversions de fichiers : broker des travaux et limites de concurrence par format
+FILE_CONVERSION_BROKER = config('FILE_CONVERSION_BROKER', default='apps.conversions.jobs.SQLiteBroker')
+FILE_CONVERSION_FORMAT_LIMITS = {}
+# Budget du cache des résultats de conversion de fichiers (octets)
+FILE_RESULT_CACHE_MAX_BYTES = config('FILE_RESULT_CACHE_MAX_BYTES', default=5 * 1024 ** 3, cast=int)
+# Taille du pool de processus des conversions d'images (0 : nombre de cœurs)
+IMAGE_CONVERSION_PROCESSES = config('IMAGE_CONVERSION_PROCESSES', default=0, cast=int)
+# Envois par morceaux : taille maximale d'un fichier et d'un morceau (octets)
+UPLOAD_MAX_BYTES = config('UPLOAD_MAX_BYTES', default=4 * 1024 ** 3, cast=int)
+UPLOAD_CHUNK_MAX_BYTES = config('UPLOAD_CHUNK_MAX_BYTES', default=64 * 1024 ** 2, cast=int)
+# Envois en cours par utilisateur et expiration faute d'activité (secondes)
+UPLOAD_MAX_OPEN_SESSIONS = config('UPLOAD_MAX_OPEN_SESSIONS', default=5, cast=int)
+UPLOAD_SESSION_TTL = config('UPLOAD_SESSION_TTL', default=24 * 3600, cast=int)
+# Téléchargement des fichiers convertis : 'django' (FileResponse),
+# 'x-accel-redirect' (nginx, emplacement internal) ou 'x-sendfile' (Apache)
+FILE_DOWNLOAD_BACKEND = config('FILE_DOWNLOAD_BACKEND', default='django')
+FILE_DOWNLOAD_ACCEL_PREFIX = config('FILE_DOWNLOAD_ACCEL_PREFIX', default='/protected-media/')
+# Progression des conversions de fichiers : canal de publication
+# (MemoryChannel dans le processus, RedisChannel entre processus via REDIS_URL).
+# Par défaut RedisChannel, sauf avec MemoryBroker dont les workers sont des
+# threads du processus web
+FILE_PROGRESS_CHANNEL = config('FILE_PROGRESS_CHANNEL', default=(
+    'apps.conversions.progress.MemoryChannel' if FILE_CONVERSION_BROKER.endswith('.MemoryBroker')
+    else 'apps.conversions.progress.RedisChannel'
+))
+
+# Conversions de bases numériques en flux : nombre maximal de chiffres (au-delà :
+# 413). Le coût du calcul croît plus vite que la taille : rester vers 100 000
+BASE_CONVERSION_MAX_DIGITS = config('BASE_CONVERSION_MAX_DIGITS', default=100_000, cast=int)
+
+# Taux de change : fournisseur, devise de base du vecteur de taux, durée de
+# fraîcheur et âge maximal toléré avant de refuser les conversions (secondes)
+CURRENCY_RATE_PROVIDER = config('CURRENCY_RATE_PROVIDER', default='apps.conversions.currency.FixtureProvider')
+CURRENCY_RATES_FIXTURE = config('CURRENCY_RATES_FIXTURE', default='')
+CURRENCY_RATES_URL = config('CURRENCY_RATES_URL', default='https://api.exchangerate.host/latest?base={base}&access_key={api_key}')
+CURRENCY_API_KEY = config('CURRENCY_API_KEY', default='')
+CURRENCY_BASE = config('CURRENCY_BASE', default='EUR')
+CURRENCY_RATES_TTL = config('CURRENCY_RATES_TTL', default=3600, cast=int)
+CURRENCY_RATES_MAX_STALE = config('CURRENCY_RATES_MAX_STALE', default=86400, cast=int)
+
+# Sonde de disponibilité (/api/core/health/ready/) : délai par dépendance
+# et durée de conservation du résultat (secondes)
+HEALTH_CHECK_TIMEOUT = config('HEALTH_CHECK_TIMEOUT', default=1.0, cast=float)
+HEALTH_CACHE_TTL = config('HEALTH_CACHE_TTL', default=1.0, cast=float)
+
+# Budget du temps d'import au démarrage d'un processus (ms, commande importtime)
+IMPORT_TIME_BUDGET_MS = config('IMPORT_TIME_BUDGET_MS', default=1000, cast=float)
+
+# Instrumentation des requêtes : mesures par vue (/api/core/metrics/),
+# requêtes lentes journalisées et profils (cProfile ou pyinstrument)
+# échantillonnés ou demandés avec l'en-tête X-Profile: <PROFILE_TOKEN>
+INSTRUMENTATION = {
+    'ENABLED': config('INSTRUMENTATION_ENABLED', default=False, cast=bool),
+    'METRICS_TOKEN': config('INSTRUMENTATION_METRICS_TOKEN', default=''),
+    'SLOW_REQUEST_MS': config('INSTRUMENTATION_SLOW_REQUEST_MS', default=0, cast=int),
+    'PROFILER': config('INSTRUMENTATION_PROFILER', default='cprofile'),
+    'PROFILE_SAMPLE_RATE': config('INSTRUMENTATION_PROFILE_SAMPLE_RATE', default=0.0, cast=float),
+    'PROFILE_TOKEN': config('INSTRUMENTATION_PROFILE_TOKEN', default=''),
+    'PROFILE_DIR': config('INSTRUMENTATION_PROFILE_DIR', default=str(BASE_DIR / 'profiles')),
+}
+
+# Logging : écriture par un thread dédié (apps.core.logs.QueueHandler),
+# jamais sur le thread de la requête ; rotation par taille et par période
+# (LOG_ROTATE_WHEN : midnight, hourly ou never), lignes JSON avec LOG_JSON
+LOG_LEVEL = config('LOG_LEVEL', default='INFO')
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
     'handlers': {
-        'console': {
-            'class': 'logging.StreamHandler',
-        },
-        'file': {
-            'class': 'logging.FileHandler',
-            'filename': BASE_DIR / 'logs' / 'django.log',
+        'queue': {
+            'class': 'apps.core.logs.QueueHandler',
+            'filename': config('LOG_FILE', default=str(BASE_DIR / 'logs' / 'django.log')) or None,
+            'console': config('LOG_CONSOLE', default=True, cast=bool),
+            'as_json': config('LOG_JSON', default=False, cast=bool),
+            'max_bytes': config('LOG_MAX_BYTES', default=50 * 1024 ** 2, cast=int),
+            'when': config('LOG_ROTATE_WHEN', default='midnight'),
+            'backup_count': config('LOG_BACKUP_COUNT', default=14, cast=int),
+            'queue_size': config('LOG_QUEUE_SIZE', default=10000, cast=int),
         },
     },
     'root': {
-        'handlers': ['console', 'file'],
-        'level': 'INFO',
+        'handlers': ['queue'],
+        'level': LOG_LEVEL,
     },
     'loggers': {
         'django': {
-            'handlers': ['console', 'file'],
-            'level': 'INFO',
+            'handlers': ['queue'],
+            'level': LOG_LEVEL,
             'propagate': False,
         },
     },
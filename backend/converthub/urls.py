@@ -8,6 +8,7 @@ from django.conf.urls.static import static
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/async/', include('apps.conversions.async_urls')),
     path('api/', include('apps.conversions.urls')),
     path('api/users/', include('apps.users.urls')),
     path('api/core/', include('apps.core.urls')),
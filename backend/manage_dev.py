@@ -70,18 +70,20 @@ def load_fixtures():
         
         # Types de conversion de base
         types_data = [
-            ('Température Celsius vers Fahrenheit', 'celsius-fahrenheit', 1, '°C', '°F', 'F = C × 9/5 + 32'),
-            ('Longueur mètres vers pieds', 'metres-pieds', 1, 'm', 'ft', 'ft = m × 3.28084'),
-            ('Poids kilogrammes vers livres', 'kg-livres', 1, 'kg', 'lb', 'lb = kg × 2.20462'),
-            ('Devise EUR vers USD', 'eur-usd', 2, 'EUR', 'USD', 'Taux de change en temps réel'),
+            ('Température Celsius vers Fahrenheit', 'celsius-fahrenheit', 1, '°C', '°F', 'F = C × 9/5 + 32', '1.8', '32'),
+            ('Longueur mètres vers pieds', 'metres-pieds', 1, 'm', 'ft', 'ft = m × 3.28084', '3.28084', '0'),
+            ('Poids kilogrammes vers livres', 'kg-livres', 1, 'kg', 'lb', 'lb = kg × 2.20462', '2.20462', '0'),
+            ('Devise EUR vers USD', 'eur-usd', 2, 'EUR', 'USD', 'Taux de change en temps réel', None, '0'),
+            ('Hexadécimal vers décimal', 'hex-dec', 4, 'hex', 'dec', 'Conversion de base', None, '0'),
+            ('Binaire vers hexadécimal', 'bin-hex', 4, 'bin', 'hex', 'Conversion de base', None, '0'),
         ]
         
-        for name, slug, category_id, input_unit, output_unit, formula in types_data:
+        for name, slug, category_id, input_unit, output_unit, formula, factor, offset in types_data:
             cursor.execute("""
-                INSERT INTO conversions_conversiontype (category_id, name, slug, input_unit, output_unit, formula, is_active, created_at, updated_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, NOW(), NOW())
+                INSERT INTO conversions_conversiontype (category_id, name, slug, description, input_unit, output_unit, formula, factor, "offset", is_active, created_at, updated_at)
+                VALUES (%s, %s, %s, '', %s, %s, %s, %s, %s, %s, NOW(), NOW())
                 ON CONFLICT (slug) DO NOTHING
-            """, (category_id, name, slug, input_unit, output_unit, formula, True))
+            """, (category_id, name, slug, input_unit, output_unit, formula, factor, offset, True))
     
     print("✅ Données de test chargées avec succès")
     return True
@@ -92,11 +94,12 @@ def main():
     print("=" * 40)
     
     if len(sys.argv) < 2:
-        print("Usage: python manage_dev.py [setup|run|test|shell]")
+        print("Usage: python manage_dev.py [setup|run|test|bench|shell]")
         print("\nCommandes disponibles:")
         print("  setup  - Configurer la base de données et charger les données de test")
         print("  run    - Démarrer le serveur de développement")
         print("  test   - Exécuter les tests")
+        print("  bench  - Mesurer les performances (micro-benchmarks et test de charge)")
         print("  shell  - Ouvrir le shell Django")
         return
     
@@ -119,6 +122,10 @@ def main():
         print("\n🧪 Exécution des tests...")
         os.system("python manage.py test")
     
+    elif command == "bench":
+        print("\n⏱️ Mesure des performances...")
+        os.system("python manage.py bench")
+    
     elif command == "shell":
         print("\n🐍 Ouverture du shell Django...")
         os.system("python manage.py shell")